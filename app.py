@@ -13,11 +13,75 @@ case_limit = st.number_input(
     "📄 Number of Cases to Scrape", min_value=1, max_value=1000, value=5, step=1
 )
 
+# --- Input: Number of parallel browser workers ---
+workers = st.number_input(
+    "🧵 Parallel Browser Workers", min_value=1, max_value=16, value=1, step=1,
+    help="In http mode, the number of concurrent case downloads."
+)
+
+# --- Input: How case documents are fetched ---
+fetch_mode = st.selectbox(
+    "🌐 Case Fetch Mode", ["browser", "http"],
+    help="'http' uses Selenium only for login and case discovery, then downloads cases with a pooled HTTP client."
+)
+
+# --- Input: Case JSON endpoint for the http fetch mode ---
+api_url_template = st.text_input(
+    "🔗 Case API URL template (http mode)", value="",
+    help="The XHR endpoint the EastLaw frontend loads a case from, with {case_id}, e.g. https://.../api/case?id={case_id}"
+)
+
+# --- Input: Lean headless browser profile ---
+lean = st.checkbox(
+    "🪶 Lean headless browser (uses the saved login from login_to_profile)", value=False
+)
+
+# --- Input: Sharded corpus storage for the transform/load stages ---
+use_corpus = st.checkbox(
+    "📦 Store pipeline stages as compressed corpus shards", value=False
+)
+
+# --- Input: Concurrent LLM requests during transform ---
+concurrency = st.number_input(
+    "⚡ Concurrent GPT Requests", min_value=1, max_value=64, value=1, step=1
+)
+
+# --- Input: Per-case task graph instead of global phases ---
+dag = st.checkbox(
+    "🕸️ Per-case pipeline (each case is merged as soon as its base and custom JSON exist)", value=False
+)
+
+# --- Input: Skip cases whose input, prompts and schema are unchanged since the last run ---
+incremental = st.checkbox(
+    "♻️ Incremental transform (only new or changed cases)", value=True
+)
+
+# --- Input: Extract the base schema as concurrent field-group requests ---
+sliced = st.checkbox(
+    "🧩 Sliced base extraction (one smaller request per field group)", value=False
+)
+
+# --- Input: Fill dates, numbers, court, citations, statutes and sections by rules before GPT ---
+prefill = st.checkbox(
+    "📐 Rule-based pre-fill of structured base fields", value=True
+)
+
+# --- Input: Strip corpus-wide boilerplate (menus, disclaimers) before GPT ---
+boilerplate = st.checkbox(
+    "🧽 Strip corpus boilerplate before GPT", value=True
+)
+
+# --- Input: Send each field group only the judgment sections it needs (sliced extraction) ---
+segmented = st.checkbox(
+    "🧭 Route judgment sections to field groups (needs sliced extraction)", value=False, disabled=not sliced
+)
+
 # --- Extract Button ---
 if st.button("🧲 Extract Case Files"):
     with st.spinner(f"Extracting {case_limit} cases..."):
         try:
-            extractor(case_limit=case_limit)
+            extractor(case_limit=case_limit, workers=workers, fetch_mode=fetch_mode, lean=lean,
+                      api_url_template=api_url_template or None)
             st.success("✅ Extraction completed successfully.")
         except Exception as e:
             st.error(f"❌ Extraction failed: {e}")
@@ -26,7 +90,8 @@ if st.button("🧲 Extract Case Files"):
 if st.button("🔄 Transform & Merge JSON"):
     with st.spinner("Running transformer..."):
         try:
-            transform()
+            transform(use_corpus=use_corpus, concurrency=concurrency, dag=dag, incremental=incremental, sliced=sliced,
+                      prefill=prefill, boilerplate=boilerplate, segmented=sliced and segmented)
             st.success("✅ Transformation completed successfully.")
         except Exception as e:
             st.error(f"❌ Transformation failed: {e}")
@@ -35,7 +100,7 @@ if st.button("🔄 Transform & Merge JSON"):
 if st.button("📥 Load into MongoDB"):
     with st.spinner("Loading into MongoDB..."):
         try:
-            load()
+            load(use_corpus=use_corpus)
             st.success("✅ JSONs loaded into MongoDB.")
         except Exception as e:
             st.error(f"❌ Loading failed: {e}")
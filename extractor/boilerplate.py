@@ -0,0 +1,172 @@
+import os
+import re
+import json
+import random
+import hashlib
+import zlib
+import threading
+from collections import Counter
+from extractor.raw_store import DATA_DIR
+from loader.corpus_shards import list_entries, read_text
+
+# === Corpus-learned boilerplate model ===
+# Lines and word n-grams are counted once per document over (a sample of) the
+# corpus. A line that appears in more than min_share of all documents, such as
+# EastLaw menus, repeated headnote captions or the disclaimer, is boilerplate.
+# So is a sentence whose n-grams are almost all boilerplate n-grams, which
+# catches the same disclaimer glued into a longer line. Digits are masked so
+# page numbers and dates do not make repeated chrome look unique.
+BOILERPLATE_CONFIG = {
+    "enabled": True,
+    "path": "D:/LegalMorph/boilerplate_model.json",
+    "min_share": 0.5,
+    "min_documents": 50,
+    "ngram_size": 8,
+    "sentence_share": 0.8,
+    "sample_size": 2000,
+    "relearn_growth": 0.1,
+}
+SENTENCE_BREAK = re.compile(r'(?<=[.?!])\s+')
+WORD = re.compile(r"[a-z0-9]+")
+
+_lock = threading.Lock()
+_model = {}
+_savings = {}
+
+
+def configure_boilerplate(**settings):
+    BOILERPLATE_CONFIG.update(settings)
+    _model.clear()
+
+
+def normalize_line(line):
+    return re.sub(r"\d+", "0", re.sub(r"\s+", " ", line).strip().lower())
+
+
+def ngram_hashes(text, size):
+    words = WORD.findall(normalize_line(text))
+    return [zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)]
+
+
+def learn_boilerplate(data_dir=DATA_DIR, path=None):
+    """
+    Counts document frequency of normalized lines and word n-grams and saves
+    everything above min_share as the boilerplate model. Returns the model, or
+    None if the corpus is too small to tell boilerplate from content.
+    """
+    path = path or BOILERPLATE_CONFIG["path"]
+    size = BOILERPLATE_CONFIG["ngram_size"]
+    filenames = list_entries(data_dir, ".txt")
+    if len(filenames) < BOILERPLATE_CONFIG["min_documents"]:
+        print(f"⚠️ Only {len(filenames)} documents, not learning a boilerplate model")
+        return None
+    sample = random.Random(0).sample(filenames, min(len(filenames), BOILERPLATE_CONFIG["sample_size"]))
+
+    line_counts, ngram_counts = Counter(), Counter()
+    for filename in sample:
+        text = read_text(data_dir, filename)
+        line_counts.update({normalize_line(line) for line in text.splitlines() if line.strip()})
+        ngram_counts.update(set(ngram_hashes(text, size)))
+
+    threshold = BOILERPLATE_CONFIG["min_share"] * len(sample)
+    model = {
+        "documents": len(filenames),
+        "sampled": len(sample),
+        "min_share": BOILERPLATE_CONFIG["min_share"],
+        "ngram_size": size,
+        "lines": sorted(line for line, count in line_counts.items() if count > threshold),
+        "ngrams": sorted(h for h, count in ngram_counts.items() if count > threshold),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(model, f, ensure_ascii=False)
+    _model.clear()
+    print(f"🧽 Boilerplate model learned from {len(sample)} documents: {len(model['lines'])} lines, "
+          f"{len(model['ngrams'])} n-grams")
+    return model
+
+
+def load_boilerplate_model(path=None):
+    path = path or BOILERPLATE_CONFIG["path"]
+    with _lock:
+        if path not in _model:
+            if not os.path.exists(path):
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                model = json.load(f)
+            model["lines"], model["ngrams"] = set(model["lines"]), set(model["ngrams"])
+            _model[path] = model
+        return _model[path]
+
+
+def ensure_boilerplate_model(data_dir=DATA_DIR, path=None):
+    # Re-learn when there is no model yet or the corpus grew noticeably since it was learned
+    model = load_boilerplate_model(path)
+    documents = len(list_entries(data_dir, ".txt"))
+    if model and documents <= model["documents"] * (1 + BOILERPLATE_CONFIG["relearn_growth"]):
+        return model
+    return learn_boilerplate(data_dir, path) and load_boilerplate_model(path)
+
+
+def boilerplate_fingerprint(model):
+    # Identifies what stripping does to a case, for transform lineage: "raw" when nothing is stripped
+    if not model:
+        return "raw"
+    content = {
+        "min_share": model["min_share"], "ngram_size": model["ngram_size"],
+        "sentence_share": BOILERPLATE_CONFIG["sentence_share"],
+        "lines": sorted(model["lines"]), "ngrams": sorted(model["ngrams"]),
+    }
+    digest = hashlib.sha256(json.dumps(content, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return f"boilerplate:{digest[:16]}"
+
+
+def is_boilerplate_sentence(sentence, model):
+    hashes = ngram_hashes(sentence, model["ngram_size"])
+    if not hashes:
+        return False
+    return sum(h in model["ngrams"] for h in hashes) / len(hashes) >= BOILERPLATE_CONFIG["sentence_share"]
+
+
+def strip_boilerplate(text, model=None):
+    """
+    Removes boilerplate lines and sentences. Returns the text unchanged when
+    boilerplate stripping is disabled, no model exists, or nothing would be left.
+    """
+    model = model or (load_boilerplate_model() if BOILERPLATE_CONFIG["enabled"] else None)
+    if not model:
+        return text
+    kept_lines = []
+    for line in text.splitlines():
+        if not line.strip():
+            kept_lines.append(line)
+            continue
+        if normalize_line(line) in model["lines"]:
+            continue
+        sentences = [s for s in SENTENCE_BREAK.split(line) if not is_boilerplate_sentence(s, model)]
+        if sentences:
+            kept_lines.append(" ".join(sentences))
+    stripped = re.sub(r"\n{3,}", "\n\n", "\n".join(kept_lines)).strip()
+    return stripped or text
+
+
+def record_savings(name, tokens_before, tokens_after):
+    # Keyed by document: every phase strips the same case, but it is counted once
+    with _lock:
+        _savings[name] = (tokens_before, tokens_after)
+
+
+def boilerplate_stats():
+    with _lock:
+        savings = list(_savings.values())
+    stats = {"documents": len(savings), "tokens_before": sum(before for before, _ in savings),
+             "tokens_after": sum(after for _, after in savings)}
+    stats["tokens_saved"] = stats["tokens_before"] - stats["tokens_after"]
+    return stats
+
+
+def print_boilerplate_stats():
+    stats = boilerplate_stats()
+    if not stats["documents"]:
+        return
+    print(f"\n🧽 Boilerplate stripped from {stats['documents']} documents: {stats['tokens_saved']} tokens saved "
+          f"({stats['tokens_before']} → {stats['tokens_after']})")
@@ -0,0 +1,68 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+# ✅ Reusable Chrome profile so the EastLaw login survives between runs
+LEAN_PROFILE_DIR = "D:/LegalMorph/chrome_profile"
+
+# Images, fonts, media and trackers are never needed for text extraction.
+# PDFs, scripts, blobs and XHR stay allowed: statute pages are drawn onto
+# canvases by pdf.js from the PDF itself, so they still render.
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.bmp", "*.ico", "*.svg",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3", "*.wav", "*.ogg", "*.m4a",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*",
+]
+
+
+def build_chrome_options(lean=False, headless=None, user_data_dir=None, detach=False):
+    options = Options()
+    if detach:
+        options.add_experimental_option("detach", True)
+    if headless is None:
+        headless = lean
+    if headless:
+        options.add_argument("--headless=new")
+        # Statute canvases are screenshotted for OCR, so keep a desktop-sized viewport
+        options.add_argument("--window-size=1920,1080")
+    if lean:
+        options.page_load_strategy = "eager"
+        options.add_argument("--disable-extensions")
+        options.add_argument("--mute-audio")
+        options.add_argument("--disable-background-networking")
+    if user_data_dir:
+        options.add_argument(f"--user-data-dir={user_data_dir}")
+    return options
+
+
+def block_heavy_resources(driver, patterns=None):
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns or BLOCKED_URL_PATTERNS})
+
+
+def create_driver(lean=False, headless=None, user_data_dir=None, detach=False):
+    """
+    Starts Chrome either with the default profile used for manual login, or in
+    the "lean" scraping profile: headless, eager page loads, images/fonts/media
+    blocked through the DevTools protocol and, when user_data_dir is given, a
+    persistent profile so the login is reused.
+    """
+    options = build_chrome_options(lean, headless, user_data_dir, detach)
+    driver = webdriver.Chrome(options=options)
+    if lean:
+        block_heavy_resources(driver)
+    return driver
+
+
+def login_to_profile(domain="eastlaw.pk", user_data_dir=LEAN_PROFILE_DIR):
+    """
+    One-off headed login that stores the EastLaw session in user_data_dir so
+    later lean (headless) runs start already authenticated.
+    """
+    driver = create_driver(headless=False, user_data_dir=user_data_dir)
+    driver.get(f"https://{domain}/")
+    print("🔐 Please log in manually in the Chrome window.")
+    input("✅ After logging in completely, press ENTER to save the session...")
+    driver.quit()
+    print(f"💾 Session saved in browser profile: {user_data_dir}")
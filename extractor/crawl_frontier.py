@@ -0,0 +1,78 @@
+import sqlite3
+import threading
+import time
+
+# Progress units recorded by the crawl: "section", "pair", "tab" and "case". A unit
+# is only marked done when it was walked to the end; one cut short by case_limit
+# stays open. Once every section of a run is done, complete_run() clears the
+# frontier, so the next (e.g. daily) run walks every unit again and only picks
+# up the cases that are not on disk yet.
+FRONTIER_PATH = "D:/LegalMorph/crawl_frontier.db"
+
+_lock = threading.Lock()
+
+
+def open_frontier(db_path=FRONTIER_PATH):
+    """
+    Opens (or creates) the durable crawl frontier. The connection is shared by
+    the worker-pool threads, so every access goes through the module lock.
+    """
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS frontier (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (kind, key)
+        )
+    """)
+    conn.commit()
+    return conn
+
+
+def make_key(*parts):
+    return " | ".join(part.strip() for part in parts)
+
+
+def is_done(conn, kind, *parts):
+    if conn is None:
+        return False
+    with _lock:
+        row = conn.execute(
+            "SELECT 1 FROM frontier WHERE kind = ? AND key = ?", (kind, make_key(*parts))
+        ).fetchone()
+    return row is not None
+
+
+def mark_done(conn, kind, *parts):
+    if conn is None:
+        return
+    with _lock:
+        conn.execute(
+            "INSERT OR REPLACE INTO frontier (kind, key, updated_at) VALUES (?, ?, ?)",
+            (kind, make_key(*parts), time.strftime('%Y-%m-%d %H:%M:%S'))
+        )
+        conn.commit()
+
+
+def frontier_summary(conn):
+    with _lock:
+        rows = conn.execute("SELECT kind, COUNT(*) FROM frontier GROUP BY kind").fetchall()
+    return dict(rows)
+
+
+def complete_run(conn):
+    if conn is None:
+        return
+    print(f"🏁 Crawl complete, clearing frontier: {frontier_summary(conn)}")
+    reset_frontier(conn)
+
+
+def reset_frontier(conn, kind=None):
+    with _lock:
+        if kind:
+            conn.execute("DELETE FROM frontier WHERE kind = ?", (kind,))
+        else:
+            conn.execute("DELETE FROM frontier")
+        conn.commit()
@@ -0,0 +1,152 @@
+import os
+import json
+import sqlite3
+import numpy as np
+from pathlib import Path
+from send2trash import send2trash
+from extractor.near_duplicates import (
+    JACCARD_THRESHOLD, NUM_PERM, minhash_signature, estimated_jaccard, lsh_params, band_keys
+)
+
+# === Persistent, incremental near-duplicate index ===
+# documents: one MinHash signature per file plus the mtime/size it was computed from
+# bands:     LSH band keys, so a new document is only compared with documents
+#            that share a bucket with it instead of with the whole corpus
+DEDUP_INDEX_PATH = "D:/LegalMorph/dedup_index.db"
+DEDUP_REPORT_PATH = "D:/LegalMorph/duplicate_clusters_incremental.json"
+
+
+def open_dedup_index(index_path=DEDUP_INDEX_PATH, threshold=JACCARD_THRESHOLD, num_perm=NUM_PERM):
+    conn = sqlite3.connect(index_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS documents (
+            doc_id TEXT PRIMARY KEY,
+            mtime REAL NOT NULL,
+            size INTEGER NOT NULL,
+            signature BLOB NOT NULL
+        )
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS bands (band INTEGER NOT NULL, key BLOB NOT NULL, doc_id TEXT NOT NULL)")
+    conn.execute("CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, key)")
+    conn.execute("CREATE INDEX IF NOT EXISTS bands_doc ON bands (doc_id)")
+
+    bands, rows = lsh_params(threshold, num_perm)
+    params = json.dumps({"bands": bands, "rows": rows, "num_perm": num_perm, "threshold": threshold})
+    stored = conn.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+    if stored and stored[0] != params:
+        # Different threshold/permutations: signatures and band keys are no longer comparable
+        print("♻️ Dedup parameters changed, rebuilding the index from scratch.")
+        conn.execute("DELETE FROM documents")
+        conn.execute("DELETE FROM bands")
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('params', ?)", (params,))
+    conn.commit()
+    return conn
+
+
+def index_params(conn):
+    return json.loads(conn.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()[0])
+
+
+def load_signature(conn, doc_id):
+    row = conn.execute("SELECT signature FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+    return np.frombuffer(row[0], dtype=np.uint64) if row else None
+
+
+def remove_document(conn, doc_id):
+    conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+    conn.execute("DELETE FROM bands WHERE doc_id = ?", (doc_id,))
+
+
+def add_document(conn, doc_id, signature, mtime, size):
+    params = index_params(conn)
+    remove_document(conn, doc_id)
+    conn.execute("INSERT INTO documents (doc_id, mtime, size, signature) VALUES (?, ?, ?, ?)",
+                 (doc_id, mtime, size, signature.tobytes()))
+    conn.executemany("INSERT INTO bands (band, key, doc_id) VALUES (?, ?, ?)",
+                     [(band, key, doc_id) for band, key in
+                      enumerate(band_keys(signature, params["bands"], params["rows"]))])
+
+
+def find_duplicates(conn, doc_id, signature):
+    params = index_params(conn)
+    candidates = set()
+    for band, key in enumerate(band_keys(signature, params["bands"], params["rows"])):
+        candidates.update(row[0] for row in conn.execute(
+            "SELECT doc_id FROM bands WHERE band = ? AND key = ?", (band, key)))
+    candidates.discard(doc_id)
+    matches = []
+    for candidate in sorted(candidates):
+        similarity = estimated_jaccard(signature, load_signature(conn, candidate))
+        if similarity >= params["threshold"]:
+            matches.append((candidate, similarity))
+    return matches
+
+
+def sync_dedup_index(conn, directory):
+    """
+    Brings the index in line with the directory: files that disappeared are
+    dropped, unchanged files (same mtime and size) are left alone. Returns the
+    new or modified files as {doc_id: (path, mtime, size)}; only those need a
+    signature and a duplicate lookup.
+    """
+    on_disk = {}
+    for filepath in Path(directory).glob("*.txt"):
+        stat = filepath.stat()
+        on_disk[filepath.name] = (filepath, stat.st_mtime, stat.st_size)
+
+    indexed = {doc_id: (mtime, size) for doc_id, mtime, size in
+               conn.execute("SELECT doc_id, mtime, size FROM documents")}
+    removed = [doc_id for doc_id in indexed if doc_id not in on_disk]
+    for doc_id in removed:
+        remove_document(conn, doc_id)
+    conn.commit()
+
+    changed = {doc_id: info for doc_id, info in on_disk.items()
+               if indexed.get(doc_id) != (info[1], info[2])}
+    print(f"🗂️ Dedup index: {len(indexed) - len(removed)} indexed, {len(removed)} removed, {len(changed)} new/changed")
+    return changed
+
+
+def incremental_dedup(directory, index_path=DEDUP_INDEX_PATH, threshold=JACCARD_THRESHOLD,
+                      report_path=DEDUP_REPORT_PATH, dry_run=False):
+    """
+    Compares only new or modified files against the persistent index. A new
+    file that matches an indexed document is a duplicate and is sent to trash;
+    otherwise it is added to the index so later batches are checked against it.
+    """
+    conn = open_dedup_index(index_path, threshold)
+    report = []
+    try:
+        changed = sync_dedup_index(conn, directory)
+        # Oldest first, so within one batch the earlier scrape is the one that survives
+        for doc_id, (filepath, mtime, size) in sorted(changed.items(), key=lambda item: item[1][1]):
+            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+                signature = minhash_signature(f.read())
+            matches = find_duplicates(conn, doc_id, signature)
+            if matches:
+                keep, similarity = max(matches, key=lambda match: match[1])
+                print(f"🗑️ {doc_id} duplicates {keep} (Jaccard {similarity:.2f}), sending to trash")
+                report.append({"keep": keep, "duplicates": [doc_id], "jaccard": round(similarity, 3)})
+                remove_document(conn, doc_id)
+                if not dry_run:
+                    send2trash(str(filepath))
+                continue
+            add_document(conn, doc_id, signature, mtime, size)
+            conn.commit()
+        conn.commit()
+    finally:
+        conn.close()
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Incremental dedup done. Duplicates removed: {len(report)}")
+    return report
+
+
+def rebuild_dedup_index(directory, index_path=DEDUP_INDEX_PATH, threshold=JACCARD_THRESHOLD, dry_run=False):
+    # Drops the index and re-signs every file, e.g. after files were edited outside the pipeline
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    return incremental_dedup(directory, index_path, threshold, dry_run=dry_run)
@@ -0,0 +1,176 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from selenium.webdriver.common.by import By
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from extractor.URL_parser import parse_case_url
+from extractor.scraper import CASE_ICON_XPATH, click_sidebar_item, save_case_text, case_already_scraped
+from extractor.scraper_pool import export_session_state
+from extractor.text_cleaner import extract_clean_text_from_html
+from extractor.crawl_frontier import mark_done
+from extractor.waits import timed_wait, wait_for_stable_count
+import traceback
+
+
+# === Pooled HTTP client built from the Selenium session ===
+def build_http_session(session_state, user_agent=None, pool_size=16, extra_headers=None):
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=["GET"], respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    for cookie in session_state["cookies"]:
+        session.cookies.set(cookie["name"], cookie["value"],
+                            domain=cookie.get("domain"), path=cookie.get("path", "/"))
+    if user_agent:
+        session.headers["User-Agent"] = user_agent
+    if extra_headers:
+        session.headers.update(extra_headers)
+    return session
+
+
+# === Case ID discovery (the only per-case Selenium work in this mode) ===
+# Clicking a case opens it in a new window. window.open and target=_blank links
+# are intercepted on the list page so the click only records the URL and no
+# case window is created.
+CAPTURE_OPEN_JS = """
+if (!window.__lmOpen) {
+    window.__lmOpen = {urls: []};
+    window.open = function(url) { window.__lmOpen.urls.push(new URL(url, location.href).href); return null; };
+    document.addEventListener('click', function(event) {
+        const link = event.target.closest && event.target.closest('a[target=_blank][href]');
+        if (link) { event.preventDefault(); window.__lmOpen.urls.push(link.href); }
+    }, true);
+}
+window.__lmOpen.urls = [];
+"""
+
+
+def discover_case_url(driver, icon):
+    # Cheap path: the list entry already links to the case page
+    links = icon.find_elements(By.XPATH, "./ancestor-or-self::a[@href] | .//a[@href]")
+    if links:
+        return links[0].get_attribute("href")
+
+    driver.execute_script(CAPTURE_OPEN_JS)
+    driver.execute_script("arguments[0].scrollIntoView();", icon)
+    driver.execute_script("arguments[0].click();", icon)
+    url = timed_wait(driver, "case_url", lambda d: d.execute_script("return window.__lmOpen.urls[0] || false;"),
+                     required=False)
+    if url:
+        return url
+
+    # The click still opened a real window: read its URL there, the page is never rendered or parsed
+    timed_wait(driver, "case_window", lambda d: len(d.window_handles) > 1)
+    driver.switch_to.window(driver.window_handles[1])
+    timed_wait(driver, "case_window", lambda d: d.current_url not in ("", "about:blank"))
+    url = driver.current_url
+    driver.close()
+    driver.switch_to.window(driver.window_handles[0])
+    return url
+
+
+def discover_listed_cases(driver, case_limit, frontier=None):
+    case_refs = []
+    case_elements = driver.find_elements(By.XPATH, CASE_ICON_XPATH)
+    for icon in case_elements[:case_limit]:
+        try:
+            title = icon.find_element(By.XPATH, "./parent::div").get_attribute("aria-label")
+            if case_already_scraped(frontier, title):
+                print(f"⏭️ Already on disk: {title}")
+                continue
+            case_ref = parse_case_url(discover_case_url(driver, icon))
+            case_ref["title"] = title
+            case_refs.append(case_ref)
+            print(f"🔗 Discovered case {case_ref['case_id']}: {title}")
+        except Exception as e:
+            print(f"⚠️ Could not discover case URL: {e}")
+            if len(driver.window_handles) > 1:
+                driver.close()
+            driver.switch_to.window(driver.window_handles[0])
+    return case_refs
+
+
+# === Fetching ===
+def collect_json_text(payload):
+    """
+    Flattens the string values of a JSON API response into one document.
+    HTML fragments are kept as-is and cleaned by extract_clean_text_from_html.
+    """
+    if isinstance(payload, str):
+        return [payload]
+    if isinstance(payload, dict):
+        return [part for value in payload.values() for part in collect_json_text(value)]
+    if isinstance(payload, list):
+        return [part for value in payload for part in collect_json_text(value)]
+    return []
+
+
+def fetch_case_text(session, case_ref, api_url_template, timeout=30):
+    """
+    Fetches a single judgment without a browser from api_url_template, the XHR
+    endpoint the EastLaw frontend calls (e.g. ".../api/case?id={case_id}").
+    The case page URL itself is not an option: it only returns the
+    single-page-app shell, which holds no judgment text.
+    """
+    if not case_ref["case_id"]:
+        raise ValueError(f"No case ID in case URL {case_ref['url']}")
+    response = session.get(api_url_template.format(case_id=case_ref["case_id"]), timeout=timeout)
+    response.raise_for_status()
+    text = extract_clean_text_from_html("\n".join(collect_json_text(response.json())))
+    if not text.strip():
+        raise ValueError(f"Empty judgment text from {response.url}")
+    return text
+
+
+def fetch_cases_http(session, case_refs, api_url_template, workers=8, frontier=None):
+    saved = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(fetch_case_text, session, case_ref, api_url_template): case_ref
+            for case_ref in case_refs
+        }
+        for future in as_completed(futures):
+            case_ref = futures[future]
+            try:
+                metadata = {"source_section": "Judgments", "source_url": case_ref["url"]}
+                if save_case_text(case_ref["title"], future.result(), metadata):
+                    mark_done(frontier, "case", case_ref["title"])
+                    saved += 1
+            except Exception as e:
+                print(f"⚠️ Skipped case {case_ref['case_id']} ({case_ref['title']}): {e}")
+    return saved
+
+
+def scrape_cases_http(driver, case_limit, workers=8, api_url_template=None, frontier=None):
+    """
+    Direct HTTP fetch mode for scrape_cases_from_eastlaw. Selenium is only used
+    for the manual login and for discovering case IDs on the Judgments list;
+    the documents themselves are downloaded from api_url_template by a pooled
+    requests session that reuses the browser cookies.
+    """
+    if not api_url_template:
+        raise ValueError("fetch_mode='http' needs api_url_template (the case JSON endpoint, with {case_id}); "
+                         "case page URLs only return the app shell without judgment text")
+    session_state = export_session_state(driver)
+    user_agent = driver.execute_script("return navigator.userAgent;")
+    session = build_http_session(session_state, user_agent=user_agent, pool_size=workers)
+
+    if not click_sidebar_item(driver, "Judgments"):
+        print("❌ Could not find or click 'Judgments' in sidebar.")
+        return 0
+
+    try:
+        wait_for_stable_count(driver, "case_list", By.XPATH, CASE_ICON_XPATH, required=True)
+        case_refs = discover_listed_cases(driver, case_limit, frontier)
+    except Exception as e:
+        print(f"🚨 Case discovery failed: {e}")
+        traceback.print_exc()
+        return 0
+
+    print(f"🌐 Fetching {len(case_refs)} cases over HTTP with {workers} connections...")
+    saved = fetch_cases_http(session, case_refs, api_url_template, workers, frontier)
+    print(f"\n🎯 HTTP fetch finished. Cases saved: {saved}")
+    return saved
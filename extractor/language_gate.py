@@ -0,0 +1,131 @@
+import os
+import re
+import json
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from langdetect import DetectorFactory, detect
+from langdetect.lang_detect_exception import LangDetectException
+from extractor.raw_store import DATA_DIR
+from loader.corpus_shards import list_entries, read_text, is_corpus
+
+# langdetect is randomised; a fixed seed makes the same text always get the same label
+DetectorFactory.seed = 0
+
+MAX_SAMPLED_PARAGRAPHS = 12
+MAX_PARAGRAPH_CHARS = 600
+MIN_PARAGRAPH_CHARS = 40
+MIN_ENGLISH_SHARE = 0.6
+NON_ENGLISH_DIR = "D:/LegalMorph/non_english"
+ARABIC_SCRIPT = re.compile(r'[\u0600-\u06FF\u0750-\u077F\uFB50-\uFDFF\uFE70-\uFEFF]')
+LETTER = re.compile(r'[^\W\d_]')
+
+
+def split_paragraphs(text):
+    paragraphs = [p.strip() for p in re.split(r'\n\s*\n', text) if p.strip()]
+    if len(paragraphs) > 1:
+        return paragraphs
+    # Single-line text (e.g. from mode="full"): cut into pseudo-paragraphs on whitespace
+    words, chunks, current = text.split(), [], []
+    size = 0
+    for word in words:
+        current.append(word)
+        size += len(word) + 1
+        if size >= MAX_PARAGRAPH_CHARS:
+            chunks.append(" ".join(current))
+            current, size = [], 0
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def sample_paragraphs(text, max_paragraphs=MAX_SAMPLED_PARAGRAPHS):
+    # Evenly spaced over the document so headnotes, body and order are all represented
+    paragraphs = [p for p in split_paragraphs(text) if len(p) >= MIN_PARAGRAPH_CHARS]
+    if len(paragraphs) > max_paragraphs:
+        step = len(paragraphs) / max_paragraphs
+        paragraphs = [paragraphs[int(i * step)] for i in range(max_paragraphs)]
+    return [p[:MAX_PARAGRAPH_CHARS] for p in paragraphs]
+
+
+def paragraph_language(paragraph):
+    letters = LETTER.findall(paragraph)
+    if not letters:
+        return None
+    # Urdu quotations are Arabic script; no need to run the detector on them
+    if len(ARABIC_SCRIPT.findall(paragraph)) / len(letters) > 0.5:
+        return "ur"
+    try:
+        return detect(paragraph)
+    except LangDetectException:
+        return None
+
+
+def language_mix(text, max_paragraphs=MAX_SAMPLED_PARAGRAPHS):
+    """
+    Returns {language: share of sampled characters}, e.g. {"en": 0.92, "ur": 0.08}.
+    Only a bounded, evenly spaced sample of paragraphs is classified, so the cost
+    does not grow with the length of the judgment.
+    """
+    totals = {}
+    for paragraph in sample_paragraphs(text, max_paragraphs):
+        language = paragraph_language(paragraph)
+        if language:
+            totals[language] = totals.get(language, 0) + len(paragraph)
+    sampled = sum(totals.values())
+    if not sampled:
+        return {}
+    return {language: round(chars / sampled, 3)
+            for language, chars in sorted(totals.items(), key=lambda item: item[1], reverse=True)}
+
+
+def is_english(text, min_share=MIN_ENGLISH_SHARE):
+    # An empty mix (short or empty text, nothing detectable) is undetermined, not non-English
+    mix = language_mix(text)
+    if not mix:
+        return True, mix
+    return mix.get("en", 0) >= min_share, mix
+
+
+def check_language(text, min_share=MIN_ENGLISH_SHARE):
+    # Raises like the old detect() check did, but keeps mostly-English judgments with Urdu passages
+    english, mix = is_english(text, min_share)
+    if not mix:
+        print("⚠️ Language undetermined (no paragraph long enough to classify), skipping the language gate")
+    elif not english:
+        raise Exception(f"Non-English content detected: {mix}")
+    return mix
+
+
+# === Batch mode over an existing data dir or corpus ===
+def classify_entry(args):
+    data_dir, filename, min_share = args
+    english, mix = is_english(read_text(data_dir, filename), min_share)
+    return filename, english, mix
+
+
+def gate_corpus(data_dir=DATA_DIR, reject_dir=NON_ENGLISH_DIR, min_share=MIN_ENGLISH_SHARE, workers=4,
+                dry_run=False):
+    """
+    Re-checks every case in data_dir and writes language_report.json into
+    reject_dir. In a plain directory, rejected files are moved to reject_dir;
+    corpora are append-only, so for them the report is the only output.
+    """
+    filenames = list_entries(data_dir, ".txt")
+    print(f"🌐 Checking language of {len(filenames)} cases with {workers} workers...")
+    tasks = [(data_dir, filename, min_share) for filename in filenames]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(classify_entry, tasks, chunksize=16))
+
+    os.makedirs(reject_dir, exist_ok=True)
+    report = {filename: {"english": english, "mix": mix} for filename, english, mix in results}
+    with open(os.path.join(reject_dir, "language_report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    rejected = [filename for filename, english, _ in results if not english]
+    for filename in rejected:
+        print(f"🚫 Non-English: {filename} {report[filename]['mix']}")
+        if not dry_run and not is_corpus(data_dir):
+            shutil.move(os.path.join(data_dir, filename), os.path.join(reject_dir, filename))
+
+    print(f"✅ Language check done. Rejected {len(rejected)} of {len(results)} cases.")
+    return report
@@ -1,15 +1,73 @@
 import os
+import json
 from collections import defaultdict
 from pathlib import Path
 from send2trash import send2trash
 from difflib import SequenceMatcher
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from extractor.near_duplicates import JACCARD_THRESHOLD, minhash_signature, build_lsh_index, duplicate_clusters
+from extractor.dedup_index import incremental_dedup
+from extractor.sparse_similarity import COSINE_THRESHOLD, sparse_deduper
 
-def deduper():
+DUPLICATE_REPORT_PATH = "D:/LegalMorph/duplicate_clusters.json"
+
+
+def minhash_deduper(directory, threshold=JACCARD_THRESHOLD, report_path=DUPLICATE_REPORT_PATH, dry_run=False):
+    """
+    Content-based dedup over the whole directory: MinHash signatures + LSH find
+    near-duplicate clusters regardless of file name. In each cluster the oldest
+    file is kept and the rest are sent to trash. Clusters are written to
+    report_path.
+    """
+    filepaths = {f.name: f for f in Path(directory).glob("*.txt")}
+    print(f"🔏 Computing MinHash signatures for {len(filepaths)} files...")
+    signatures = {}
+    for name, filepath in filepaths.items():
+        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+            signatures[name] = minhash_signature(f.read())
+
+    index = build_lsh_index(signatures, threshold)
+    clusters, similarities = duplicate_clusters(index)
+    print(f"🧩 Found {len(clusters)} duplicate clusters (LSH bands={index['bands']}, rows={index['rows']})")
+
+    report = []
+    for members in clusters:
+        members = sorted(members, key=lambda name: os.path.getmtime(filepaths[name]))
+        keep, duplicates = members[0], members[1:]
+        report.append({
+            "keep": keep,
+            "duplicates": duplicates,
+            "pairs": [{"files": list(pair), "jaccard": round(sim, 3)} for pair, sim in similarities.items()
+                      if pair[0] in members and pair[1] in members]
+        })
+        print(f"\n🔍 Cluster: keeping {keep}")
+        for name in duplicates:
+            print(f"🗑️ Sending to trash: {name}")
+            if not dry_run:
+                send2trash(str(filepaths[name]))
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"📝 Duplicate report saved to {report_path}")
+    return report
+
+
+def deduper(method="incremental", threshold=JACCARD_THRESHOLD):
     # Set the directory containing .txt files
     directory = Path("D:\LegalMorph\data")
 
+    if method == "incremental":
+        # Only cases added or changed since the last run are signed and looked up
+        return incremental_dedup(directory, threshold=threshold)
+    if method == "minhash":
+        return minhash_deduper(directory, threshold)
+    if method == "sparse":
+        # Cosine threshold on TF-IDF vectors, not Jaccard, so it has its own default
+        return sparse_deduper(directory, COSINE_THRESHOLD)
+
+    # method="name": original name-grouped TF-IDF comparison
+
     # Thresholds
     NAME_SIMILARITY_THRESHOLD = 0.85
     CONTENT_SIMILARITY_THRESHOLD = 0.75
@@ -1,5 +1,6 @@
 from extractor.scraper import scrape_cases_from_eastlaw
 from extractor.legal_deduper import deduper
-def extractor(case_limit):
-    scrape_cases_from_eastlaw(case_limit)
+def extractor(case_limit, workers=1, fetch_mode="browser", lean=False, api_url_template=None):
+    scrape_cases_from_eastlaw(case_limit, workers=workers, fetch_mode=fetch_mode, lean=lean,
+                              api_url_template=api_url_template)
     deduper()
\ No newline at end of file
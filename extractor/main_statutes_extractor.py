@@ -1,7 +1,7 @@
 from extractor.scraper_statutes import scrape_statutes
 
-def run_statute_scraper(limit):
-    scrape_statutes(statute_limit=limit)
+def run_statute_scraper(limit, lean=False):
+    scrape_statutes(statute_limit=limit, lean=lean)
 
 # if __name__ == "__main__":
 #     run_statute_scraper()
\ No newline at end of file
@@ -0,0 +1,132 @@
+import zlib
+import numpy as np
+from collections import defaultdict
+from extractor.raw_store import normalize_for_hash
+
+# === MinHash / LSH near-duplicate detection ===
+# Each document becomes a set of word shingles, the set is summarised by a
+# MinHash signature, and LSH banding puts documents whose signatures agree on a
+# whole band into the same bucket. Only documents sharing a bucket are compared,
+# so retrieval is roughly linear in the corpus size instead of quadratic.
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+JACCARD_THRESHOLD = 0.8
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+SEED = 1
+
+_generator = np.random.RandomState(SEED)
+PERMUTATIONS = (
+    _generator.randint(1, int(MERSENNE_PRIME), size=NUM_PERM, dtype=np.uint64),
+    _generator.randint(0, int(MERSENNE_PRIME), size=NUM_PERM, dtype=np.uint64),
+)
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    words = normalize_for_hash(text).split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(text, num_perm=NUM_PERM):
+    shingle_set = shingles(text)
+    if not shingle_set:
+        return np.full(num_perm, MAX_HASH, dtype=np.uint64)
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingle_set), dtype=np.uint64,
+                         count=len(shingle_set))
+    a, b = PERMUTATIONS[0][:num_perm], PERMUTATIONS[1][:num_perm]
+    # (a * h + b) mod p, truncated to 32 bits, for every permutation at once
+    permuted = np.bitwise_and((np.outer(hashes, a) + b) % MERSENNE_PRIME, MAX_HASH)
+    return permuted.min(axis=0)
+
+
+def estimated_jaccard(signature1, signature2):
+    return float(np.count_nonzero(signature1 == signature2)) / len(signature1)
+
+
+def lsh_params(threshold=JACCARD_THRESHOLD, num_perm=NUM_PERM):
+    """
+    Picks (bands, rows) with bands * rows <= num_perm whose S-curve threshold
+    (1 / bands) ** (1 / rows) is closest to the requested Jaccard threshold.
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        curve_threshold = (1.0 / bands) ** (1.0 / rows)
+        distance = abs(curve_threshold - threshold)
+        if best is None or distance < best[0]:
+            best = (distance, bands, rows)
+    return best[1], best[2]
+
+
+def band_keys(signature, bands, rows):
+    return [signature[band * rows:(band + 1) * rows].tobytes() for band in range(bands)]
+
+
+def build_lsh_index(signatures, threshold=JACCARD_THRESHOLD, num_perm=NUM_PERM):
+    bands, rows = lsh_params(threshold, num_perm)
+    index = {"bands": bands, "rows": rows, "threshold": threshold, "signatures": {},
+             "buckets": [defaultdict(list) for _ in range(bands)]}
+    for doc_id, signature in signatures.items():
+        add_to_index(index, doc_id, signature)
+    return index
+
+
+def add_to_index(index, doc_id, signature):
+    index["signatures"][doc_id] = signature
+    for band, key in enumerate(band_keys(signature, index["bands"], index["rows"])):
+        index["buckets"][band][key].append(doc_id)
+
+
+def query_index(index, signature, exclude=None):
+    # Documents sharing at least one band with the signature and above the Jaccard threshold
+    candidates = set()
+    for band, key in enumerate(band_keys(signature, index["bands"], index["rows"])):
+        candidates.update(index["buckets"][band].get(key, ()))
+    candidates.discard(exclude)
+    return sorted(
+        (doc_id, estimated_jaccard(signature, index["signatures"][doc_id])) for doc_id in candidates
+        if estimated_jaccard(signature, index["signatures"][doc_id]) >= index["threshold"]
+    )
+
+
+def candidate_pairs(index):
+    pairs = set()
+    for buckets in index["buckets"]:
+        for doc_ids in buckets.values():
+            if len(doc_ids) < 2:
+                continue
+            for i, first in enumerate(doc_ids):
+                for second in doc_ids[i + 1:]:
+                    pairs.add((first, second) if first < second else (second, first))
+    return pairs
+
+
+def duplicate_clusters(index):
+    """
+    Verifies every LSH candidate pair against the threshold and joins the
+    survivors with union-find. Returns a list of clusters (sorted doc_id lists)
+    with more than one member, and the verified pair similarities.
+    """
+    parent = {}
+
+    def find(doc_id):
+        parent.setdefault(doc_id, doc_id)
+        while parent[doc_id] != doc_id:
+            parent[doc_id] = parent[parent[doc_id]]
+            doc_id = parent[doc_id]
+        return doc_id
+
+    similarities = {}
+    signatures = index["signatures"]
+    for first, second in candidate_pairs(index):
+        similarity = estimated_jaccard(signatures[first], signatures[second])
+        if similarity >= index["threshold"]:
+            similarities[(first, second)] = similarity
+            parent[find(first)] = find(second)
+
+    clusters = defaultdict(list)
+    for doc_id in list(parent):
+        clusters[find(doc_id)].append(doc_id)
+    return [sorted(members) for members in clusters.values() if len(members) > 1], similarities
@@ -0,0 +1,220 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+DATA_DIR = "D:/LegalMorph/data"
+RAW_INDEX_PATH = "D:/LegalMorph/raw_index.db"
+# A case's stable id is the prefix of its normalized content hash, fixed at scrape time. Every
+# transform stage stamps it into its JSON as "case_id" and the loader uses it as the Mongo _id.
+CASE_ID_KEY = "case_id"
+CASE_ID_LENGTH = 16
+
+_lock = threading.Lock()
+_connections = {}
+
+
+def normalize_for_hash(text):
+    # Case, punctuation and whitespace differences between scrapes of the same judgment must not change the hash
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def content_hash(text):
+    return hashlib.sha256(normalize_for_hash(text).encode("utf-8")).hexdigest()
+
+
+def case_id_from_hash(digest):
+    return digest[:CASE_ID_LENGTH]
+
+
+def text_case_id(text):
+    return case_id_from_hash(content_hash(text))
+
+
+def with_case_id(data, case_id):
+    # case_id goes first so it is visible at the top of every stage's JSON
+    if not isinstance(data, dict):
+        return data
+    return {CASE_ID_KEY: case_id, **{key: value for key, value in data.items() if key != CASE_ID_KEY}}
+
+
+def safe_filename(title):
+    # ✅ Sanitize title to make it a valid filename
+    return re.sub(r'[\\/*?:"<>|\r\n]', "_", title).strip()
+
+
+def open_raw_index(index_path=RAW_INDEX_PATH):
+    # Shared by the scraper threads; every use is serialised by _lock
+    conn = sqlite3.connect(index_path, check_same_thread=False)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS documents (
+            content_hash TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            title TEXT NOT NULL,
+            source_section TEXT,
+            judge TEXT,
+            court TEXT,
+            source_url TEXT,
+            char_count INTEGER,
+            scraped_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS titles (
+            title TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL
+        )
+    """)
+    # Every other place a stored judgment was reached from (another section, judge or court)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sources (
+            content_hash TEXT NOT NULL,
+            title TEXT NOT NULL,
+            source_section TEXT,
+            judge TEXT,
+            court TEXT,
+            source_url TEXT,
+            scraped_at TEXT NOT NULL
+        )
+    """)
+    # IFNULL because UNIQUE treats NULLs as distinct and a section has no judge or court
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS sources_unique ON sources
+        (content_hash, title, IFNULL(source_section, ''), IFNULL(judge, ''), IFNULL(court, ''))
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.commit()
+    return conn
+
+
+def backfill_raw_index(conn, data_dir=DATA_DIR):
+    """
+    One-time import of the files already in data/ (scraped before the index
+    existed), so a re-scrape of an old case is recognised as a duplicate.
+    """
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'backfilled'").fetchone():
+        return
+    added = 0
+    if os.path.isdir(data_dir):
+        for filename in sorted(os.listdir(data_dir)):
+            if not filename.lower().endswith(".txt"):
+                continue
+            if conn.execute("SELECT 1 FROM documents WHERE filename = ?", (filename,)).fetchone():
+                continue
+            with open(os.path.join(data_dir, filename), "r", encoding="utf-8") as f:
+                text = f.read()
+            digest = content_hash(text)
+            title = filename[:-len(".txt")]
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO documents (content_hash, filename, title, char_count, scraped_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (digest, filename, title, len(text), time.strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            conn.execute("INSERT OR IGNORE INTO titles (title, content_hash) VALUES (?, ?)", (title, digest))
+            added += cursor.rowcount
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('backfilled', ?)", (time.strftime('%Y-%m-%d %H:%M:%S'),))
+    conn.commit()
+    print(f"🗂️ Raw index backfilled with {added} existing case files from {data_dir}")
+
+
+def raw_index(index_path=RAW_INDEX_PATH, data_dir=DATA_DIR):
+    # One connection per store, opened (and backfilled) on first use; callers hold _lock
+    if index_path not in _connections:
+        conn = open_raw_index(index_path)
+        backfill_raw_index(conn, data_dir)
+        _connections[index_path] = conn
+    return _connections[index_path]
+
+
+def title_known(title, data_dir=DATA_DIR, index_path=RAW_INDEX_PATH):
+    with _lock:
+        conn = raw_index(index_path, data_dir)
+        return conn.execute("SELECT 1 FROM titles WHERE title = ?", (title,)).fetchone() is not None
+
+
+def store_case_text(title, text, metadata=None, data_dir=DATA_DIR, index_path=RAW_INDEX_PATH):
+    """
+    Writes a scraped case into the raw store keyed by its normalized content hash.
+    An exact duplicate (same judgment reached through Judgments, judges or courts,
+    possibly under a different title) is not written again; its title is added
+    to the title -> hash index and where it was reached from to its sources.
+    Returns (file_path, content_hash, is_new).
+    """
+    metadata = metadata or {}
+    digest = content_hash(text)
+    os.makedirs(data_dir, exist_ok=True)
+
+    with _lock:
+        conn = raw_index(index_path, data_dir)
+        # The connection is shared, so a failed write must not leave its transaction open
+        try:
+            existing = conn.execute(
+                "SELECT filename FROM documents WHERE content_hash = ?", (digest,)
+            ).fetchone()
+            if existing:
+                conn.execute("INSERT OR REPLACE INTO titles (title, content_hash) VALUES (?, ?)", (title, digest))
+                conn.execute(
+                    "INSERT OR IGNORE INTO sources (content_hash, title, source_section, judge, court, source_url, "
+                    "scraped_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (digest, title, metadata.get("source_section"), metadata.get("judge"), metadata.get("court"),
+                     metadata.get("source_url"), time.strftime('%Y-%m-%d %H:%M:%S'))
+                )
+                conn.commit()
+                print(f"♻️ Duplicate skipped: '{title}' is identical to {existing[0]} (source recorded)")
+                return os.path.join(data_dir, existing[0]), digest, False
+
+            filename = f"{safe_filename(title)}.txt"
+            clash = conn.execute("SELECT 1 FROM documents WHERE filename = ?", (filename,)).fetchone()
+            if clash:
+                # Same title, different judgment: keep both instead of clobbering the first one
+                filename = f"{safe_filename(title)} [{digest[:8]}].txt"
+
+            file_path = os.path.join(data_dir, filename)
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(text)
+
+            conn.execute(
+                "INSERT INTO documents (content_hash, filename, title, source_section, judge, court, source_url, "
+                "char_count, scraped_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (digest, filename, title, metadata.get("source_section"), metadata.get("judge"),
+                 metadata.get("court"), metadata.get("source_url"), len(text), time.strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            conn.execute("INSERT OR REPLACE INTO titles (title, content_hash) VALUES (?, ?)", (title, digest))
+            conn.commit()
+            return file_path, digest, True
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def filename_case_id(filename, index_path=RAW_INDEX_PATH):
+    # Case id of a stored raw file, for stage outputs (e.g. summaries) that no longer hash to it
+    if not os.path.exists(index_path):
+        return None
+    with _lock:
+        row = raw_index(index_path).execute(
+            "SELECT content_hash FROM documents WHERE filename = ?", (filename,)
+        ).fetchone()
+    return case_id_from_hash(row[0]) if row else None
+
+
+def rows_as_dicts(cursor):
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def document_metadata(digest, index_path=RAW_INDEX_PATH):
+    with _lock:
+        conn = raw_index(index_path)
+        rows = rows_as_dicts(conn.execute("SELECT * FROM documents WHERE content_hash = ?", (digest,)))
+        if not rows:
+            return None
+        sources = rows_as_dicts(conn.execute("SELECT * FROM sources WHERE content_hash = ? ORDER BY scraped_at",
+                                             (digest,)))
+    return dict(rows[0], sources=sources)
+
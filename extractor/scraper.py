@@ -1,61 +1,198 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import StaleElementReferenceException
 from extractor.text_cleaner import extract_clean_text_from_html
-import time
+from extractor.browser import create_driver, LEAN_PROFILE_DIR
+from extractor.raw_store import DATA_DIR, safe_filename, store_case_text, title_known, case_id_from_hash
+from extractor.crawl_frontier import open_frontier, is_done, mark_done, frontier_summary, complete_run
+from extractor.waits import (
+    timed_wait, wait_for_network_idle, wait_for_stable_count, install_network_tracker, configure_waits,
+    print_wait_profile, network_mark
+)
 import traceback
-import re
 import os
 
-def extract_case_data(driver, title, index):
-    WebDriverWait(driver, 10).until(lambda d: len(d.window_handles) > 1)
-    driver.switch_to.window(driver.window_handles[1])
-
-    WebDriverWait(driver, 20).until(
-        EC.presence_of_element_located(
-            (By.XPATH, "//p[contains(@class, 'text-2xl') and contains(@class, 'font-bold')]")
-        )
-    )
+def case_file_path(title, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"{safe_filename(title)}.txt")
 
-    html = driver.page_source
-    text = extract_clean_text_from_html(html)
 
-    # ✅ Sanitize title to make it a valid filename
-    safe_title = re.sub(r'[\\/*?:"<>|\r\n]', "_", title).strip()
-    filename = f"{safe_title}.txt"
+def case_already_scraped(frontier, title):
+    return is_done(frontier, "case", title) or title_known(title) or os.path.exists(case_file_path(title))
 
-    # ✅ Define full path inside data directory
-    data_dir = "D:/LegalMorph/data"  # or just "data" if it's relative
-    os.makedirs(data_dir, exist_ok=True)
-    file_path = os.path.join(data_dir, filename)
 
+def save_case_text(title, text, metadata=None):
+    # ✅ Content-addressed raw store: exact duplicates are detected here instead of by the deduper
     try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(text)
-        print(f"✅ Saved: {file_path}")
+        file_path, digest, is_new = store_case_text(title, text, metadata)
+        if is_new:
+            print(f"✅ Saved: {file_path} (case_id {case_id_from_hash(digest)})")
+        return file_path
     except Exception as e:
         print(f"⚠️ Failed to save file for '{title}': {e}")
+        return None
+
+
+def extract_case_data(driver, title, index, metadata=None):
+    timed_wait(driver, "case_window", lambda d: len(d.window_handles) > 1)
+    driver.switch_to.window(driver.window_handles[1])
+
+    timed_wait(driver, "case_render", EC.presence_of_element_located(
+        (By.XPATH, "//p[contains(@class, 'text-2xl') and contains(@class, 'font-bold')]")
+    ))
+
+    html = driver.page_source
+    text = extract_clean_text_from_html(html)
+    save_case_text(title, text, dict(metadata or {}, source_url=driver.current_url))
 
     driver.close()
     driver.switch_to.window(driver.window_handles[0])
-    time.sleep(2)
 
 
+# === Shared navigation helpers (used by the sequential crawl and the worker pool) ===
+CASE_ICON_XPATH = "//div[contains(@aria-label, 'vs')]/div[contains(@class, 'action')]"
+OPTION_XPATH = "//li[@role='option']"
+JUDGE_DROPDOWN_XPATH = "//input[@placeholder='Select Judge']/following-sibling::div//button[@aria-label='Open']"
+PROFILE_DROPDOWN_XPATH = "//input[@placeholder='Select Profile']/following::button[@aria-label='Open']"
+COURT_DROPDOWN_XPATH = "//input[@placeholder='Select Court']/following-sibling::div//button[@aria-label='Open']"
 
-def scrape_cases_from_eastlaw(case_limit):
-    domain = "eastlaw.pk"
-    options = Options()
-    options.add_experimental_option("detach", True)
-    driver = webdriver.Chrome(options=options)
 
+def click_sidebar_item(driver, keyword):
+    xpath_variants = [
+        f"//p[contains(text(), '{keyword}')]",
+        f"//*[contains(text(), '{keyword}')]",
+        f"//*[@aria-label='{keyword}']"
+    ]
+    for xpath in xpath_variants:
+        for el in driver.find_elements(By.XPATH, xpath):
+            try:
+                mark = network_mark(driver)
+                driver.execute_script("arguments[0].click();", el)
+                wait_for_network_idle(driver, "sidebar_click", mark=mark)
+                print(f"✅ Clicked on: {keyword}")
+                return True
+            except:
+                continue
+    return False
+
+
+def open_dropdown(driver, button_xpath, timeout=None):
+    button = timed_wait(driver, "dropdown_open", EC.element_to_be_clickable((By.XPATH, button_xpath)), timeout)
+    driver.execute_script("arguments[0].click();", button)
+    return wait_for_stable_count(driver, "dropdown_open", By.XPATH, OPTION_XPATH, timeout, required=True)
+
+
+def list_dropdown_options(driver, button_xpath, timeout=None):
+    names = [item.text.strip() for item in open_dropdown(driver, button_xpath, timeout)]
+    # Close the listbox again so the next dropdown can be opened
+    driver.switch_to.active_element.send_keys(Keys.ESCAPE)
+    return names
+
+
+def select_dropdown_option(driver, button_xpath, option_name, timeout=None):
+    for item in open_dropdown(driver, button_xpath, timeout):
+        if item.text.strip() == option_name:
+            mark = network_mark(driver)
+            driver.execute_script("arguments[0].click();", item)
+            wait_for_network_idle(driver, "option_select", mark=mark)
+            return True
+    print(f"❌ Option not found in dropdown: {option_name}")
+    return False
+
+
+def wait_until_enabled(driver, input_xpath, timeout=None):
+    return bool(timed_wait(
+        driver, "profile_enabled",
+        lambda d: not d.find_element(By.XPATH, input_xpath).get_attribute("disabled"),
+        timeout, required=False
+    ))
+
+
+def scrape_tab(driver, tab_name, case_limit, frontier=None, scope=(), metadata=None):
+    if is_done(frontier, "tab", *scope, tab_name):
+        print(f"⏭️ Tab already done: {' | '.join(scope + (tab_name,))}")
+        return 0, True
+    print(f"\n🗂️ Scraping tab: {tab_name}")
+    tab = timed_wait(driver, "tab_switch",
+                     EC.element_to_be_clickable((By.XPATH, f"//span[normalize-space(text())='{tab_name}']")))
+    mark = network_mark(driver)
+    driver.execute_script("arguments[0].click();", tab)
+    wait_for_network_idle(driver, "tab_switch", mark=mark)
+    wait_for_stable_count(driver, "case_list_settle", By.XPATH, CASE_ICON_XPATH)
+    scraped_count, complete = scrape_listed_cases(driver, case_limit, frontier, metadata)
+    if complete:
+        mark_done(frontier, "tab", *scope, tab_name)
+    return scraped_count, complete
+
+
+def scrape_listed_cases(driver, case_limit, frontier=None, metadata=None):
+    """
+    Scrapes up to case_limit listed cases. Returns (scraped, complete); the
+    list is only complete if it was not cut short by case_limit and no case
+    failed, and only then may the caller mark its unit done.
+    """
+    case_elements = driver.find_elements(By.XPATH, CASE_ICON_XPATH)
+    if not case_elements:
+        print("No case data found under this tab")
+
+    scraped_count = 0
+    complete = len(case_elements) <= case_limit
+    for icon in case_elements[:case_limit]:
+        try:
+            title = icon.find_element(By.XPATH, "./parent::div").get_attribute("aria-label")
+            if case_already_scraped(frontier, title):
+                print(f"⏭️ Already on disk: {title}")
+                continue
+            driver.execute_script("arguments[0].scrollIntoView();", icon)
+            driver.execute_script("arguments[0].click();", icon)
+            extract_case_data(driver, title, scraped_count, metadata)
+            mark_done(frontier, "case", title)
+            scraped_count += 1
+        except Exception as e:
+            complete = False
+            print(f"⚠️ Skipped case due to error: {e}")
+            traceback.print_exc()
+            if len(driver.window_handles) > 1:
+                driver.close()
+            driver.switch_to.window(driver.window_handles[0])
+    return scraped_count, complete
+
+
+def scrape_cases_from_eastlaw(case_limit, workers=1, fetch_mode="browser", api_url_template=None, resume=True,
+                              wait_timeouts=None, lean=False):
+    domain = "eastlaw.pk"
     login_url = f"https://{domain}/"
-    driver.get(login_url)
-    print("🔐 Please log in manually in the Chrome window.")
-    input("✅ After logging in completely, press ENTER to continue...")
-    time.sleep(5)
+    if lean:
+        # ✅ Lean profile: headless, resource-blocking, already logged in through login_to_profile()
+        driver = create_driver(lean=True, user_data_dir=LEAN_PROFILE_DIR)
+        driver.get(login_url)
+    else:
+        driver = create_driver(detach=True)
+        driver.get(login_url)
+        print("🔐 Please log in manually in the Chrome window.")
+        input("✅ After logging in completely, press ENTER to continue...")
+    if wait_timeouts:
+        configure_waits(**wait_timeouts)
+    install_network_tracker(driver)
+    wait_for_network_idle(driver, "after_login")
+
+    # ✅ Durable crawl frontier so a crashed run resumes where it stopped
+    frontier = open_frontier() if resume else None
+    if frontier is not None:
+        print(f"📌 Resuming crawl frontier: {frontier_summary(frontier)}")
+
+    if fetch_mode == "http":
+        # Imported here because the fetcher module builds on the helpers above
+        from extractor.http_fetcher import scrape_cases_http
+        scrape_cases_http(driver, case_limit, workers, api_url_template, frontier)
+        print_wait_profile()
+        return
+
+    if workers > 1:
+        # Imported here because the pool module builds on the helpers above
+        from extractor.scraper_pool import scrape_cases_parallel
+        scrape_cases_parallel(driver, case_limit, workers, domain, frontier)
+        print_wait_profile()
+        return
 
     print("⏳ Waiting for sidebar to load and clicking on items...")
     sidebar_keywords = ["Judgments", "judges", "courts"]
@@ -65,28 +202,11 @@ def scrape_cases_from_eastlaw(case_limit):
     for keyword in sidebar_keywords:
         if keyword in visited_sections or total_cases_scraped >= case_limit:
             continue
+        if is_done(frontier, "section", keyword):
+            print(f"⏭️ Section already done: {keyword}")
+            continue
 
-        xpath_variants = [
-            f"//p[contains(text(), '{keyword}')]",
-            f"//*[contains(text(), '{keyword}')]",
-            f"//*[@aria-label='{keyword}']"
-        ]
-        sidebar_clicked = False
-        for xpath in xpath_variants:
-            elements = driver.find_elements(By.XPATH, xpath)
-            for el in elements:
-                try:
-                    driver.execute_script("arguments[0].click();", el)
-                    time.sleep(3)
-                    print(f"✅ Clicked on: {keyword}")
-                    sidebar_clicked = True
-                    break
-                except:
-                    continue
-            if sidebar_clicked:
-                break
-
-        if not sidebar_clicked:
+        if not click_sidebar_item(driver, keyword):
             print(f"❌ Could not find or click '{keyword}' in sidebar.")
             continue
 
@@ -94,17 +214,15 @@ def scrape_cases_from_eastlaw(case_limit):
         if keyword == "Judgments" and total_cases_scraped < case_limit:
             try:
                 print("⏳ Collecting case list...")
-                cases = WebDriverWait(driver, 25).until(
-                    EC.presence_of_all_elements_located(
-                        (By.XPATH, "//div[contains(@aria-label, 'vs')]/div[contains(@class, 'action')]")
-                    )
-                )
+                cases = wait_for_stable_count(driver, "case_list", By.XPATH, CASE_ICON_XPATH, required=True)
 
-                if len(cases) < case_limit:
+                # The section is only done if case_limit did not cut the list short and no case failed
+                section_complete = len(cases) <= case_limit
+                listed = min(case_limit, len(cases))
+                if listed < case_limit:
                     print(f"⚠️ Only {len(cases)} cases found. Adjusting case_limit to {len(cases)}.")
-                    case_limit = len(cases)
 
-                for i in range(case_limit):
+                for i in range(listed):
                     try:
                         print(f"\n⏳ Processing case {i + 1}...")
 
@@ -114,505 +232,45 @@ def scrape_cases_from_eastlaw(case_limit):
 
                         icon = cases[i]
                         title = icon.find_element(By.XPATH, "./parent::div").get_attribute("aria-label")
+                        if case_already_scraped(frontier, title):
+                            print(f"⏭️ Already on disk: {title}")
+                            continue
 
                         driver.execute_script("arguments[0].scrollIntoView();", icon)
                         driver.execute_script("arguments[0].click();", icon)
-                        extract_case_data(driver, title, total_cases_scraped)
+                        extract_case_data(driver, title, total_cases_scraped, {"source_section": "Judgments"})
+                        mark_done(frontier, "case", title)
                         total_cases_scraped += 1
                     except Exception as e:
+                        section_complete = False
                         print(f"⚠️ Skipped case due to error: {e}")
                         traceback.print_exc()
                         if len(driver.window_handles) > 1:
                             driver.close()
                         driver.switch_to.window(driver.window_handles[0])
                         continue
+                if section_complete:
+                    mark_done(frontier, "section", keyword)
 
             except Exception as outer_error:
                 print(f"🚨 Unexpected issue: {outer_error}")
                 traceback.print_exc()
             total_cases_scraped = 0
 
-        elif keyword == "judges":
-            try:
-                visited_judge = set()
-                print("👩‍⚖️ Scraping Judges dropdown list...")
-
-                judge_dropdown_button = WebDriverWait(driver, 10).until(
-
-                    EC.element_to_be_clickable((By.XPATH,
-
-                                                "//input[@placeholder='Select Judge']/following-sibling::div//button[@aria-label='Open']"))
-
-                )
-
-                driver.execute_script("arguments[0].click();", judge_dropdown_button)
-
-                time.sleep(1)
-
-                judge_list_items = WebDriverWait(driver, 10).until(
-
-                    EC.presence_of_all_elements_located((By.XPATH, "//li[@role='option']"))
-
-                )
-
-                for judge_item in range(len(judge_list_items)):
-                    judge_name = ""
-                    if len(visited_judge) == 0:
-                        element = judge_list_items[judge_item]
-                        judge_name = element.text.strip()
-                        print(f"➡️ Selecting Judge: {judge_name}")
-                        driver.execute_script("arguments[0].click();", element)
-                        time.sleep(2)
-                    else:
-                        judge_dropdown_button = WebDriverWait(driver, 10).until(
-
-                            EC.element_to_be_clickable((By.XPATH,
-
-                                                        "//input[@placeholder='Select Judge']/following-sibling::div//button[@aria-label='Open']"))
-
-                        )
-
-                        driver.execute_script("arguments[0].click();", judge_dropdown_button)
-
-                        time.sleep(1)
-                        fresh_judges = WebDriverWait(driver, 10).until(
-                            EC.presence_of_all_elements_located((By.XPATH, "//li[@role='option']"))
-                        )
-                        for i in range(len(fresh_judges)):
-                            try:
-                                # REFRESH the list every time to avoid stale refs
-                                fresh_judges = WebDriverWait(driver, 10).until(
-                                    EC.presence_of_all_elements_located((By.XPATH, "//li[@role='option']"))
-                                )
-                                item = fresh_judges[i]
-                                name = item.text.strip()
-
-                                if name not in visited_judge:
-                                    print(f"➡️ Selecting Judge: {name}")
-                                    driver.execute_script("arguments[0].click();", item)
-                                    judge_name = name
-                                    visited_judge.add(name)  # ✅ Track so we don't repeat
-                                    break
-
-                            except StaleElementReferenceException:
-                                print("♻️ Stale judge element, retrying...")
-                                time.sleep(1)
-                    for _ in range(10):
-
-                        profile_input = driver.find_element(By.XPATH, "//input[@placeholder='Select Profile']")
-
-                        if not profile_input.get_attribute("disabled"):
-                            break
-
-                        time.sleep(1)
-
-                    else:
-
-                        print("❌ 'Select Profile' still disabled.")
-
-                        continue
-
-                    court_dropdown_button = WebDriverWait(driver, 10).until(
-
-                        EC.element_to_be_clickable((By.XPATH,
-
-                                                    "//input[@placeholder='Select Profile']/following::button[@aria-label='Open']"))
-
-                    )
-
-                    driver.execute_script("arguments[0].click();", court_dropdown_button)
-
-                    time.sleep(1)
-
-                    court_list_items = WebDriverWait(driver, 10).until(
-                        EC.presence_of_all_elements_located((By.XPATH, "//li[@role='option']"))
-                    )
-                    visited_court = set()
-                    for court_item in range(len(court_list_items)):
-                        if len(visited_court) == 0:
-                            element = court_list_items[court_item]
-                            court_name = element.text.strip()
-                            print(f"➡️ Selecting court: {court_name}")
-                            driver.execute_script("arguments[0].click();", element)
-                            print(f"→ Exploring Judge-Court: {judge_name} | {court_name}")
-                            time.sleep(2)
-                            visited_court.add(court_name)
-                        else:
-                            court_dropdown_button = WebDriverWait(driver, 10).until(
-
-                                EC.element_to_be_clickable((By.XPATH,
-
-                                                            "//input[@placeholder='Select Profile']/following::button[@aria-label='Open']"))
-
-                            )
-
-                            driver.execute_script("arguments[0].click();", court_dropdown_button)
-
-                            time.sleep(1)
-
-                            fresh_items = WebDriverWait(driver, 10).until(
-                                EC.presence_of_all_elements_located((By.XPATH, "//li[@role='option']"))
-                            )
-                            for item in fresh_items:
-                                if item.text.strip() not in visited_court:
-                                    court_name = item.text.strip()
-                                    print(f"→ Exploring Judge-Court: {judge_name} | {court_name}")
-                                    driver.execute_script("arguments[0].click();", item)
-                                    time.sleep(2)
-                                    visited_court.add(court_name)
-                                    break
-                        # Scrape All tab
-
-                        try:
-
-                            print(f"\n🗂️ Scraping tab: All")
-
-                            tab_xpath = "//span[normalize-space(text())='All']"
-
-                            tab = WebDriverWait(driver, 15).until(
-
-                                EC.element_to_be_clickable((By.XPATH, tab_xpath))
-
-                            )
-
-                            driver.execute_script("arguments[0].click();", tab)
-
-                            time.sleep(10)
-
-                            case_elements = driver.find_elements(By.XPATH,
-
-                                                                 "//div[contains(@aria-label, 'vs')]/div[contains(@class, 'action')]")
-
-                            scraped_count = 0
-                            limiter = case_limit
-                            if limiter > len(case_elements):
-                                limiter = len(case_elements)
-                                if limiter == 0:
-                                    print("No case data found under this tab")
-                            for icon in case_elements:
-                                if scraped_count >= limiter:
-                                    break
-
-                                try:
-
-                                    title = icon.find_element(By.XPATH, "./parent::div").get_attribute("aria-label")
-
-                                    driver.execute_script("arguments[0].scrollIntoView();", icon)
-
-                                    driver.execute_script("arguments[0].click();", icon)
-
-                                    extract_case_data(driver, title, scraped_count)
-
-                                    scraped_count += 1
-
-                                except Exception as e:
-
-                                    print(f"⚠️ Skipped case due to error: {e}")
-
-                                    traceback.print_exc()
-
-                                    if len(driver.window_handles) > 1:
-                                        driver.close()
-
-                                    driver.switch_to.window(driver.window_handles[0])
-
-                        except Exception as e:
-
-                            print(f"⚠️ Failed to process 'All' tab: {e}")
-
-                        # Scrape Single Bench
-
-                        try:
-
-                            print(f"\n🗂️ Scraping tab: Single Bench")
-
-                            tab_xpath = "//span[normalize-space(text())='Single Bench']"
-
-                            tab = WebDriverWait(driver, 15).until(
-
-                                EC.element_to_be_clickable((By.XPATH, tab_xpath))
-
-                            )
-
-                            driver.execute_script("arguments[0].click();", tab)
-
-                            time.sleep(10)
-
-                            case_elements = driver.find_elements(By.XPATH,
-
-                                                                 "//div[contains(@aria-label, 'vs')]/div[contains(@class, 'action')]")
-
-                            scraped_count = 0
-                            limiter = case_limit
-                            if limiter > len(case_elements):
-                                limiter = len(case_elements)
-                                if limiter == 0:
-                                    print("No case data found under this tab")
-                            for icon in case_elements:
-                                if scraped_count >= limiter:
-                                    break
-
-                                try:
-
-                                    title = icon.find_element(By.XPATH, "./parent::div").get_attribute("aria-label")
-
-                                    driver.execute_script("arguments[0].scrollIntoView();", icon)
-
-                                    driver.execute_script("arguments[0].click();", icon)
-
-                                    extract_case_data(driver, title, scraped_count)
-
-                                    scraped_count += 1
-
-                                except Exception as e:
-
-                                    print(f"⚠️ Skipped case due to error: {e}")
-
-                                    traceback.print_exc()
-
-                                    if len(driver.window_handles) > 1:
-                                        driver.close()
-
-                                    driver.switch_to.window(driver.window_handles[0])
-
-                        except Exception as e:
-
-                            print(f"⚠️ Failed to process 'Single Bench' tab: {e}")
-
-                        # Placeholder for Large Bench routing
-
-                        try:
-
-                            print(f"\n🗂️ Skipping 'D.B. or Larger Bench' for now (placeholder)")
-
-                        except Exception as e:
-
-                            print(f"⚠️ Failed to process 'D.B. or Larger Bench' tab: {e}")
-
-
-                        try:
-
-                            all_tab_xpath = "//span[normalize-space(text())='All']"
-
-                            all_tab = WebDriverWait(driver, 5).until(
-
-                                EC.element_to_be_clickable((By.XPATH, all_tab_xpath))
-
-                            )
-
-                            driver.execute_script("arguments[0].click();", all_tab)
-
-                            time.sleep(15)
-
-                        except:
-
-                            print("⚠️ Failed to return to All tab.")
-
-                    visited_judge.add(judge_name)
-            except Exception as e:
-
-                print(f"⚠️ Judges section failed: {e}")
-
-                traceback.print_exc()
-
-
-        elif keyword == "courts":
-
+        elif keyword in ("judges", "courts"):
+            # Same pair discovery and per-pair scraping as the worker pool, on the logged-in driver
+            from extractor.scraper_pool import discover_judge_court_pairs, discover_court_judge_pairs, scrape_targets
+            discover = discover_judge_court_pairs if keyword == "judges" else discover_court_judge_pairs
             try:
-
-                visited_courts = set()
-                court_name = ""
-
-                print("🏛️ Scraping Courts dropdown list...")
-
-                court_dropdown_button = WebDriverWait(driver, 10).until(
-
-                    EC.element_to_be_clickable((By.XPATH,
-
-                                                "//input[@placeholder='Select Court']/following-sibling::div//button[@aria-label='Open']"))
-
-                )
-
-                driver.execute_script("arguments[0].click();", court_dropdown_button)
-
-                time.sleep(5)
-
-                court_list_items = WebDriverWait(driver, 15).until(
-
-                    EC.presence_of_all_elements_located((By.XPATH, "//li[@role='option']"))
-
-                )
-
-                for i in range(len(court_list_items)):
-
-                    if len(visited_courts) == 0:
-
-                        element = court_list_items[i]
-
-                        court_name = element.text.strip()
-
-                        print(f"➡️ Selecting court: {court_name}")
-
-                        driver.execute_script("arguments[0].click();", element)
-
-                        time.sleep(5)
-
-                        visited_courts.add(court_name)
-
-                    else:
-
-                        court_dropdown_button = WebDriverWait(driver, 15).until(
-
-                            EC.element_to_be_clickable((By.XPATH,
-
-                                                        "//input[@placeholder='Select Court']/following::button[@aria-label='Open']"))
-
-                        )
-
-                        driver.execute_script("arguments[0].click();", court_dropdown_button)
-
-                        time.sleep(1)
-
-                        fresh_courts = WebDriverWait(driver, 15).until(
-
-                            EC.presence_of_all_elements_located((By.XPATH, "//li[@role='option']"))
-
-                        )
-
-                        for court in fresh_courts:
-
-                            name = court.text.strip()
-
-                            if name not in visited_courts:
-                                court_name = name
-
-                                driver.execute_script("arguments[0].click();", court)
-
-                                time.sleep(5)
-
-                                visited_courts.add(name)
-
-                                break
-
-                    # 🔽 Judge Dropdown after court selected
-
-                    visited_judges = set()
-                    judge_name = " "
-
-                    judge_dropdown_button = WebDriverWait(driver, 15).until(
-
-                        EC.element_to_be_clickable((By.XPATH,
-
-                                                    "//input[@placeholder='Select Judge']/following-sibling::div//button[@aria-label='Open']"))
-
-                    )
-
-                    driver.execute_script("arguments[0].click();", judge_dropdown_button)
-
-                    time.sleep(1)
-
-                    judge_list_items = WebDriverWait(driver, 15).until(
-
-                        EC.presence_of_all_elements_located((By.XPATH, "//li[@role='option']"))
-
-                    )
-
-                    for j in range(len(judge_list_items)):
-
-                        if len(visited_judges) == 0:
-
-                            element = judge_list_items[j]
-
-                            judge_name = element.text.strip()
-
-                            print(f"➡️ Selecting judge: {judge_name}")
-
-                            driver.execute_script("arguments[0].click();", element)
-
-                            visited_judges.add(judge_name)
-
-                            time.sleep(5)
-
-                        else:
-
-                            judge_dropdown_button = WebDriverWait(driver, 15).until(
-
-                                EC.element_to_be_clickable((By.XPATH,
-
-                                                            "//input[@placeholder='Select Judge']/following::button[@aria-label='Open']"))
-
-                            )
-
-                            driver.execute_script("arguments[0].click();", judge_dropdown_button)
-
-                            time.sleep(1)
-
-                            fresh_judges = WebDriverWait(driver, 15).until(
-
-                                EC.presence_of_all_elements_located((By.XPATH, "//li[@role='option']"))
-
-                            )
-
-                            for judge in fresh_judges:
-
-                                name = judge.text.strip()
-
-                                if name not in visited_judges:
-                                    judge_name = name
-
-                                    print(f"➡️ Selecting judge: {judge_name}")
-
-                                    driver.execute_script("arguments[0].click();", judge)
-
-                                    visited_judges.add(name)
-
-                                    time.sleep(5)
-
-                                    break
-
-                        # ✅ Scrape cases for this Court-Judge pair
-
-                        print(f"→ Exploring Court-Judge: {court_name} | {judge_name}")
-
-                        case_elements = driver.find_elements(By.XPATH,
-
-                                                             "//div[contains(@aria-label, 'vs')]/div[contains(@class, 'action')]"
-
-                                                             )
-
-                        if not case_elements:
-                            print("⚠️ No case data found.")
-
-                            continue
-
-                        for icon in case_elements[:case_limit]:
-
-                            try:
-
-                                title = icon.find_element(By.XPATH, "./parent::div").get_attribute("aria-label")
-
-                                driver.execute_script("arguments[0].scrollIntoView();", icon)
-
-                                driver.execute_script("arguments[0].click();", icon)
-
-                                extract_case_data(driver, title, case_limit)
-
-                            except Exception as e:
-
-                                print(f"⚠️ Skipped case due to error: {e}")
-
-                                traceback.print_exc()
-
-                                if len(driver.window_handles) > 1:
-                                    driver.close()
-
-                                driver.switch_to.window(driver.window_handles[0])
-
-
+                targets = discover(driver)
+                scrape_targets(driver, targets, domain, case_limit, frontier)
+                if all(is_done(frontier, "pair", *target) for target in targets):
+                    mark_done(frontier, "section", keyword)
             except Exception as e:
-
-                print(f"⚠️ Courts section failed: {e}")
-
+                print(f"⚠️ {keyword.capitalize()} section failed: {e}")
                 traceback.print_exc()
 
+    if all(is_done(frontier, "section", keyword) for keyword in sidebar_keywords):
+        complete_run(frontier)
     print("\n🎯 Scraping finished.")
+    print_wait_profile()
@@ -0,0 +1,250 @@
+from selenium.webdriver.common.by import By
+from concurrent.futures import ThreadPoolExecutor
+from extractor.scraper import (
+    CASE_ICON_XPATH, JUDGE_DROPDOWN_XPATH, PROFILE_DROPDOWN_XPATH, COURT_DROPDOWN_XPATH,
+    click_sidebar_item, list_dropdown_options, select_dropdown_option, wait_until_enabled,
+    scrape_tab, scrape_listed_cases, extract_case_data, case_already_scraped
+)
+from extractor.browser import create_driver
+from extractor.crawl_frontier import is_done, mark_done, complete_run
+from extractor.waits import install_network_tracker, wait_for_network_idle, wait_for_stable_count
+import queue
+import traceback
+
+
+# === Session sharing ===
+def export_session_state(driver):
+    """
+    Exports cookies and localStorage from the manually logged-in driver so
+    headless workers can reuse the same authenticated session.
+    """
+    cookies = driver.get_cookies()
+    local_storage = driver.execute_script(
+        "const items = {};"
+        "for (let i = 0; i < window.localStorage.length; i++) {"
+        "  const key = window.localStorage.key(i);"
+        "  items[key] = window.localStorage.getItem(key);"
+        "}"
+        "return items;"
+    )
+    print(f"🍪 Exported {len(cookies)} cookies and {len(local_storage)} localStorage items")
+    return {"cookies": cookies, "local_storage": local_storage}
+
+
+def create_worker_driver(session_state, domain, headless=True):
+    # Workers always use the lean profile; the session comes from the exported state, not a user-data-dir
+    driver = create_driver(lean=True, headless=headless)
+
+    # Cookies can only be set for the domain that is currently loaded
+    home_url = f"https://{domain}/"
+    driver.get(home_url)
+    for cookie in session_state["cookies"]:
+        try:
+            driver.add_cookie(cookie)
+        except Exception as e:
+            print(f"⚠️ Could not set cookie '{cookie.get('name')}': {e}")
+    driver.execute_script(
+        "for (const [key, value] of Object.entries(arguments[0])) {"
+        "  window.localStorage.setItem(key, value);"
+        "}",
+        session_state["local_storage"]
+    )
+    install_network_tracker(driver)
+    driver.get(home_url)
+    wait_for_network_idle(driver, "after_login")
+    return driver
+
+
+# === Target discovery (runs once on the logged-in driver) ===
+def discover_judgment_positions(driver, case_limit):
+    """
+    Returns (targets, complete): the list positions to scrape, and whether
+    they cover the whole Judgments list (False when case_limit cut it short).
+    """
+    if not click_sidebar_item(driver, "Judgments"):
+        print("❌ Could not find or click 'Judgments' in sidebar.")
+        return [], False
+    cases = wait_for_stable_count(driver, "case_list", By.XPATH, CASE_ICON_XPATH, required=True)
+    return [("Judgments", position) for position in range(min(case_limit, len(cases)))], len(cases) <= case_limit
+
+
+def discover_judge_court_pairs(driver):
+    if not click_sidebar_item(driver, "judges"):
+        print("❌ Could not find or click 'judges' in sidebar.")
+        return []
+    pairs = []
+    for judge_name in list_dropdown_options(driver, JUDGE_DROPDOWN_XPATH):
+        if not select_dropdown_option(driver, JUDGE_DROPDOWN_XPATH, judge_name):
+            continue
+        if not wait_until_enabled(driver, "//input[@placeholder='Select Profile']"):
+            print(f"❌ 'Select Profile' still disabled for judge: {judge_name}")
+            continue
+        for court_name in list_dropdown_options(driver, PROFILE_DROPDOWN_XPATH):
+            pairs.append(("judges", judge_name, court_name))
+    print(f"👩‍⚖️ Discovered {len(pairs)} judge-court pairs")
+    return pairs
+
+
+def discover_court_judge_pairs(driver):
+    if not click_sidebar_item(driver, "courts"):
+        print("❌ Could not find or click 'courts' in sidebar.")
+        return []
+    pairs = []
+    for court_name in list_dropdown_options(driver, COURT_DROPDOWN_XPATH, timeout=15):
+        if not select_dropdown_option(driver, COURT_DROPDOWN_XPATH, court_name, timeout=15):
+            continue
+        for judge_name in list_dropdown_options(driver, JUDGE_DROPDOWN_XPATH, timeout=15):
+            pairs.append(("courts", court_name, judge_name))
+    print(f"🏛️ Discovered {len(pairs)} court-judge pairs")
+    return pairs
+
+
+# === Worker side ===
+def scrape_target(driver, target, domain, case_limit, frontier=None):
+    # Every target starts from the home page so a failed target cannot leak state into the next one
+    driver.get(f"https://{domain}/")
+    section = target[0]
+    if not click_sidebar_item(driver, section):
+        raise RuntimeError(f"Could not open '{section}' section")
+
+    if section == "Judgments":
+        position = target[1]
+        cases = wait_for_stable_count(driver, "case_list", By.XPATH, CASE_ICON_XPATH, required=True)
+        icon = cases[position]
+        title = icon.find_element(By.XPATH, "./parent::div").get_attribute("aria-label")
+        if case_already_scraped(frontier, title):
+            print(f"⏭️ Already on disk: {title}")
+            return 0
+        driver.execute_script("arguments[0].scrollIntoView();", icon)
+        driver.execute_script("arguments[0].click();", icon)
+        extract_case_data(driver, title, position, {"source_section": "Judgments"})
+        mark_done(frontier, "case", title)
+        return 1
+
+    if section == "judges":
+        _, judge_name, court_name = target
+        print(f"→ Exploring Judge-Court: {judge_name} | {court_name}")
+        if not select_dropdown_option(driver, JUDGE_DROPDOWN_XPATH, judge_name):
+            return 0
+        if not wait_until_enabled(driver, "//input[@placeholder='Select Profile']"):
+            print("❌ 'Select Profile' still disabled.")
+            return 0
+        if not select_dropdown_option(driver, PROFILE_DROPDOWN_XPATH, court_name):
+            return 0
+        scraped = 0
+        pair_complete = True
+        for tab_name in ["All", "Single Bench"]:
+            try:
+                tab_scraped, tab_complete = scrape_tab(
+                    driver, tab_name, case_limit, frontier=frontier, scope=(judge_name, court_name),
+                    metadata={"source_section": "judges", "judge": judge_name, "court": court_name})
+                scraped += tab_scraped
+                pair_complete = pair_complete and tab_complete
+            except Exception as e:
+                pair_complete = False
+                print(f"⚠️ Failed to process '{tab_name}' tab: {e}")
+        if pair_complete:
+            mark_done(frontier, "pair", *target)
+        return scraped
+
+    _, court_name, judge_name = target
+    print(f"→ Exploring Court-Judge: {court_name} | {judge_name}")
+    if not select_dropdown_option(driver, COURT_DROPDOWN_XPATH, court_name, timeout=15):
+        return 0
+    if not select_dropdown_option(driver, JUDGE_DROPDOWN_XPATH, judge_name, timeout=15):
+        return 0
+    # Let the judge's case list replace the previous one before reading it, as scrape_tab does
+    wait_for_stable_count(driver, "case_list_settle", By.XPATH, CASE_ICON_XPATH)
+    scraped, complete = scrape_listed_cases(driver, case_limit, frontier,
+                                            {"source_section": "courts", "court": court_name, "judge": judge_name})
+    if complete:
+        mark_done(frontier, "pair", *target)
+    return scraped
+
+
+def close_case_windows(driver):
+    # Drop any case window left open by a failed target
+    while len(driver.window_handles) > 1:
+        driver.switch_to.window(driver.window_handles[-1])
+        driver.close()
+    driver.switch_to.window(driver.window_handles[0])
+
+
+def scrape_targets(driver, targets, domain, case_limit, frontier=None):
+    """
+    Sequential counterpart of the worker pool, used by the single-driver crawl:
+    scrapes the targets one after another on the given logged-in driver.
+    """
+    scraped = 0
+    for target in targets:
+        if target[0] != "Judgments" and is_done(frontier, "pair", *target):
+            print(f"⏭️ Pair already done: {' | '.join(target)}")
+            continue
+        try:
+            scraped += scrape_target(driver, target, domain, case_limit, frontier)
+        except Exception as e:
+            print(f"⚠️ Skipped target {target}: {e}")
+            traceback.print_exc()
+            close_case_windows(driver)
+    return scraped
+
+
+def run_worker(worker_id, session_state, domain, targets, case_limit, frontier=None):
+    driver = create_worker_driver(session_state, domain)
+    scraped = 0
+    try:
+        while True:
+            try:
+                target = targets.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                print(f"🧵 Worker {worker_id} → {target}")
+                scraped += scrape_target(driver, target, domain, case_limit, frontier)
+            except Exception as e:
+                print(f"⚠️ Worker {worker_id} skipped target {target}: {e}")
+                traceback.print_exc()
+                close_case_windows(driver)
+    finally:
+        driver.quit()
+    print(f"🧵 Worker {worker_id} finished. Cases scraped: {scraped}")
+    return scraped
+
+
+def scrape_cases_parallel(driver, case_limit, workers, domain="eastlaw.pk", frontier=None):
+    """
+    Worker-pool mode for scrape_cases_from_eastlaw. The logged-in driver only
+    discovers targets (list positions and judge/court pairs); N headless workers
+    sharing its session pull targets from a common queue and scrape them.
+    Pairs already recorded in the crawl frontier are not queued again.
+    """
+    session_state = export_session_state(driver)
+
+    targets = queue.Queue()
+    judgment_targets, judgments_complete = discover_judgment_positions(driver, case_limit)
+    all_targets = (judgment_targets
+                   + discover_judge_court_pairs(driver)
+                   + discover_court_judge_pairs(driver))
+    all_targets = [t for t in all_targets if t[0] == "Judgments" or not is_done(frontier, "pair", *t)]
+    for target in all_targets:
+        targets.put(target)
+    print(f"📋 {len(all_targets)} targets queued for {workers} workers")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(run_worker, worker_id, session_state, domain, targets, case_limit, frontier)
+            for worker_id in range(workers)
+        ]
+        total_scraped = 0
+        for future in futures:
+            try:
+                total_scraped += future.result()
+            except Exception as e:
+                print(f"🚨 Worker crashed: {e}")
+                traceback.print_exc()
+
+    pairs = [target for target in all_targets if target[0] != "Judgments"]
+    if judgments_complete and all(is_done(frontier, "pair", *target) for target in pairs):
+        complete_run(frontier)
+    print(f"\n🎯 Parallel scraping finished. Total cases scraped: {total_scraped}")
+    return total_scraped
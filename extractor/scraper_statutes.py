@@ -1,6 +1,4 @@
 # ✅ Statute scraper with OCR, dynamic filename, pagination, and limit
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.action_chains import ActionChains
 import pytesseract
 from PIL import Image
@@ -10,8 +8,12 @@ import time
 import traceback
 import re
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from extractor.browser import create_driver, LEAN_PROFILE_DIR
+from extractor.waits import (
+    timed_wait, wait_for_network_idle, wait_for_canvas_ready, install_network_tracker, configure_waits, network_mark,
+    print_wait_profile
+)
 
 # ✅ Tesseract path for OCR
 pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
@@ -28,9 +30,7 @@ def extract_statute_data(driver, title, index):
     collection = db["statutes_raw_json"]
     print(f"🔍 Extracting data for statute: {title}")
     try:
-        WebDriverWait(driver, 15).until(
-            EC.presence_of_all_elements_located((By.CLASS_NAME, "react-pdf__Page"))
-        )
+        timed_wait(driver, "statute_modal", EC.presence_of_all_elements_located((By.CLASS_NAME, "react-pdf__Page")))
         pages = driver.find_elements(By.CLASS_NAME, "react-pdf__Page")
         print(f"📄 Found {len(pages)} page(s)")
 
@@ -43,7 +43,7 @@ def extract_statute_data(driver, title, index):
                 window.scrollBy(0, 100);
             """, canvas)
 
-            time.sleep(1)
+            wait_for_canvas_ready(driver, canvas)
             png_data = canvas.screenshot_as_png
             image = Image.open(BytesIO(png_data))
             text = pytesseract.image_to_string(image)
@@ -66,7 +66,8 @@ def extract_statute_data(driver, title, index):
         except Exception as e:
             print(f"⚠️ Error clicking close icon: {e}")
 
-        time.sleep(1)
+        timed_wait(driver, "statute_modal_close",
+                   EC.invisibility_of_element_located((By.CLASS_NAME, "react-pdf__Page")), required=False)
 
     except Exception as e:
         print(f"❌ Error extracting statute: {e}")
@@ -74,33 +75,37 @@ def extract_statute_data(driver, title, index):
 
 
 # ✅ Main scraping function with pagination and limit
-def scrape_statutes(statute_limit=100):
+def scrape_statutes(statute_limit=100, wait_timeouts=None, lean=False):
     domain = "eastlaw.pk"
-    options = Options()
-    options.add_experimental_option("detach", True)
-    driver = webdriver.Chrome(options=options)
-
     login_url = f"https://{domain}/"
-    driver.get(login_url)
-    print("🔐 Please log in manually in the Chrome window.")
-    input("✅ After logging in completely, press ENTER to continue...")
-    time.sleep(5)
+    if lean:
+        # ✅ Lean profile: headless, resource-blocking, already logged in through login_to_profile()
+        driver = create_driver(lean=True, user_data_dir=LEAN_PROFILE_DIR)
+        driver.get(login_url)
+    else:
+        driver = create_driver(detach=True)
+        driver.get(login_url)
+        print("🔐 Please log in manually in the Chrome window.")
+        input("✅ After logging in completely, press ENTER to continue...")
+    if wait_timeouts:
+        configure_waits(**wait_timeouts)
+    install_network_tracker(driver)
+    wait_for_network_idle(driver, "after_login")
 
     scraped_count = 0
     try:
         # Navigate to Statutes
         statutes_xpath = "//p[contains(text(), 'Statutes') or contains(text(), 'statutes')]"
-        statutes_element = WebDriverWait(driver, 20).until(
-            EC.element_to_be_clickable((By.XPATH, statutes_xpath))
-        )
+        statutes_element = timed_wait(driver, "sidebar_click", EC.element_to_be_clickable((By.XPATH, statutes_xpath)),
+                                      timeout=20)
+        mark = network_mark(driver)
         driver.execute_script("arguments[0].click();", statutes_element)
-        time.sleep(5)
+        wait_for_network_idle(driver, "sidebar_click", mark=mark)
         print("📚 Statutes section loaded")
 
         while scraped_count < statute_limit:
-            statute_rows = WebDriverWait(driver, 15).until(
-                EC.presence_of_all_elements_located((By.XPATH, "//table//tr[td]"))
-            )
+            statute_rows = timed_wait(driver, "statute_rows",
+                                      EC.presence_of_all_elements_located((By.XPATH, "//table//tr[td]")))
 
             for index, row in enumerate(statute_rows):
                 if scraped_count >= statute_limit:
@@ -108,11 +113,10 @@ def scrape_statutes(statute_limit=100):
                 try:
                     driver.execute_script("arguments[0].scrollIntoView();", row)
                     ActionChains(driver).move_to_element(row).perform()
-                    time.sleep(1)
 
                     title = row.find_element(By.XPATH, "./td[2]").text
-                    view_doc_button = row.find_element(By.XPATH,
-                        ".//button[contains(text(), 'View Document') or contains(@class, 'view-document')]")
+                    view_doc_button = timed_wait(driver, "statute_rows", lambda d: row.find_element(By.XPATH,
+                        ".//button[contains(text(), 'View Document') or contains(@class, 'view-document')]"))
                     driver.execute_script("arguments[0].click();", view_doc_button)
 
                     extract_statute_data(driver, title, index)
@@ -130,7 +134,8 @@ def scrape_statutes(statute_limit=100):
                         print("🚫 No more pages available.")
                         break
                     driver.execute_script("arguments[0].click();", next_button)
-                    time.sleep(3)
+                    # The old rows go stale once the next page has rendered
+                    timed_wait(driver, "next_page", EC.staleness_of(statute_rows[0]), required=False)
                     print("💌Moved to next slide")
                 except Exception as e:
                     print(f"❌ Error clicking next page: {e}")
@@ -141,6 +146,7 @@ def scrape_statutes(statute_limit=100):
         traceback.print_exc()
 
     print(f"🎯 Statute scraping complete. Total statutes scraped: {scraped_count}")
+    print_wait_profile()
     driver.quit()
 
 
@@ -0,0 +1,113 @@
+import os
+import json
+import numpy as np
+from pathlib import Path
+from joblib import Parallel, delayed
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from send2trash import send2trash
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+
+# === Corpus-wide sparse cosine similarity ===
+# The whole directory is vectorized once into a single L2-normalised TF-IDF
+# matrix (hashing trick, so no vocabulary has to be fitted or kept), and
+# similarities come from blocked sparse matrix products spread over all cores.
+N_FEATURES = 2 ** 20
+BLOCK_ROWS = 512
+TOP_K = 10
+COSINE_THRESHOLD = 0.75
+SPARSE_REPORT_PATH = "D:/LegalMorph/duplicate_clusters_sparse.json"
+
+
+def vectorize_corpus(texts):
+    hashed = HashingVectorizer(n_features=N_FEATURES, alternate_sign=False, norm=None,
+                               ngram_range=(1, 2), dtype=np.float32).transform(texts)
+    return TfidfTransformer(sublinear_tf=True).fit_transform(hashed).tocsr()
+
+
+def block_neighbours(matrix, start, stop, threshold, top_k):
+    # Similarities of rows [start, stop) against every row, keeping only the upper
+    # triangle, scores >= threshold and at most top_k neighbours per row
+    block = (matrix[start:stop] @ matrix.T).tocoo()
+    rows = block.row + start
+    keep = (block.col > rows) & (block.data >= threshold)
+    rows, cols, scores = rows[keep], block.col[keep], block.data[keep]
+    if top_k and len(rows):
+        order = np.lexsort((-scores, rows))
+        rows, cols, scores = rows[order], cols[order], scores[order]
+        first = np.searchsorted(rows, rows, side="left")
+        rank = np.arange(len(rows)) - first
+        keep = rank < top_k
+        rows, cols, scores = rows[keep], cols[keep], scores[keep]
+    return rows, cols, scores
+
+
+def similar_pairs(matrix, threshold=COSINE_THRESHOLD, top_k=TOP_K, block_rows=BLOCK_ROWS, n_jobs=-1):
+    """
+    Returns (rows, cols, scores) arrays for every document pair with cosine
+    similarity >= threshold, each row limited to its top_k neighbours.
+    """
+    # Process workers; joblib memory-maps the matrix arrays instead of copying them to every worker
+    blocks = Parallel(n_jobs=n_jobs)(
+        delayed(block_neighbours)(matrix, start, min(start + block_rows, matrix.shape[0]), threshold, top_k)
+        for start in range(0, matrix.shape[0], block_rows)
+    )
+    if not blocks:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=np.float32)
+    return tuple(np.concatenate(parts) for parts in zip(*blocks))
+
+
+def choose_survivors(n_docs, rows, cols, mod_times):
+    """
+    Groups documents into connected components of the similarity graph and
+    keeps the oldest file of each component. Returns a boolean keep mask and
+    the component label of every document.
+    """
+    graph = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(n_docs, n_docs))
+    _, labels = connected_components(graph, directed=False)
+    order = np.lexsort((mod_times, labels))
+    first_of_component = np.r_[True, labels[order][1:] != labels[order][:-1]]
+    keep = np.zeros(n_docs, dtype=bool)
+    keep[order[first_of_component]] = True
+    return keep, labels
+
+
+def sparse_deduper(directory, threshold=COSINE_THRESHOLD, top_k=TOP_K, n_jobs=-1, report_path=SPARSE_REPORT_PATH,
+                   dry_run=False):
+    filepaths = sorted(Path(directory).glob("*.txt"))
+    if len(filepaths) < 2:
+        print("ℹ️ Nothing to deduplicate.")
+        return []
+
+    texts = []
+    for filepath in filepaths:
+        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+            texts.append(f.read())
+    mod_times = np.array([os.path.getmtime(f) for f in filepaths])
+
+    print(f"🧮 Vectorizing {len(filepaths)} files into one sparse matrix...")
+    matrix = vectorize_corpus(texts)
+    rows, cols, scores = similar_pairs(matrix, threshold, top_k, n_jobs=n_jobs)
+    print(f"🔗 {len(rows)} pairs with cosine similarity >= {threshold}")
+
+    keep, labels = choose_survivors(len(filepaths), rows, cols, mod_times)
+    report = []
+    for label in np.unique(labels[rows]) if len(rows) else []:
+        members = np.flatnonzero(labels == label)
+        survivor = members[keep[members]][0]
+        duplicates = members[~keep[members]]
+        report.append({
+            "keep": filepaths[survivor].name,
+            "duplicates": [filepaths[i].name for i in duplicates],
+        })
+        print(f"\n🔍 Keeping {filepaths[survivor].name}")
+        for i in duplicates:
+            print(f"🗑️ Sending to trash: {filepaths[i].name}")
+            if not dry_run:
+                send2trash(str(filepaths[i]))
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"📝 Duplicate report saved to {report_path}")
+    return report
@@ -1,17 +1,104 @@
 import re
-from langdetect import detect
 from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+from extractor.language_gate import check_language
 
+# Page chrome that never belongs to the judgment text
+CHROME_TAGS = ['script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'button', 'svg', 'form', 'iframe']
+# Tags that start a new line in the extracted text
+BLOCK_TAGS = {
+    'p', 'div', 'br', 'li', 'ul', 'ol', 'tr', 'table', 'section', 'article', 'main', 'blockquote', 'pre',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'dd', 'dt',
+}
+# Judgment container on EastLaw case pages, tried in order. The first one is the
+# block around the bold case title that the scraper waits for.
+CONTENT_XPATHS = [
+    "//p[contains(@class, 'text-2xl') and contains(@class, 'font-bold')]"
+    "/ancestor::div[string-length(normalize-space(.)) > 1000][1]",
+    "//main",
+    "//article",
+    "//*[@role='main']",
+]
+MIN_CONTENT_CHARS = 500
 
-def extract_clean_text_from_html(html_content):
+
+def extract_clean_text_from_html(html_content, mode="targeted"):
+    """
+    mode="targeted" parses with lxml, keeps only the judgment container and
+    returns one paragraph per block element. mode="full" is the previous
+    behaviour: every visible string on the page collapsed onto one line.
+    """
+    if mode == "full":
+        text = extract_full_text(html_content)
+    else:
+        text = extract_targeted_text(html_content)
+
+    check_language(text)
+
+    return text
+
+
+def extract_full_text(html_content):
     soup = BeautifulSoup(html_content, "html.parser")
     for tag in soup(['script', 'style', 'noscript']):
         tag.decompose()
 
     text = soup.get_text(separator=' ')
-    text = re.sub(r'\s+', ' ', text).strip()
+    return re.sub(r'\s+', ' ', text).strip()
 
-    if detect(text) != 'en':
-        raise Exception("Non-English content detected")
 
+def extract_targeted_text(html_content):
+    if not html_content or not html_content.strip():
+        raise Exception("Empty page content")
+    tree = lxml.html.fromstring(html_content)
+    etree.strip_elements(tree, *CHROME_TAGS, with_tail=False)
+    etree.strip_elements(tree, etree.Comment, with_tail=False)
+
+    root = find_content_root(tree)
+    text = block_text(root)
+    if len(text) < MIN_CONTENT_CHARS and root is not tree:
+        # Container guess was too small (layout changed?); fall back to the whole de-chromed page
+        text = block_text(tree)
     return text
+
+
+def find_content_root(tree):
+    for xpath in CONTENT_XPATHS:
+        for element in tree.xpath(xpath):
+            if len(element.text_content().strip()) >= MIN_CONTENT_CHARS:
+                return element
+    return densest_block(tree)
+
+
+def densest_block(tree):
+    # The element whose own paragraph children carry the most text is the article body
+    best, best_score = tree, 0
+    for element in tree.iter('div', 'section', 'article', 'main', 'td'):
+        score = sum(len(child.text_content()) for child in element
+                    if child.tag == 'p' or (child.tag in ('span', 'div') and len(child) == 0))
+        score += len((element.text or '').strip())
+        if score > best_score:
+            best, best_score = element, score
+    return best
+
+
+def block_text(root):
+    parts = []
+
+    def walk(element):
+        is_block = isinstance(element.tag, str) and element.tag in BLOCK_TAGS
+        if is_block:
+            parts.append('\n')
+        if element.text:
+            parts.append(element.text)
+        for child in element:
+            walk(child)
+            if child.tail:
+                parts.append(child.tail)
+        if is_block:
+            parts.append('\n')
+
+    walk(root)
+    lines = (re.sub(r'[ \t\r\f\v\xa0]+', ' ', line).strip() for line in ''.join(parts).split('\n'))
+    return '\n\n'.join(line for line in lines if line)
@@ -0,0 +1,181 @@
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+from collections import defaultdict
+import threading
+import time
+
+# ✅ Per-step timeouts (seconds). Waits return as soon as their condition holds,
+# so these are upper bounds, not fixed delays. Override with configure_waits().
+WAIT_TIMEOUTS = {
+    "after_login": 15,
+    "request_start": 2,
+    "sidebar_click": 10,
+    "dropdown_open": 10,
+    "option_select": 10,
+    "profile_enabled": 10,
+    "tab_switch": 20,
+    "case_list": 25,
+    "case_list_settle": 2,
+    "return_to_all": 20,
+    "case_window": 10,
+    "case_url": 5,
+    "case_render": 20,
+    "statute_rows": 15,
+    "statute_modal": 15,
+    "statute_modal_close": 10,
+    "ocr_canvas": 10,
+    "next_page": 15,
+}
+NETWORK_IDLE_MS = 500
+POLL_FREQUENCY = 0.2
+
+_profile = defaultdict(lambda: {"count": 0, "total": 0.0, "max": 0.0, "timeouts": 0})
+_profile_lock = threading.Lock()
+
+# Counts in-flight (and all started) fetch/XHR requests so network idle can be detected from the page
+NETWORK_TRACKER_JS = """
+if (!window.__lmNetwork) {
+    window.__lmNetwork = {pending: 0, started: 0, last: performance.now()};
+    const done = () => { window.__lmNetwork.pending--; window.__lmNetwork.last = performance.now(); };
+    const originalFetch = window.fetch;
+    window.fetch = function() {
+        window.__lmNetwork.pending++;
+        window.__lmNetwork.started++;
+        window.__lmNetwork.last = performance.now();
+        return originalFetch.apply(this, arguments).finally(done);
+    };
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        window.__lmNetwork.pending++;
+        window.__lmNetwork.started++;
+        window.__lmNetwork.last = performance.now();
+        this.addEventListener('loadend', done);
+        return originalSend.apply(this, arguments);
+    };
+}
+"""
+
+NETWORK_IDLE_JS = """
+const idleMs = arguments[0];
+if (document.readyState !== 'complete') { return false; }
+const tracker = window.__lmNetwork;
+const resources = performance.getEntriesByType('resource');
+const lastResource = resources.length ? resources[resources.length - 1].responseEnd : 0;
+const lastActivity = Math.max(lastResource, tracker ? tracker.last : 0);
+return (!tracker || tracker.pending === 0) && performance.now() - lastActivity >= idleMs;
+"""
+
+NETWORK_STARTED_JS = "return window.__lmNetwork ? window.__lmNetwork.started : 0;"
+
+
+def configure_waits(**timeouts):
+    for step, seconds in timeouts.items():
+        WAIT_TIMEOUTS[step] = seconds
+
+
+def record_wait(step, seconds, timed_out=False):
+    with _profile_lock:
+        entry = _profile[step]
+        entry["count"] += 1
+        entry["total"] += seconds
+        entry["max"] = max(entry["max"], seconds)
+        if timed_out:
+            entry["timeouts"] += 1
+
+
+def timed_wait(driver, step, condition, timeout=None, required=True):
+    """
+    WebDriverWait that records how long the step actually waited. With
+    required=False a timeout is logged and None returned instead of raising,
+    which is how the former unconditional sleeps are replaced.
+    """
+    timeout = timeout if timeout is not None else WAIT_TIMEOUTS.get(step, 10)
+    start = time.perf_counter()
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(condition)
+        record_wait(step, time.perf_counter() - start)
+        return result
+    except TimeoutException:
+        record_wait(step, time.perf_counter() - start, timed_out=True)
+        if required:
+            raise
+        print(f"⌛ Wait '{step}' timed out after {timeout}s, continuing.")
+        return None
+
+
+def install_network_tracker(driver):
+    # Registered through DevTools so it is injected into every page and case window
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": NETWORK_TRACKER_JS})
+    except Exception:
+        pass
+    driver.execute_script(NETWORK_TRACKER_JS)
+
+
+def network_mark(driver):
+    # Requests started so far; take it before the click and pass it to wait_for_network_idle
+    try:
+        return driver.execute_script(NETWORK_STARTED_JS)
+    except Exception:
+        return None
+
+
+def wait_for_network_idle(driver, step, idle_ms=NETWORK_IDLE_MS, timeout=None, mark=None):
+    """
+    Waits until no fetch/XHR has been pending for idle_ms. With a mark from
+    network_mark(), a request started after the mark must be seen first (up to
+    the short "request_start" timeout), so a page that is still idle right
+    after a click does not pass before the click's XHR has even been sent.
+    """
+    if mark is not None:
+        timed_wait(driver, "request_start", lambda d: d.execute_script(NETWORK_STARTED_JS) > mark,
+                   required=False)
+    return timed_wait(driver, step, lambda d: d.execute_script(NETWORK_IDLE_JS, idle_ms),
+                      timeout=timeout, required=False)
+
+
+def wait_for_stable_count(driver, step, by, locator, timeout=None, required=False):
+    """
+    Waits until the number of elements matching the locator is non-zero and has
+    stopped changing between two polls, i.e. the list finished rendering.
+    """
+    last_count = [-1]
+
+    def stable(d):
+        elements = d.find_elements(by, locator)
+        settled = len(elements) > 0 and len(elements) == last_count[0]
+        last_count[0] = len(elements)
+        return elements if settled else False
+
+    return timed_wait(driver, step, stable, timeout=timeout, required=required)
+
+
+def wait_for_canvas_ready(driver, canvas, step="ocr_canvas", timeout=None):
+    # The PDF page canvas is ready for a screenshot once it has been painted and is inside the viewport
+    return timed_wait(driver, step, lambda d: d.execute_script(
+        "const c = arguments[0]; const r = c.getBoundingClientRect();"
+        "return c.width > 0 && c.height > 0 && r.top < window.innerHeight && r.bottom > 0;",
+        canvas
+    ), timeout=timeout, required=False)
+
+
+def wait_profile():
+    with _profile_lock:
+        return {step: dict(entry) for step, entry in _profile.items()}
+
+
+def print_wait_profile():
+    profile = wait_profile()
+    if not profile:
+        return
+    print("\n⏱️ Wait-time profile (where crawl time goes):")
+    print(f"{'step':<22}{'count':>8}{'total s':>11}{'mean s':>9}{'max s':>9}{'timeouts':>10}")
+    for step, entry in sorted(profile.items(), key=lambda item: item[1]["total"], reverse=True):
+        mean = entry["total"] / entry["count"] if entry["count"] else 0
+        print(f"{step:<22}{entry['count']:>8}{entry['total']:>11.1f}{mean:>9.2f}{entry['max']:>9.2f}"
+              f"{entry['timeouts']:>10}")
+
+
+def reset_wait_profile():
+    with _profile_lock:
+        _profile.clear()
@@ -0,0 +1,313 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+
+# === Corpus layout ===
+# <corpus>/shard-00000.jsonl.zst  one independent zstd frame per JSONL record
+# <corpus>/index.jsonl           sidecar offset index: {"id", "shard", "offset", "length", "hash"} per record
+# Records are appended only; a later index line for the same id replaces the earlier one,
+# and a {"id", "deleted": true} line removes it.
+INDEX_FILE = "index.jsonl"
+SHARD_TEMPLATE = "shard-{:05d}.jsonl.zst"
+SHARD_MAX_BYTES = 64 * 1024 * 1024
+COMPRESSION_LEVEL = 10
+
+_lock = threading.Lock()
+_index_cache = {}
+
+
+def _zstd():
+    # Imported lazily so plain-directory stages (and the scraper) don't need zstandard
+    import zstandard
+    return zstandard
+
+
+def content_hash(content):
+    serialized = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+
+
+def is_corpus(path):
+    return os.path.exists(os.path.join(path, INDEX_FILE))
+
+
+def create_corpus(path):
+    recover_compaction(path)
+    os.makedirs(path, exist_ok=True)
+    index_path = os.path.join(path, INDEX_FILE)
+    if not os.path.exists(index_path):
+        open(index_path, "w", encoding="utf-8").close()
+    return path
+
+
+def _load_index(path):
+    # Caller holds _lock; writers update the returned (cached) dict in place
+    index_path = os.path.join(path, INDEX_FILE)
+    size = os.path.getsize(index_path)
+    cached = _index_cache.get(path)
+    if cached and cached["size"] == size:
+        return cached["entries"]
+
+    with open(index_path, "rb") as f:
+        data = f.read()
+    # A line another process is still writing is left for the next read
+    complete = data[:data.rfind(b"\n") + 1]
+    entries = {}
+    for line in complete.decode("utf-8").splitlines():
+        if line.strip():
+            entry = json.loads(line)
+            record_id = entry.pop("id")
+            if entry.get("deleted"):
+                entries.pop(record_id, None)
+            else:
+                entries[record_id] = entry
+    _index_cache[path] = {"size": len(complete), "entries": entries}
+    return entries
+
+
+def load_index(path):
+    """
+    Returns {record_id: {"shard", "offset", "length", "hash"}} for the latest
+    version of each record. Cached per corpus and re-read only when the index
+    file grows from outside this process. The result is a copy, so callers can
+    iterate it while other threads append.
+    """
+    with _lock:
+        return dict(_load_index(path))
+
+
+def index_entry(path, record_id):
+    with _lock:
+        return _load_index(path).get(record_id)
+
+
+def current_shard(path):
+    shards = sorted(name for name in os.listdir(path) if name.startswith("shard-"))
+    if not shards:
+        return SHARD_TEMPLATE.format(0)
+    last = shards[-1]
+    if os.path.getsize(os.path.join(path, last)) >= SHARD_MAX_BYTES:
+        return SHARD_TEMPLATE.format(len(shards))
+    return last
+
+
+def append_records(path, records):
+    """
+    Appends (record_id, content) pairs. content may be a string (raw or
+    summarized text) or a JSON-serialisable object (custom/base/final JSON).
+    """
+    compressor = _zstd().ZstdCompressor(level=COMPRESSION_LEVEL)
+    with _lock:
+        entries = _load_index(path)
+        shard = current_shard(path)
+        shard_path = os.path.join(path, shard)
+        index_lines = []
+        with open(shard_path, "ab") as shard_file:
+            offset = shard_file.tell()
+            for record_id, content in records:
+                line = json.dumps({"id": record_id, "content": content}, ensure_ascii=False) + "\n"
+                frame = compressor.compress(line.encode("utf-8"))
+                shard_file.write(frame)
+                entry = {"shard": shard, "offset": offset, "length": len(frame), "hash": content_hash(content)}
+                index_lines.append(json.dumps(dict(entry, id=record_id), ensure_ascii=False) + "\n")
+                entries[record_id] = entry
+                offset += len(frame)
+        index_path = os.path.join(path, INDEX_FILE)
+        with open(index_path, "a", encoding="utf-8") as index_file:
+            index_file.writelines(index_lines)
+        _index_cache[path] = {"size": os.path.getsize(index_path), "entries": entries}
+
+
+def append_record(path, record_id, content):
+    append_records(path, [(record_id, content)])
+
+
+def delete_records(path, record_ids):
+    # Tombstones the records in the index; compact_corpus reclaims their space
+    with _lock:
+        entries = _load_index(path)
+        index_lines = []
+        for record_id in record_ids:
+            if entries.pop(record_id, None) is not None:
+                index_lines.append(json.dumps({"id": record_id, "deleted": True}, ensure_ascii=False) + "\n")
+        index_path = os.path.join(path, INDEX_FILE)
+        with open(index_path, "a", encoding="utf-8") as index_file:
+            index_file.writelines(index_lines)
+        _index_cache[path] = {"size": os.path.getsize(index_path), "entries": entries}
+
+
+def read_record(path, record_id):
+    entry = index_entry(path, record_id)
+    if entry is None:
+        raise KeyError(f"{record_id} not found in corpus {path}")
+    with open(os.path.join(path, entry["shard"]), "rb") as f:
+        f.seek(entry["offset"])
+        frame = f.read(entry["length"])
+    return json.loads(_zstd().ZstdDecompressor().decompress(frame))["content"]
+
+
+def iter_records(path, ids=None):
+    """
+    Streams (record_id, content) in on-disk order, one open file per shard.
+    Superseded versions of a record are skipped.
+    """
+    entries = load_index(path)
+    wanted = entries if ids is None else {i: entries[i] for i in ids if i in entries}
+    ordered = sorted(wanted.items(), key=lambda item: (item[1]["shard"], item[1]["offset"]))
+    decompressor = _zstd().ZstdDecompressor()
+    open_shard, shard_file = None, None
+    try:
+        for record_id, entry in ordered:
+            if entry["shard"] != open_shard:
+                if shard_file:
+                    shard_file.close()
+                open_shard = entry["shard"]
+                shard_file = open(os.path.join(path, open_shard), "rb")
+            shard_file.seek(entry["offset"])
+            frame = shard_file.read(entry["length"])
+            yield record_id, json.loads(decompressor.decompress(frame))["content"]
+    finally:
+        if shard_file:
+            shard_file.close()
+
+
+def list_ids(path):
+    return list(load_index(path).keys())
+
+
+def recover_compaction(path):
+    # A crash between the two renames of compact_corpus leaves only the old corpus, set aside
+    path = path.rstrip("/\\")
+    if not os.path.exists(path) and os.path.exists(path + ".old"):
+        os.rename(path + ".old", path)
+        print(f"♻️ Restored {path} from an interrupted compaction")
+
+
+def compact_corpus(path):
+    """
+    Rewrites the shards without superseded or deleted record versions. Records
+    are streamed into a temp corpus, and the old corpus is only removed after
+    the new one has been swapped in.
+    """
+    path = path.rstrip("/\\")
+    temp_path, old_path = path + ".compacting", path + ".old"
+    recover_compaction(path)
+    for leftover in (temp_path, old_path):
+        if os.path.exists(leftover):
+            shutil.rmtree(leftover)
+    create_corpus(temp_path)
+    batch = []
+    for record in iter_records(path):
+        batch.append(record)
+        if len(batch) >= 500:
+            append_records(temp_path, batch)
+            batch = []
+    if batch:
+        append_records(temp_path, batch)
+    with _lock:
+        os.rename(path, old_path)
+        os.rename(temp_path, path)
+        for cached_path in list(_index_cache):
+            if cached_path.rstrip("/\\") in (path, temp_path):
+                _index_cache.pop(cached_path)
+    shutil.rmtree(old_path)
+
+
+# === Stage I/O: every pipeline stage reads and writes through these, so a stage
+# directory can be either a plain folder of files or a corpus ===
+def list_entries(path, extension):
+    if is_corpus(path):
+        return [record_id for record_id in list_ids(path) if record_id.lower().endswith(extension)]
+    return [name for name in os.listdir(path) if name.lower().endswith(extension)]
+
+
+def entry_exists(path, name):
+    if is_corpus(path):
+        return index_entry(path, name) is not None
+    return os.path.exists(os.path.join(path, name))
+
+
+def read_text(path, name):
+    if is_corpus(path):
+        content = read_record(path, name)
+        return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+    with open(os.path.join(path, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def read_json(path, name):
+    if is_corpus(path):
+        content = read_record(path, name)
+        return json.loads(content) if isinstance(content, str) else content
+    with open(os.path.join(path, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_text(path, name, text):
+    if is_corpus(path):
+        append_record(path, name, text)
+        return
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, name), "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def write_json(path, name, data):
+    if is_corpus(path):
+        append_record(path, name, data)
+        return
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, name), "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def copy_entry(source_path, dest_path, name):
+    if not is_corpus(source_path) and not is_corpus(dest_path):
+        shutil.copy(os.path.join(source_path, name), os.path.join(dest_path, name))
+        return
+    write_text(dest_path, name, read_text(source_path, name))
+
+
+def pack_directory(source_dir, corpus_path, extension):
+    """
+    Syncs a corpus with a stage directory (data/, base_json/, ...). New and
+    changed files are packed, unchanged ones are skipped and records whose file
+    is gone (e.g. sent to trash by the deduper) are dropped, so it can be
+    re-run after every scrape.
+    """
+    create_corpus(corpus_path)
+    entries = load_index(corpus_path)
+    names = [name for name in sorted(os.listdir(source_dir)) if name.lower().endswith(extension)]
+    names_set = set(names)
+    removed = [record_id for record_id in entries if record_id.lower().endswith(extension) and record_id not in names_set]
+    if removed:
+        delete_records(corpus_path, removed)
+
+    batch, packed = [], 0
+    for name in names:
+        content = read_json(source_dir, name) if extension == ".json" else read_text(source_dir, name)
+        entry = entries.get(name)
+        if entry is not None:
+            stored_hash = entry.get("hash") or content_hash(read_record(corpus_path, name))
+            if stored_hash == content_hash(content):
+                continue
+        batch.append((name, content))
+        if len(batch) >= 500:
+            append_records(corpus_path, batch)
+            packed += len(batch)
+            batch = []
+    if batch:
+        append_records(corpus_path, batch)
+        packed += len(batch)
+    print(f"📦 Synced {source_dir} into {corpus_path}: {packed} packed, {len(removed)} removed ({len(list_ids(corpus_path))} records)")
+
+
+def unpack_corpus(corpus_path, dest_dir):
+    os.makedirs(dest_dir, exist_ok=True)
+    for record_id, content in iter_records(corpus_path):
+        if isinstance(content, str):
+            write_text(dest_dir, record_id, content)
+        else:
+            write_json(dest_dir, record_id, content)
@@ -1,6 +1,7 @@
 import os
-import json
 from pymongo import MongoClient
+from loader.corpus_shards import list_entries, read_json, read_text
+from extractor.raw_store import CASE_ID_KEY, text_case_id, filename_case_id
 
 def load_json(json_dir, name, collection):
     mongo_uri = "mongodb://localhost:27017"  # or your Atlas URI
@@ -14,26 +15,27 @@ def load_json(json_dir, name, collection):
 
     # === LOAD JSON FILES ===
     inserted_count = 0
-    for filename in os.listdir(json_dir):
-        if filename.endswith(".json"):
-            file_path = os.path.join(json_dir, filename)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, dict):
-                        collection.insert_one(data)
-                        inserted_count += 1
-                    elif isinstance(data, list):
-                        collection.insert_many(data)
-                        inserted_count += len(data)
-                    print(f"✅ Inserted from {filename}")
-            except Exception as e:
-                print(f"❌ Failed to insert {filename}: {e}")
+    for filename in list_entries(json_dir, ".json"):
+        try:
+            data = read_json(json_dir, filename)
+            if isinstance(data, dict) and data.get(CASE_ID_KEY):
+                # The stable case id is the _id, so re-loading a case replaces it instead of duplicating it
+                collection.replace_one({"_id": data[CASE_ID_KEY]}, {"_id": data[CASE_ID_KEY], **data}, upsert=True)
+                inserted_count += 1
+            elif isinstance(data, dict):
+                collection.insert_one(data)
+                inserted_count += 1
+            elif isinstance(data, list):
+                collection.insert_many(data)
+                inserted_count += len(data)
+            print(f"✅ Inserted from {filename}")
+        except Exception as e:
+            print(f"❌ Failed to insert {filename}: {e}")
 
     print(f"\n📦 Done. Total documents inserted: {inserted_count}")
 
 
-def txt_json_db(text_dir, name, collection):
+def txt_json_db(text_dir, name, collection, summarized=False):
     # MongoDB connection setup
     client = MongoClient("mongodb://localhost:27017/")  # change this if you're using remote DB
     db = client[name]
@@ -41,19 +43,21 @@ def txt_json_db(text_dir, name, collection):
 
 
     # Loop through all .txt files and insert into MongoDB
-    for filename in os.listdir(text_dir):
-        if filename.endswith(".txt"):
-            file_path = os.path.join(text_dir, filename)
-            with open(file_path, 'r', encoding='utf-8') as f:
-                raw_text = f.read()
-
-            doc = {
-                "id": os.path.splitext(filename)[0],  # filename without .txt
-                "raw_data": raw_text
-            }
-
-            # Insert into MongoDB
+    for filename in list_entries(text_dir, ".txt"):
+        raw_text = read_text(text_dir, filename)
+
+        doc = {
+            "id": os.path.splitext(filename)[0],  # filename without .txt
+            "raw_data": raw_text
+        }
+        # A summary does not hash to its case, so its id comes from the raw store by filename
+        case_id = filename_case_id(filename) if summarized else text_case_id(raw_text)
+
+        # Insert into MongoDB
+        if case_id:
+            collection.replace_one({"_id": case_id}, {"_id": case_id, CASE_ID_KEY: case_id, **doc}, upsert=True)
+        else:
             collection.insert_one(doc)
-            print(f"✅ Inserted {filename} into MongoDB")
+        print(f"✅ Inserted {filename} into MongoDB")
 
     print("🎉 All .txt files inserted successfully.")
@@ -1,6 +1,6 @@
 from loader.load_json import load_json, txt_json_db
 
-def load():
+def load(use_corpus=False):
     print("Loading all the files in database...")
     final_json = "D:\\LegalMorph\\final_json"
     custom_json = "D:\\LegalMorph\\custom_json"
@@ -17,10 +17,17 @@ def load():
     s_collection = "SumLegalCases"
     r_name = "Raw"
     r_collection = "Legal_raw_cases"
+    if use_corpus:
+        # Stage outputs written by transform(use_corpus=True)
+        final_json = "D:/LegalMorph/corpus/final_json"
+        custom_json = "D:/LegalMorph/corpus/custom_json"
+        base_json = "D:/LegalMorph/corpus/base_json"
+        raw_dir = "D:/LegalMorph/corpus/data"
+        summarized_dir = "D:/LegalMorph/corpus/summarized_text"
     print("Loading Raw json in DB...")
     txt_json_db(raw_dir, r_name, r_collection)
     print("Loading Summarized json for long cases in DB...")
-    txt_json_db(summarized_dir, s_name, s_collection)
+    txt_json_db(summarized_dir, s_name, s_collection, summarized=True)
     print("loading custom json...")
     load_json(custom_json, c_name, c_collection)
     print("loading base json...")
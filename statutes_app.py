@@ -12,11 +12,16 @@ statute_limit = st.number_input(
     "📑 Number of Statutes to Scrape", min_value=1, max_value=1000, value=10, step=1
 )
 
+# --- Input: Lean headless browser profile ---
+lean = st.checkbox(
+    "🪶 Lean headless browser (uses the saved login from login_to_profile)", value=False
+)
+
 # --- Extract Button ---
 if st.button("🧲 Extract Statutes"):
     with st.spinner(f"Extracting {statute_limit} statutes..."):
         try:
-            run_statute_scraper(limit=statute_limit)
+            run_statute_scraper(limit=statute_limit, lean=lean)
             st.success("✅ Statutes extracted successfully.")
         except Exception as e:
             st.error(f"❌ Extraction failed: {e}")
@@ -0,0 +1,195 @@
+import os
+import re
+import asyncio
+from transformer.phase1_phase2_func import (
+    summarize_text_if_needed, routed_group_texts, try_parse_json, extract_and_fix_json
+)
+from transformer.request_scheduler import chat_completion_async
+from transformer.response_cache import parses_as_json
+from transformer.lineage import is_current, record_lineage
+from transformer.sliced_extraction import extract_sliced_async
+from transformer.rule_extractor import pre_extract, prefill_schema, apply_prefill
+from extractor.raw_store import content_hash, case_id_from_hash, with_case_id
+from loader.corpus_shards import list_entries, read_text, write_json, copy_entry
+
+# === Concurrent mode for the base/custom phases ===
+# Each case is its own task and at most `concurrency` cases are worked on at once.
+# Requests are limited separately by the scheduler's max_in_flight (set by
+# transform()), so a sliced case fanning out one request per field group still
+# counts every request. The long-case summarization stays on the synchronous
+# client in a worker thread. process_case returns (json, raw text digest), so the
+# ordered writer never reads the input again.
+# Results are written in input order, and failures are counted and copied to
+# the issue dir exactly like the sequential functions do.
+DEFAULT_CONCURRENCY = 8
+
+
+async def call_gpt_with_schema_async(schema, text, system_prompt, deployment_name, async_client, token,
+                                     bypass_cache=False):
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"Base Schema:\n{schema}\n\nCase Text:\n{text}"}
+    ]
+    return await chat_completion_async(
+        async_client,
+        model=deployment_name,
+        messages=messages,
+        temperature=0.2,
+        max_tokens=token,
+        validate=parses_as_json,
+        bypass_cache=bypass_cache
+    )
+
+
+async def call_gpt_for_file_async(case_text, async_client, system_prompt, token, bypass_cache=False):
+    return await chat_completion_async(
+        async_client,
+        model="model name",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": case_text}
+        ],
+        temperature=0.2,
+        max_tokens=token,
+        validate=parses_as_json,
+        bypass_cache=bypass_cache,
+    )
+
+
+def pending_cases(input_dir, output_dir, lineage):
+    # Cases whose output is already up to date (see lineage) are not scheduled at all
+    filenames = []
+    for filename in list_entries(input_dir, ".txt"):
+        if is_current(lineage, filename, read_text(input_dir, filename), output_dir):
+            print(f"⏭️ Unchanged since last run, skipping {filename}")
+            continue
+        filenames.append(filename)
+    return filenames
+
+
+async def run_cases(filenames, process_case, write_result, concurrency):
+    """
+    Runs process_case(filename) for every file with a concurrency limit and
+    hands (filename, result) to write_result in the original file order, as
+    soon as every earlier file has finished.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(position, filename):
+        async with semaphore:
+            try:
+                return position, filename, await process_case(filename), None
+            except Exception as e:
+                return position, filename, None, e
+
+    tasks = [asyncio.create_task(bounded(position, filename)) for position, filename in enumerate(filenames)]
+    finished = {}
+    next_position = 0
+    for task in asyncio.as_completed(tasks):
+        position, filename, result, error = await task
+        finished[position] = (filename, result, error)
+        while next_position in finished:
+            write_result(*finished.pop(next_position))
+            next_position += 1
+
+
+async def base_json_gpt_async(input_dir, output_dir, summarise_dir, issue_dir, deployment_name, client, async_client,
+                              system_prompt, summarization_prompt, token, concurrency=DEFAULT_CONCURRENCY,
+                              lineage=None, sliced=False, prefill=False, segmented=False):
+    issue_count = 0
+    # === Load single base schema ===
+    base_schema_path = "D:\\LegalMorph\\transformer\\base_schema_template.json"
+    with open(base_schema_path, "r", encoding="utf-8") as f:
+        schema_template = f.read()
+
+    async def process_case(filename):
+        print(f"\n📄 Processing {filename}")
+        case_text = read_text(input_dir, filename)
+        digest = content_hash(case_text)
+        prefilled = pre_extract(case_text) if prefill else {}
+        case_schema = prefill_schema(schema_template, prefilled)
+        group_texts = None
+        if sliced and segmented:
+            group_texts = await asyncio.to_thread(routed_group_texts, case_text, filename, schema_template, prefilled,
+                                                  deployment_name, summarization_prompt, client)
+        else:
+            case_text = await asyncio.to_thread(summarize_text_if_needed, case_text, filename, summarise_dir,
+                                                deployment_name, summarization_prompt, client)
+        if sliced:
+            # Called once: extract_slice_async retries every field group with its own budgets
+            parsed_json = await extract_sliced_async(schema_template, case_text, system_prompt, deployment_name,
+                                                     async_client, filename, prefilled, group_texts)
+            return (parsed_json, digest) if parsed_json else None
+        for attempt in range(3):
+            try:
+                raw_response = await call_gpt_with_schema_async(case_schema, case_text, system_prompt,
+                                                                deployment_name, async_client, token, attempt > 0)
+                parsed_json = apply_prefill(try_parse_json(raw_response, filename), prefilled, schema_template)
+                if parsed_json:
+                    return parsed_json, digest
+                print(f"🔁 Retry {attempt + 1}")
+            except Exception as e:
+                print(f"❌ GPT call failed: {e}")
+        return None
+
+    def write_result(filename, result, error):
+        nonlocal issue_count
+        if result:
+            parsed_json, digest = result
+            out_path = os.path.join(output_dir, filename.replace(".txt", "_base.json"))
+            write_json(output_dir, os.path.basename(out_path), with_case_id(parsed_json, case_id_from_hash(digest)))
+            record_lineage(lineage, filename, None, os.path.basename(out_path), digest)
+            print(f"✅ Saved to {out_path}")
+            return
+        if error:
+            print(f"❌ Error processing {filename}: {error}")
+        issue_count += 1
+        copy_entry(input_dir, issue_dir, filename)
+        print(f"⚠️ Moved problematic file to issue dir: {os.path.join(issue_dir, filename)}")
+
+    await run_cases(pending_cases(input_dir, output_dir, lineage), process_case, write_result, concurrency)
+    print(f"\n🚨 Total files with issues: {issue_count}")
+    return issue_count
+
+
+async def custom_json_gpt_async(input_dir, output_dir, summarise_dir, issue_dir, deployment_name, client,
+                                async_client, system_prompt, summarization_prompt, token,
+                                concurrency=DEFAULT_CONCURRENCY, lineage=None):
+    issue_count = 0
+
+    async def process_case(filename):
+        print(f"\n📄 Processing {filename}")
+        raw_text = read_text(input_dir, filename)
+        digest = content_hash(raw_text)
+        case_text = await asyncio.to_thread(summarize_text_if_needed, raw_text, filename, summarise_dir,
+                                            deployment_name, summarization_prompt, client)
+        for attempt in range(3):
+            try:
+                raw_response = await call_gpt_for_file_async(case_text, async_client, system_prompt, token,
+                                                              attempt > 0)
+                fixed_json = extract_and_fix_json(raw_response, filename, case_id=case_id_from_hash(digest))
+                if fixed_json:
+                    return fixed_json, digest
+                print(f"🔁 Retry attempt {attempt + 1} failed. Retrying..." if attempt < 2 else "❌ Final attempt failed.")
+            except Exception as e:
+                print(f"❌ GPT call failed: {e}")
+        return None
+
+    def write_result(filename, result, error):
+        nonlocal issue_count
+        if result:
+            fixed_json, digest = result
+            output_filename = f"_{re.sub(r'[^a-zA-Z0-9]+', '_', filename[:-4].lower())}.json"
+            write_json(output_dir, output_filename, fixed_json)
+            record_lineage(lineage, filename, None, output_filename, digest)
+            print(f"💾 Saved to: {os.path.join(output_dir, output_filename)}")
+            return
+        if error:
+            print(f"❌ Error processing {filename}: {error}")
+        issue_count += 1
+        copy_entry(input_dir, issue_dir, filename)
+        print(f"⚠️ Moved problematic file to issue dir: {os.path.join(issue_dir, filename)}")
+
+    await run_cases(pending_cases(input_dir, output_dir, lineage), process_case, write_result, concurrency)
+    print(f"\n🚨 Total files with issues: {issue_count}")
+    return issue_count
@@ -0,0 +1,176 @@
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from transformer.phase1_phase2_func import (
+    summarize_text_if_needed, routed_group_texts, extract_base_json, call_gpt_for_file, extract_and_fix_json
+)
+from transformer.phase3_merge_json import merge_pair, merge_pair_gpt
+from transformer.lineage import is_current, record_lineage
+from transformer.rule_extractor import pre_extract, prefill_schema
+from extractor.raw_store import text_case_id, with_case_id
+from loader.corpus_shards import list_entries, read_text, read_json, write_json, copy_entry
+
+# === Per-case task graph for transform() ===
+#
+#   summarize ──┬── custom ──┐
+#               └── base ────┴── merge
+#
+# Every case moves through the graph on its own: custom and base extraction of
+# a case run side by side, and its merge starts as soon as both exist, so one
+# slow file no longer holds up every other case's merge. A failed node is
+# retried on its own (first with the normal prompt, then with the issue prompt
+# and a larger token budget, like the issue resolvers do) instead of
+# re-scanning a whole issue directory afterwards. Nodes whose lineage is
+# unchanged since the last run reuse their existing output.
+
+
+def custom_output_name(filename):
+    return f"_{re.sub(r'[^a-zA-Z0-9]+', '_', filename[:-4].lower())}.json"
+
+
+def base_output_name(filename):
+    return filename.replace(".txt", "_base.json")
+
+
+def reuse_output(lineage, name, content, output_dir, output_name):
+    if is_current(lineage, name, content, output_dir):
+        print(f"⏭️ Unchanged since last run, reusing {output_name}")
+        return read_json(output_dir, output_name)
+    return None
+
+
+def run_custom_node(filename, case_text, stage):
+    raw_text = read_text(stage["input_dir"], filename)
+    reused = reuse_output(stage.get("custom_lineage"), filename, raw_text, stage["output_dir_custom"],
+                          custom_output_name(filename))
+    if reused:
+        return reused
+    for system_prompt, token in ((stage["custom_prompt"], 8192), (stage["custom_issue_prompt"], 15000)):
+        for attempt in range(3):
+            try:
+                raw_response = call_gpt_for_file(case_text, stage["client"], system_prompt, token, attempt > 0)
+                fixed_json = extract_and_fix_json(raw_response, filename, case_id=text_case_id(raw_text))
+                if fixed_json:
+                    write_json(stage["output_dir_custom"], custom_output_name(filename), fixed_json)
+                    record_lineage(stage.get("custom_lineage"), filename, raw_text, custom_output_name(filename))
+                    return fixed_json
+                print(f"🔁 Custom retry {attempt + 1} for {filename}")
+            except Exception as e:
+                print(f"❌ GPT call failed: {e}")
+    return None
+
+
+def run_base_node(filename, case_text, stage):
+    raw_text = read_text(stage["input_dir"], filename)
+    reused = reuse_output(stage.get("base_lineage"), filename, raw_text, stage["output_dir_base"],
+                          base_output_name(filename))
+    if reused:
+        return reused
+    prefilled = pre_extract(raw_text) if stage.get("prefill") else {}
+    case_schema = prefill_schema(stage["schema_template"], prefilled)
+    group_texts = None
+    if stage.get("sliced") and stage.get("segmented"):
+        # The summarize node's whole-case text is not used; each field group gets its own segments
+        group_texts = routed_group_texts(raw_text, filename, stage["schema_template"], prefilled,
+                                         stage["deployment_name"], stage["summarization_prompt"], stage["client"])
+    for system_prompt, token in ((stage["base_prompt"], 8192), (stage["base_issue_prompt"], 15000)):
+        parsed_json = extract_base_json(case_schema, stage["schema_template"], case_text, system_prompt,
+                                        stage["deployment_name"], stage["client"], token, filename, prefilled,
+                                        stage.get("sliced"), group_texts)
+        if parsed_json:
+            parsed_json = with_case_id(parsed_json, text_case_id(raw_text))
+            write_json(stage["output_dir_base"], base_output_name(filename), parsed_json)
+            record_lineage(stage.get("base_lineage"), filename, raw_text, base_output_name(filename))
+            return parsed_json
+        print(f"🔁 Base extraction failed for {filename}, trying the issue prompt")
+    return None
+
+
+def run_merge_node(filename, base_json, custom_json, stage):
+    merge_input = {"base": base_json, "custom": custom_json}
+    reused = reuse_output(stage.get("merge_lineage"), base_output_name(filename), merge_input, stage["final_json"],
+                          custom_output_name(filename))
+    if reused:
+        return reused
+    # Local schema-aware merge first; a full GPT merge with the issue prompt only if that fails
+    attempts = ((lambda: merge_pair(base_json, custom_json, filename, stage["merge_prompt"], stage["client"])),
+                (lambda: merge_pair_gpt(base_json, custom_json, filename, stage["merge_issue_prompt"], stage["client"],
+                                        16000)))
+    for attempt in attempts:
+        parsed = attempt()
+        if parsed:
+            parsed = with_case_id(parsed, text_case_id(read_text(stage["input_dir"], filename)))
+            output_filename = custom_output_name(filename)
+            write_json(stage["final_json"], output_filename, parsed)
+            record_lineage(stage.get("merge_lineage"), base_output_name(filename), merge_input, output_filename)
+            print(f"✅ Merged and saved: {output_filename}")
+            return parsed
+    return None
+
+
+def run_summarize_node(filename, stage):
+    case_text = read_text(stage["input_dir"], filename)
+    return summarize_text_if_needed(case_text, filename, stage["summarized_dir"], stage["deployment_name"],
+                                    stage["summarization_prompt"], stage["client"])
+
+
+def transform_cases_dag(stage, workers=8):
+    """
+    Runs summarize -> (custom, base) -> merge for every case in
+    stage["input_dir"]. `stage` carries the client, prompts, schema and
+    directories set up in transform(). Returns {"custom": n, "base": n,
+    "merge": n} failure counts; failed inputs are copied to the issue dirs.
+    """
+    filenames = list_entries(stage["input_dir"], ".txt")
+    issues = {"summarize": 0, "custom": 0, "base": 0, "merge": 0}
+    results = {filename: {} for filename in filenames}
+    started = time.perf_counter()
+    first_final = None
+    finished = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(run_summarize_node, filename, stage): (filename, "summarize") for filename in filenames}
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                filename, node = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"❌ {node} failed for {filename}: {e}")
+                    result = None
+                results[filename][node] = result
+
+                if node == "summarize":
+                    if result is None:
+                        issues["summarize"] += 1
+                        continue
+                    pending[pool.submit(run_custom_node, filename, result, stage)] = (filename, "custom")
+                    pending[pool.submit(run_base_node, filename, result, stage)] = (filename, "base")
+
+                elif node in ("custom", "base"):
+                    if result is None:
+                        issues[node] += 1
+                        issue_dir = stage["issues_dir_custom"] if node == "custom" else stage["issues_dir_base"]
+                        copy_entry(stage["input_dir"], issue_dir, filename)
+                        print(f"⚠️ Moved problematic file to issue dir: {os.path.join(issue_dir, filename)}")
+                    case = results[filename]
+                    if case.get("custom") and case.get("base"):
+                        pending[pool.submit(run_merge_node, filename, case["base"], case["custom"], stage)] = \
+                            (filename, "merge")
+
+                elif node == "merge":
+                    if result is None:
+                        issues["merge"] += 1
+                        print(f"⚠️ Final merge failure: {filename}")
+                        continue
+                    finished += 1
+                    if first_final is None:
+                        first_final = time.perf_counter() - started
+                        print(f"🏁 First final JSON after {first_final:.1f}s")
+
+    print(f"\n🎯 DAG transform finished: {finished}/{len(filenames)} cases merged in "
+          f"{time.perf_counter() - started:.1f}s. Issues: {issues}")
+    return issues
@@ -0,0 +1,185 @@
+import os
+import re
+import joblib
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from extractor.language_gate import split_paragraphs
+
+# === Judgment segmentation ===
+# A judgment is labelled paragraph by paragraph as caption, counsel, facts,
+# arguments, findings or order. Cue phrases decide the label where they are
+# clear; a paragraph without a cue takes the label of the paragraph before it
+# (judgments move forward through these parts), or the optional classifier's
+# label if one has been trained. Extraction calls then get only the segments
+# their fields need, e.g. punishment and Decision_or_verdict see just the order.
+SEGMENT_LABELS = ["caption", "counsel", "facts", "arguments", "findings", "order"]
+SEGMENT_CONFIG = {
+    "caption_share": 0.25,
+    "order_share": 0.6,
+    "min_routed_chars": 300,
+    "classifier_path": "D:/LegalMorph/segment_classifier.joblib",
+}
+
+CUES = {
+    "caption": [r"\bin\s+the\s+(?:supreme|high|federal|district|sessions)\b.*\bcourt\b", r"\bversus\b|\bvs\.?\b",
+                r"\bdate\s+of\s+(?:hearing|decision|judgment)\b", r"\b(?:appellate|original|revisional)\s+jurisdiction\b",
+                r"^\s*(?:present|coram|before)\s*:"],
+    "counsel": [r"\bfor\s+the\s+(?:appellant|petitioner|respondent|complainant|state|accused)s?\b",
+                r"\badvocates?(?:\s+supreme\s+court|\s+high\s+court)?\b", r"\b(?:A\.?A\.?G|D\.?P\.?G|A\.?G|DAG)\b",
+                r"\bprosecutor\s+general\b", r"\bin\s+person\b"],
+    "facts": [r"\bbrief(?:ly)?\s+(?:stated\s+)?(?:the\s+)?facts\b", r"\bfacts\s+of\s+the\s+case\b", r"\bF\.?I\.?R\b",
+              r"\bprosecution\s+case\b", r"\bthe\s+occurrence\b", r"\blodged\b", r"\bthe\s+complainant\b"],
+    "arguments": [r"\blearned\s+counsel\b.*\b(?:contended|argued|submitted|urged|maintained|pleaded)\b",
+                  r"\b(?:contended|argued|submitted)\s+that\b", r"\bon\s+the\s+other\s+hand\b",
+                  r"\bopposed\s+the\s+(?:appeal|petition)\b"],
+    "findings": [r"\bwe\s+have\s+(?:heard|considered|gone\s+through|perused)\b", r"\bperusal\s+of\s+the\s+record\b",
+                 r"\bin\s+our\s+(?:view|opinion)\b", r"\bit\s+is\s+(?:well\s+)?settled\b", r"\bwe\s+(?:find|are\s+of\s+the)\b",
+                 r"\bthe\s+evidence\b.*\b(?:shows|reveals|establishes)\b"],
+    "order": [r"\bfor\s+the\s+(?:foregoing|above|aforesaid)\s+reasons\b",
+              r"\b(?:appeal|petition|revision|application)\s+(?:is|stands)\s+(?:hereby\s+)?(?:dismissed|allowed|accepted|"
+              r"disposed\s+of|partly\s+allowed)\b", r"\b(?:is|are)\s+(?:hereby\s+)?acquitted\b",
+              r"\bsentenced?\s+to\b", r"\bconviction\s+and\s+sentence\b", r"\bannounced\s+in\s+open\s+court\b",
+              r"\bset\s+aside\b", r"\bleave\s+(?:is\s+)?(?:granted|refused)\b"],
+}
+COMPILED_CUES = {label: [re.compile(cue, re.IGNORECASE) for cue in cues] for label, cues in CUES.items()}
+
+# Segments each base-schema field needs; fields not listed get the whole text
+FIELD_SEGMENTS = {
+    "case_title": ["caption"],
+    "reference_no_or_id": ["caption"],
+    "judgment_date": ["caption", "order"],
+    "first_hearing_date": ["caption", "facts"],
+    "court": ["caption"],
+    "bench_type": ["caption"],
+    "judges": ["caption", "order"],
+    "appellant": ["caption", "counsel", "facts"],
+    "respondant": ["caption", "counsel", "facts"],
+    "accussed_details": ["caption", "facts"],
+    "lawyers": ["caption", "counsel"],
+    "complaint_summary": ["facts"],
+    "investigation_summary": ["facts"],
+    "judgment_summary": ["findings", "order"],
+    "punishment": ["order"],
+    "Decision_or_verdict": ["order"],
+    "arguments": ["arguments"],
+    "appeal_number": ["caption"],
+    "source": ["caption"],
+    "metadata": ["caption"],
+    "summary_vector_notes": ["facts", "findings", "order"],
+    "witnesses": ["facts", "findings"],
+    "witness_statement": ["facts", "findings"],
+    "assets": ["facts", "findings"],
+    "citations": ["arguments", "findings"],
+    "key_issues": ["arguments", "findings"],
+    "maxims": ["arguments", "findings"],
+    "statutes": ["caption", "facts", "arguments", "findings"],
+    "sections": ["caption", "facts", "arguments", "findings"],
+    "legal_categories": ["caption", "facts", "findings"],
+    "legal_terms": ["arguments", "findings"],
+    "words_and_phrases": ["arguments", "findings"],
+}
+
+_classifier = {}
+
+
+def cue_label(paragraph, position, in_header=True):
+    """
+    Label from cue phrases, weighted by where the paragraph sits (0..1):
+    caption and counsel only in the header (before the body starts, and never
+    past caption_share), order only in the later part of the judgment.
+    """
+    scores = {label: sum(bool(cue.search(paragraph)) for cue in cues) for label, cues in COMPILED_CUES.items()}
+    if not in_header or position > SEGMENT_CONFIG["caption_share"]:
+        scores["caption"] = 0
+        scores["counsel"] = 0
+    if position < SEGMENT_CONFIG["order_share"]:
+        scores["order"] = 0
+    best = max(scores, key=scores.get)
+    return best if scores[best] else None
+
+
+def load_segment_classifier(path=None):
+    path = path or SEGMENT_CONFIG["classifier_path"]
+    if path not in _classifier:
+        _classifier[path] = joblib.load(path) if os.path.exists(path) else None
+    return _classifier[path]
+
+
+def segment_judgment(text, classifier=None):
+    """
+    Returns [(label, paragraph)] in document order. Once the order has begun,
+    everything after it stays in the order.
+    """
+    paragraphs = split_paragraphs(text)
+    if classifier is None:
+        classifier = load_segment_classifier()
+    vectorizer = HashingVectorizer(n_features=2 ** 18, alternate_sign=False) if classifier else None
+    segments, previous = [], "caption"
+    for index, paragraph in enumerate(paragraphs):
+        position = index / max(len(paragraphs) - 1, 1)
+        in_header = previous in ("caption", "counsel")
+        label = cue_label(paragraph, position, in_header)
+        if label is None:
+            label = classifier.predict(vectorizer.transform([paragraph]))[0] if classifier else previous
+        if previous == "order":
+            label = "order"
+        elif label in ("caption", "counsel") and not in_header:
+            # A caption-like line in the body (e.g. a cited "X versus Y") does not restart the caption
+            label = previous
+        segments.append((label, paragraph))
+        previous = label
+    return segments
+
+
+def train_segment_classifier(texts, path=None):
+    """
+    Optional: fits a small linear classifier on the paragraphs the cue rules
+    label confidently, so paragraphs without any cue get a content-based label
+    instead of inheriting the previous one. Saved with joblib and picked up by
+    segment_judgment automatically.
+    """
+    path = path or SEGMENT_CONFIG["classifier_path"]
+    paragraphs, labels = [], []
+    for text in texts:
+        segments = segment_judgment(text, classifier=False)
+        for index, (label, paragraph) in enumerate(segments):
+            # Only paragraphs whose own cues agree with their final label are training examples
+            if cue_label(paragraph, index / max(len(segments) - 1, 1), label in ("caption", "counsel")) == label:
+                paragraphs.append(paragraph)
+                labels.append(label)
+    if len(set(labels)) < 2:
+        print("⚠️ Not enough labelled paragraphs to train a segment classifier")
+        return None
+    vectorizer = HashingVectorizer(n_features=2 ** 18, alternate_sign=False)
+    classifier = SGDClassifier(loss="log_loss", random_state=0).fit(vectorizer.transform(paragraphs), labels)
+    joblib.dump(classifier, path)
+    _classifier.pop(path, None)
+    print(f"🧭 Segment classifier trained on {len(paragraphs)} paragraphs")
+    return classifier
+
+
+def segments_for_fields(fields):
+    needed = set()
+    for field in fields:
+        if field not in FIELD_SEGMENTS:
+            return set(SEGMENT_LABELS)
+        needed.update(FIELD_SEGMENTS[field])
+    return needed
+
+
+def route_text(segments, labels):
+    """
+    Joins the paragraphs of the wanted segments. Falls back to the whole text
+    when segmentation found too little of them to be trusted.
+    """
+    routed = "\n\n".join(paragraph for label, paragraph in segments if label in labels)
+    if len(routed) < SEGMENT_CONFIG["min_routed_chars"]:
+        return "\n\n".join(paragraph for _, paragraph in segments)
+    return routed
+
+
+def segment_summary(segments):
+    sizes = {label: 0 for label in SEGMENT_LABELS}
+    for label, paragraph in segments:
+        sizes[label] += len(paragraph)
+    return ", ".join(f"{label} {size}" for label, size in sizes.items() if size)
@@ -0,0 +1,109 @@
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from extractor.raw_store import content_hash
+from loader.corpus_shards import entry_exists
+
+# === Lineage manifest for incremental transform ===
+# Every case output (custom, base and final JSON) is recorded with the hash of
+# the input it was made from, the hash of the prompts and schema that shaped it,
+# the model and a timestamp. A stage skips a case whose recorded lineage still
+# matches and whose output still exists. The merge stage hashes the base and
+# custom JSON it merges, so a prompt change re-runs only the affected stage and
+# the merges whose inputs actually changed.
+LINEAGE_PATH = "D:/LegalMorph/lineage.db"
+
+_lock = threading.Lock()
+
+
+def sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def input_hash(content):
+    # Raw case text uses the raw store's normalized hash; JSON inputs are hashed canonically
+    if isinstance(content, str):
+        return content_hash(content)
+    return sha256(json.dumps(content, sort_keys=True, ensure_ascii=False))
+
+
+def stage_lineage(stage, prompts, model, schema=None, path=LINEAGE_PATH):
+    """
+    Describes one stage of a transform run. prompts lists every prompt whose
+    change should re-run the stage (including the summarization and issue
+    prompts).
+    """
+    return {
+        "stage": stage,
+        "prompt_hash": sha256("\n\n".join(prompt.strip() for prompt in prompts)),
+        "schema_hash": sha256(schema) if schema else "",
+        "model": model,
+        "path": path,
+    }
+
+
+def open_lineage(path=LINEAGE_PATH):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS lineage (
+            stage TEXT NOT NULL,
+            name TEXT NOT NULL,
+            input_hash TEXT NOT NULL,
+            prompt_hash TEXT NOT NULL,
+            schema_hash TEXT NOT NULL,
+            model TEXT NOT NULL,
+            output_name TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (stage, name)
+        )
+    """)
+    return conn
+
+
+def get_lineage(lineage, name):
+    with _lock:
+        conn = open_lineage(lineage["path"])
+        try:
+            row = conn.execute("SELECT input_hash, prompt_hash, schema_hash, model, output_name, created_at "
+                               "FROM lineage WHERE stage = ? AND name = ?", (lineage["stage"], name)).fetchone()
+        finally:
+            conn.close()
+    if not row:
+        return None
+    return dict(zip(("input_hash", "prompt_hash", "schema_hash", "model", "output_name", "created_at"), row))
+
+
+def is_current(lineage, name, content, output_dir):
+    """
+    True if `name` was already transformed by this stage from the same input,
+    prompts, schema and model and its output is still in output_dir.
+    """
+    if lineage is None:
+        return False
+    recorded = get_lineage(lineage, name)
+    if not recorded:
+        return False
+    unchanged = (recorded["input_hash"] == input_hash(content)
+                 and recorded["prompt_hash"] == lineage["prompt_hash"]
+                 and recorded["schema_hash"] == lineage["schema_hash"]
+                 and recorded["model"] == lineage["model"])
+    return unchanged and entry_exists(output_dir, recorded["output_name"])
+
+
+def record_lineage(lineage, name, content, output_name, digest=None):
+    # digest: input_hash(content) when the caller already has it, so content may then be None
+    if lineage is None:
+        return
+    with _lock:
+        conn = open_lineage(lineage["path"])
+        try:
+            conn.execute("INSERT OR REPLACE INTO lineage (stage, name, input_hash, prompt_hash, schema_hash, model, "
+                         "output_name, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (lineage["stage"], name, digest or input_hash(content), lineage["prompt_hash"],
+                          lineage["schema_hash"], lineage["model"], output_name,
+                          time.strftime('%Y-%m-%d %H:%M:%S')))
+            conn.commit()
+        finally:
+            conn.close()
@@ -0,0 +1,244 @@
+import re
+import json
+from difflib import SequenceMatcher
+from transformer.request_scheduler import chat_completion
+from transformer.response_cache import parses_as_json
+
+# === Local schema-aware merge for phase 3 ===
+# base_schema_template.json is the spine of the merged case. Custom keys are
+# mapped onto schema keys by normalized key or KEY_ALIASES, lists are unioned
+# without duplicates, "N/A" and empty values are filled from the other side and
+# near-identical strings keep the more complete one. Only free-text fields that
+# genuinely disagree are sent to the LLM, in one small request per case.
+BASE_SCHEMA_PATH = "D:\\LegalMorph\\transformer\\base_schema_template.json"
+TEXT_SIMILARITY_THRESHOLD = 0.9
+EMPTY_VALUES = {"", "n/a", "na", "none", "null", "not available", "not mentioned", "unknown", "-"}
+# Normalized custom key -> normalized schema key. Explicit only: similar-looking keys such as
+# last_hearing_date and first_hearing_date are different facts and must never be merged.
+KEY_ALIASES = {
+    "title": "case_title",
+    "case_name": "case_title",
+    "reference_no": "reference_no_or_id",
+    "reference_number": "reference_no_or_id",
+    "case_number": "reference_no_or_id",
+    "case_no": "reference_no_or_id",
+    "judgement_date": "judgment_date",
+    "date_of_judgment": "judgment_date",
+    "date_of_judgement": "judgment_date",
+    "bench": "bench_type",
+    "judge": "judges",
+    "appellants": "appellant",
+    "respondent": "respondant",
+    "respondents": "respondant",
+    "accused": "accussed_details",
+    "accused_details": "accussed_details",
+    "allegations": "allegation",
+    "defence": "defense",
+    "sentence": "punishment",
+    "decision": "decision_or_verdict",
+    "verdict": "decision_or_verdict",
+    "decision_verdict": "decision_or_verdict",
+    "statute": "statutes",
+    "section": "sections",
+    "citation": "citations",
+    "witness": "witnesses",
+    "witness_statements": "witness_statement",
+    "issues": "key_issues",
+    "legal_maxims": "maxims",
+}
+
+CONFLICT_PROMPT = """
+You are resolving conflicts between two extractions of the same legal case.
+You will receive a JSON object mapping a field path to {"base": ..., "custom": ...}.
+For every path, return the single most accurate and complete value, combining both when they hold different facts.
+Keep legal details, names, dates and citations exact. Do not add information that is in neither value.
+Return only a JSON object mapping each path to its resolved value, with no markdown or explanation.
+"""
+
+_schema_cache = {}
+
+
+def load_schema(path=BASE_SCHEMA_PATH):
+    if path not in _schema_cache:
+        with open(path, "r", encoding="utf-8") as f:
+            _schema_cache[path] = json.load(f)
+    return _schema_cache[path]
+
+
+def normalize_key(key):
+    return re.sub(r'[^a-z0-9]+', '_', str(key).lower()).strip('_')
+
+
+def normalize_text(value):
+    return re.sub(r'\s+', ' ', str(value)).strip().casefold()
+
+
+def is_empty(value):
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return normalize_text(value) in EMPTY_VALUES
+    if isinstance(value, (list, dict)):
+        return all(is_empty(item) for item in (value.values() if isinstance(value, dict) else value))
+    return False
+
+
+def match_key(key, candidates):
+    """
+    Maps a key onto one of the candidate keys by its normalized form, or through
+    KEY_ALIASES. Anything else is a different field.
+    """
+    normalized = {normalize_key(candidate): candidate for candidate in candidates}
+    target = normalize_key(key)
+    if target in normalized:
+        return normalized[target]
+    return normalized.get(KEY_ALIASES.get(target))
+
+
+def join_scalar(items):
+    parts = [item if isinstance(item, str) else json.dumps(item, ensure_ascii=False) for item in items if not is_empty(item)]
+    return parts[0] if len(parts) == 1 else "; ".join(parts)
+
+
+def conform_type(value, template):
+    # The schema decides whether a field is a list or a single string, whichever side filled it
+    if isinstance(template, list) and not isinstance(value, list):
+        return [] if is_empty(value) else [value]
+    if isinstance(template, str) and isinstance(value, list):
+        return join_scalar(value)
+    return value
+
+
+def item_identity(item):
+    # Two list items are the same entry if they normalize to the same text or share a name
+    if isinstance(item, dict):
+        name_key = match_key("name", item.keys())
+        if name_key and not is_empty(item[name_key]):
+            return "name:" + normalize_text(item[name_key])
+        return json.dumps({normalize_key(k): normalize_text(v) for k, v in item.items()}, sort_keys=True)
+    return normalize_text(item)
+
+
+def merge_lists(base_list, custom_list, path, conflicts):
+    merged = []
+    positions = {}
+    for item in list(base_list) + list(custom_list):
+        if is_empty(item):
+            continue
+        identity = item_identity(item)
+        if identity in positions:
+            existing = merged[positions[identity]]
+            if isinstance(existing, dict) and isinstance(item, dict):
+                merged[positions[identity]] = merge_dicts(existing, item, path + [positions[identity]], conflicts)
+            continue
+        positions[identity] = len(merged)
+        merged.append(item)
+    return merged
+
+
+def merge_dicts(base_dict, custom_dict, path, conflicts, schema=None):
+    """
+    Keys of base_dict (or of schema, when given) define the shape. Custom keys
+    are matched onto them; unmatched custom keys are kept as extra fields.
+    """
+    spine = list(schema.keys()) if schema else list(base_dict.keys())
+    base_by_key = {}
+    for key, value in base_dict.items():
+        target = match_key(key, spine) or key
+        base_by_key[target] = merge_values(base_by_key[target], value, path + [target], conflicts) \
+            if target in base_by_key else value
+
+    merged = {key: base_by_key.get(key, schema[key] if schema else None) for key in spine}
+    for key, value in base_by_key.items():
+        merged.setdefault(key, value)
+    if schema:
+        merged.update({key: conform_type(merged[key], schema[key]) for key in spine})
+
+    for key, value in custom_dict.items():
+        target = match_key(key, merged.keys()) or key
+        if target in merged:
+            merged[target] = merge_values(merged[target], value, path + [target], conflicts)
+        else:
+            merged[target] = value
+    if schema:
+        merged.update({key: conform_type(merged[key], schema[key]) for key in spine})
+    return merged
+
+
+def merge_values(base_value, custom_value, path, conflicts):
+    if is_empty(custom_value):
+        return base_value
+    if is_empty(base_value):
+        return custom_value
+    if isinstance(base_value, dict) and isinstance(custom_value, dict):
+        return merge_dicts(base_value, custom_value, path, conflicts)
+    if isinstance(base_value, list) or isinstance(custom_value, list):
+        base_list = base_value if isinstance(base_value, list) else [base_value]
+        custom_list = custom_value if isinstance(custom_value, list) else [custom_value]
+        merged = merge_lists(base_list, custom_list, path, conflicts)
+        # A scalar field stays scalar; the list is only used to drop duplicate values
+        return merged if isinstance(base_value, list) else join_scalar(merged)
+    if isinstance(base_value, str) and isinstance(custom_value, str):
+        base_text, custom_text = normalize_text(base_value), normalize_text(custom_value)
+        if base_text == custom_text or custom_text in base_text:
+            return base_value
+        if base_text in custom_text:
+            return custom_value
+        if SequenceMatcher(None, base_text, custom_text).ratio() >= TEXT_SIMILARITY_THRESHOLD:
+            return base_value if len(base_value) >= len(custom_value) else custom_value
+        conflicts[path_label(path)] = {"path": list(path), "base": base_value, "custom": custom_value}
+        return base_value
+    # Numbers, booleans or mixed scalar types: the schema-driven base value wins
+    return base_value
+
+
+def path_label(path):
+    return ".".join(str(part) for part in path)
+
+
+def set_path(document, path, value):
+    target = document
+    for part in path[:-1]:
+        target = target[part]
+    target[path[-1]] = value
+
+
+def resolve_conflicts(conflicts, label, client, max_tokens=4096):
+    """
+    One LLM call for all conflicting free-text fields of a case. Returns
+    {path_label: resolved value}; on any failure the base values are kept.
+    """
+    payload = {name: {"base": c["base"], "custom": c["custom"]} for name, c in conflicts.items()}
+    try:
+        response = chat_completion(
+            client,
+            model="model name",
+            messages=[
+                {"role": "system", "content": CONFLICT_PROMPT.strip()},
+                {"role": "user", "content": json.dumps(payload, ensure_ascii=False)}
+            ],
+            temperature=0.2,
+            max_tokens=max_tokens,
+            validate=parses_as_json
+        )
+        resolved = json.loads(re.sub(r"^```json\s*|\s*```$", "", response.strip(), flags=re.IGNORECASE))
+        return {name: value for name, value in resolved.items() if name in conflicts}
+    except Exception as e:
+        print(f"⚠️ Conflict resolution failed for {label}, keeping base values: {e}")
+        return {}
+
+
+def merge_case_json(base_json, custom_json, label, client=None, schema=None):
+    """
+    Merges one base/custom pair locally. Returns the merged dict; client may be
+    None to skip the LLM entirely (conflicts then keep the base value).
+    """
+    conflicts = {}
+    merged = merge_dicts(base_json, custom_json, [], conflicts, schema=schema or load_schema())
+    if conflicts and client is not None:
+        print(f"🧠 {len(conflicts)} conflicting free-text fields in {label}, resolving with GPT")
+        for name, value in resolve_conflicts(conflicts, label, client).items():
+            set_path(merged, conflicts[name]["path"], value)
+    else:
+        print(f"🧩 Merged {label} locally ({len(conflicts)} conflicts)")
+    return merged
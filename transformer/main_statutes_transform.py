@@ -1,6 +1,7 @@
 from openai import AzureOpenAI
 from dotenv import load_dotenv
 from transformer.statutes_transformation import base_statute_json_gpt, base_statute_issue_resolver, custom_statutes_json_gpt, custom_statute_issue_resolver, merge_statutes_from_db
+from transformer.request_scheduler import print_scheduler_stats
 
 load_dotenv()
 
@@ -10,7 +11,8 @@ def transform_statute():
     client = AzureOpenAI(
         api_key="your api key",
         api_version="version",
-        azure_endpoint="platform endpoint"
+        azure_endpoint="platform endpoint",
+        max_retries=0
     )
 
     deployment_name = "name"
@@ -131,6 +133,7 @@ def transform_statute():
         base_statute_issue_resolver(deployment_name, client, base_issue_prompt, summarization_statute_prompt, 15000)
     print("Moving towards final json.")
     m_issue = merge_statutes_from_db(merge_statute_prompt, client)
+    print_scheduler_stats()
 
 
 # transform_statute()
@@ -1,16 +1,39 @@
 import os
-from openai import AzureOpenAI
+import asyncio
+from openai import AzureOpenAI, AsyncAzureOpenAI
 from dotenv import load_dotenv
 from transformer.phase1_phase2_func import base_json_gpt, base_issue_resolver, custom_json_gpt, custom_issue_resolver
 from transformer.phase3_merge_json import merge_json_gpt, merge_issue_resolver
+from transformer.async_transform import base_json_gpt_async, custom_json_gpt_async
+from transformer.case_dag import transform_cases_dag
+from transformer.request_scheduler import configure_scheduler, print_scheduler_stats
+from transformer.response_cache import configure_cache
+from transformer.lineage import stage_lineage
+from extractor.boilerplate import (
+    configure_boilerplate, ensure_boilerplate_model, boilerplate_fingerprint, print_boilerplate_stats
+)
+from loader.corpus_shards import create_corpus, pack_directory
 
 load_dotenv()
-def transform():
+def transform(use_corpus=False, concurrency=1, use_cache=True, dag=False, incremental=True, sliced=False,
+              prefill=True, boilerplate=True, segmented=False):
+    if segmented and not sliced:
+        # Segment routing feeds the field groups of sliced extraction; a single base request has nothing to route to
+        raise ValueError("segmented=True needs sliced=True")
     # --- Azure OpenAI GPT-4o client setup ---
+    # max_retries=0: 429s and transient errors are retried by the request scheduler, not hidden inside the SDK
     client = AzureOpenAI(
         api_key="Your api key",
         api_version="version",
-        azure_endpoint="platform endpoint"
+        azure_endpoint="platform endpoint",
+        max_retries=0
+    )
+    # Used by the concurrent mode (concurrency > 1) for the custom and base phases
+    async_client = AsyncAzureOpenAI(
+        api_key="Your api key",
+        api_version="version",
+        azure_endpoint="platform endpoint",
+        max_retries=0
     )
 
     # Directories
@@ -37,9 +60,31 @@ def transform():
     os.makedirs(output_dir_custom, exist_ok=True)
     os.makedirs(final_json, exist_ok=True)
 
+    if use_corpus:
+        # Every stage reads and writes zstd-compressed shards instead of one file per case
+        corpus_root = "D:/LegalMorph/corpus"
+        corpus_input = f"{corpus_root}/data"
+        pack_directory(input_dir, corpus_input, ".txt")
+        input_dir = corpus_input
+        output_dir_base = create_corpus(f"{corpus_root}/base_json")
+        summarized_dir = create_corpus(f"{corpus_root}/summarized_text")
+        issues_dir_base = create_corpus(f"{corpus_root}/issues_base")
+        output_dir_custom = create_corpus(f"{corpus_root}/custom_json")
+        issues_dir_custom = create_corpus(f"{corpus_root}/issues_custom")
+        final_json = create_corpus(f"{corpus_root}/final_json")
+
     # threshold
     match_threshold = 0.6
 
+    # Deployment quota shared by every GPT call below (see request_scheduler)
+    # max_in_flight caps concurrent async requests (every field group of a sliced case counts)
+    configure_scheduler(requests_per_minute=60, tokens_per_minute=150000, max_in_flight=max(concurrency, 1))
+    # use_cache=False forces every case to be sent to GPT again (e.g. after a prompt-independent model change)
+    configure_cache(enabled=use_cache)
+    # Corpus-learned boilerplate is stripped from every case before token counting and summarization
+    configure_boilerplate(enabled=boilerplate)
+    boilerplate_model = ensure_boilerplate_model(input_dir) if boilerplate else None
+
     # === Prompts ===
     base_prompt = """
     You are a Legal Case Data Transformer and Assistant Data Enhancer AI.
@@ -165,23 +210,78 @@ def transform():
     - End with a closing brace '}' and do not leave any array or object unclosed.
     """
 
+    with open("D:\\LegalMorph\\transformer\\base_schema_template.json", "r", encoding="utf-8") as f:
+        schema_template = f.read()
+    merge_engine = "local"
+
+    # Lineage: a case is only re-run by a stage when its input, that stage's prompts, the schema or the model changed.
+    # incremental=False re-runs every case (outputs and lineage are then rewritten).
+    # The boilerplate fingerprint changes with the learned model, so relearning it re-runs the affected cases
+    custom_lineage = base_lineage = merge_lineage = None
+    if incremental:
+        boilerplate_tag = boilerplate_fingerprint(boilerplate_model)
+        custom_lineage = stage_lineage("custom", [summarization_prompt, custom_prompt, custom_issue_prompt,
+                                                  boilerplate_tag], deployment_name)
+        base_lineage = stage_lineage("base", [summarization_prompt, base_prompt, base_issue_prompt,
+                                              "sliced" if sliced else "full", "prefill" if prefill else "llm",
+                                              boilerplate_tag,
+                                              "segmented" if sliced and segmented else "whole"],
+                                     deployment_name, schema_template)
+        merge_lineage = stage_lineage("merge", [merge_prompt, merge_issue_prompt, merge_engine], deployment_name,
+                                      schema_template)
+
+    if dag:
+        # Per-case task graph instead of global phases; concurrency is the number of worker threads
+        stage = {
+            "client": client, "deployment_name": deployment_name, "schema_template": schema_template,
+            "input_dir": input_dir, "summarized_dir": summarized_dir, "output_dir_base": output_dir_base,
+            "output_dir_custom": output_dir_custom, "issues_dir_base": issues_dir_base,
+            "issues_dir_custom": issues_dir_custom, "final_json": final_json,
+            "summarization_prompt": summarization_prompt, "custom_prompt": custom_prompt,
+            "custom_issue_prompt": custom_issue_prompt, "base_prompt": base_prompt,
+            "base_issue_prompt": base_issue_prompt, "merge_prompt": merge_prompt,
+            "merge_issue_prompt": merge_issue_prompt, "custom_lineage": custom_lineage,
+            "base_lineage": base_lineage, "merge_lineage": merge_lineage, "sliced": sliced,
+            "prefill": prefill, "segmented": segmented,
+        }
+        transform_cases_dag(stage, workers=max(concurrency, 1))
+        print_scheduler_stats()
+        print_boilerplate_stats()
+        return
+
     print("Moving towards Custom json...")
-    i_custom = custom_json_gpt(input_dir, output_dir_custom, summarized_dir, issues_dir_custom, deployment_name, client,
-                               custom_prompt, summarization_prompt, 8192)
+    if concurrency > 1:
+        i_custom = asyncio.run(custom_json_gpt_async(input_dir, output_dir_custom, summarized_dir, issues_dir_custom,
+                                                     deployment_name, client, async_client, custom_prompt,
+                                                     summarization_prompt, 8192, concurrency, custom_lineage))
+    else:
+        i_custom = custom_json_gpt(input_dir, output_dir_custom, summarized_dir, issues_dir_custom, deployment_name,
+                                   client, custom_prompt, summarization_prompt, 8192, custom_lineage)
     if i_custom > 0:
         print("About to resolve custom issues")
         custom_issue_resolver(issues_dir_custom, output_dir_custom, summarized_dir, deployment_name, client,
-                              custom_issue_prompt, summarization_prompt, 15000)
+                              custom_issue_prompt, summarization_prompt, 15000, custom_lineage)
     print("Moving towards Base json...")
-    i_base = base_json_gpt(input_dir, output_dir_base, summarized_dir, issues_dir_base, deployment_name, client,
-                           base_prompt, summarization_prompt, 8192)
+    if concurrency > 1:
+        i_base = asyncio.run(base_json_gpt_async(input_dir, output_dir_base, summarized_dir, issues_dir_base,
+                                                 deployment_name, client, async_client, base_prompt,
+                                                 summarization_prompt, 8192, concurrency, base_lineage, sliced,
+                                                 prefill, segmented))
+    else:
+        i_base = base_json_gpt(input_dir, output_dir_base, summarized_dir, issues_dir_base, deployment_name, client,
+                               base_prompt, summarization_prompt, 8192, base_lineage, sliced, prefill,
+                               segmented)
     if i_base > 0:
         print("About to resolve base issues")
         base_issue_resolver(issues_dir_base, output_dir_base, summarized_dir, deployment_name, client, base_issue_prompt,
-                            summarization_prompt, 15000)
+                            summarization_prompt, 15000, base_lineage, sliced, prefill,
+                            segmented)
     print("Moving towards final json.")
     m_issue = merge_json_gpt(output_dir_base, output_dir_custom, final_json, issues_dir_base, issues_dir_custom,
-                             merge_prompt, client, match_threshold)
+                             merge_prompt, client, match_threshold, merge_engine, merge_lineage)
     if m_issue > 0:
         print("Moving to resolve issues occurred in merging json files")
-        merge_issue_resolver(issues_dir_base, issues_dir_custom, final_json, merge_issue_prompt, client, match_threshold)
+        merge_issue_resolver(issues_dir_base, issues_dir_custom, final_json, merge_issue_prompt, client, match_threshold,
+                             merge_lineage)
+    print_scheduler_stats()
+    print_boilerplate_stats()
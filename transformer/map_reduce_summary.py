@@ -0,0 +1,142 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from transformer.request_scheduler import chat_completion, get_encoding
+
+# === Map-reduce summarization for long cases and statutes ===
+# map:    the text is cut on paragraph/section boundaries into chunks with a small
+#         overlap, and every chunk is summarized concurrently (each one retried
+#         on its own if it fails)
+# reduce: if the joined chunk summaries are still over the input budget, they
+#         are summarized again the same way
+# A chunk that keeps failing is left out and the rest is reduced; whatever is
+# still over the budget at the end is cut to it. The original long text is
+# never handed back, since that is the context overflow this module prevents.
+SUMMARY_CONFIG = {
+    "chunk_tokens": 20000,
+    "overlap_tokens": 400,
+    "workers": 8,
+    "chunk_retries": 3,
+    "max_reduce_passes": 2,
+    "max_tokens": 8192,
+    "temperature": 0.3,
+}
+SECTION_BREAK = re.compile(r'\n\s*\n')
+SENTENCE_BREAK = re.compile(r'(?<=[.;:?!])\s+')
+
+
+def token_length(text, encoding):
+    return len(encoding.encode(text))
+
+
+def split_units(text, max_tokens, encoding):
+    """
+    Paragraphs (blank-line separated) as the natural unit; a paragraph longer
+    than max_tokens is split into sentences, and only a single sentence that
+    is still too long is cut at token offsets.
+    """
+    units = []
+    for paragraph in SECTION_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if token_length(paragraph, encoding) <= max_tokens:
+            units.append(paragraph)
+            continue
+        for sentence in SENTENCE_BREAK.split(paragraph):
+            tokens = encoding.encode(sentence)
+            for i in range(0, len(tokens), max_tokens):
+                units.append(encoding.decode(tokens[i:i + max_tokens]))
+    return units
+
+
+def split_on_boundaries(text, encoding, chunk_tokens=None, overlap_tokens=None):
+    chunk_tokens = chunk_tokens or SUMMARY_CONFIG["chunk_tokens"]
+    overlap_tokens = SUMMARY_CONFIG["overlap_tokens"] if overlap_tokens is None else overlap_tokens
+    chunks, current, current_tokens = [], [], 0
+    for unit in split_units(text, chunk_tokens, encoding):
+        unit_tokens = token_length(unit, encoding)
+        if current and current_tokens + unit_tokens > chunk_tokens:
+            chunks.append("\n\n".join(current))
+            # Carry the trailing paragraphs of this chunk over so context is not lost at the cut
+            carried, carried_tokens = [], 0
+            for previous in reversed(current):
+                previous_tokens = token_length(previous, encoding)
+                if carried_tokens + previous_tokens > overlap_tokens:
+                    break
+                carried.insert(0, previous)
+                carried_tokens += previous_tokens
+            current, current_tokens = carried, carried_tokens
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def summarize_chunk(chunk, deployment_name, summarization_prompt, client):
+    last_error = None
+    for attempt in range(SUMMARY_CONFIG["chunk_retries"]):
+        try:
+            summary = chat_completion(
+                client,
+                model=deployment_name,
+                messages=[
+                    {"role": "system", "content": summarization_prompt},
+                    {"role": "user", "content": chunk}
+                ],
+                temperature=SUMMARY_CONFIG["temperature"],
+                max_tokens=SUMMARY_CONFIG["max_tokens"],
+                bypass_cache=attempt > 0
+            )
+            if summary:
+                return summary
+            print(f"⚠️ Empty chunk summary (attempt {attempt + 1})")
+        except Exception as e:
+            last_error = e
+            print(f"❌ Chunk summarization failed (attempt {attempt + 1}): {e}")
+    raise RuntimeError(f"Chunk could not be summarized after {SUMMARY_CONFIG['chunk_retries']} attempts: {last_error}")
+
+
+def try_summarize_chunk(chunk, deployment_name, summarization_prompt, client):
+    try:
+        return summarize_chunk(chunk, deployment_name, summarization_prompt, client)
+    except Exception as e:
+        print(f"⚠️ Leaving chunk out of the summary: {e}")
+        return None
+
+
+def truncate_to_budget(text, deployment_name, max_input_tokens):
+    # Last resort: keep whole paragraphs (sentences, tokens) from the start up to the budget
+    encoding = get_encoding(deployment_name)
+    if token_length(text, encoding) <= max_input_tokens:
+        return text
+    return split_on_boundaries(text, encoding, chunk_tokens=max_input_tokens, overlap_tokens=0)[0]
+
+
+def map_reduce_summarize(text, deployment_name, summarization_prompt, client, max_input_tokens=70000):
+    """
+    Summarizes text until it fits in max_input_tokens. Chunks are summarized
+    in parallel, so latency is close to that of the slowest chunk. Returns
+    (summary, complete); complete is False if a chunk had to be left out or
+    the result was cut to the budget, and such a summary should not be cached.
+    """
+    encoding = get_encoding(deployment_name)
+    summary, complete = text, True
+    for reduce_pass in range(SUMMARY_CONFIG["max_reduce_passes"] + 1):
+        chunks = split_on_boundaries(summary, encoding)
+        print(f"🧩 Summarizing {len(chunks)} chunks (pass {reduce_pass + 1})...")
+        with ThreadPoolExecutor(max_workers=min(SUMMARY_CONFIG["workers"], len(chunks))) as pool:
+            chunk_summaries = list(pool.map(
+                lambda chunk: try_summarize_chunk(chunk, deployment_name, summarization_prompt, client), chunks))
+        succeeded = [chunk_summary for chunk_summary in chunk_summaries if chunk_summary]
+        if len(succeeded) < len(chunks):
+            complete = False
+            print(f"⚠️ {len(chunks) - len(succeeded)} of {len(chunks)} chunks could not be summarized")
+        if not succeeded:
+            break
+        summary = "\n\n".join(succeeded)
+        if token_length(summary, encoding) <= max_input_tokens:
+            return summary, complete
+        print(f"🔁 Joined summary still over {max_input_tokens} tokens, reducing again...")
+    print(f"✂️ Cutting the summary to {max_input_tokens} tokens")
+    return truncate_to_budget(summary, deployment_name, max_input_tokens), False
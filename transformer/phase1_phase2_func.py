@@ -1,14 +1,25 @@
 import os
 import json
-import time
 import tiktoken
-import shutil
 from dotenv import load_dotenv
 import re
 import json5
+from transformer.request_scheduler import chat_completion
+from transformer.response_cache import parses_as_json
+from transformer.summary_cache import get_summary, put_summary
+from transformer.map_reduce_summary import map_reduce_summarize, truncate_to_budget
+from transformer.lineage import is_current, record_lineage
+from transformer.sliced_extraction import extract_sliced, schema_slices
+from transformer.judgment_segmenter import segment_judgment, segment_summary, segments_for_fields, route_text
+from transformer.rule_extractor import pre_extract, prefill_schema, apply_prefill
+from extractor.raw_store import text_case_id, with_case_id
+from extractor.boilerplate import strip_boilerplate, record_savings
+from loader.corpus_shards import list_entries, read_text, write_text, write_json, copy_entry
 
 load_dotenv()
 
+MAX_INPUT_TOKENS = 70000
+
 
 # === Token helper ===
 def count_tokens(text, model="your model name"):
@@ -16,64 +27,100 @@ def count_tokens(text, model="your model name"):
     return len(enc.encode(text))
 
 
-# === Chunking for summarization ===
-def split_text_into_token_chunks(text, max_tokens_per_chunk=120000):
-    enc = tiktoken.encoding_for_model("your deployment name")
-    tokens = enc.encode(text)
-    for i in range(0, len(tokens), max_tokens_per_chunk):
-        yield enc.decode(tokens[i:i + max_tokens_per_chunk])
+# === Corpus boilerplate (menus, disclaimers, repeated headnote captions) ===
+def strip_case_boilerplate(text, filename):
+    stripped = strip_boilerplate(text)
+    if stripped is text:
+        return text
+    tokens_before, tokens_after = count_tokens(text), count_tokens(stripped)
+    if tokens_after < tokens_before:
+        record_savings(filename, tokens_before, tokens_after)
+        print(f"🧽 Boilerplate removed from {filename}: {tokens_before} → {tokens_after} tokens "
+              f"(-{tokens_before - tokens_after})")
+    return stripped
 
 
 # === Summarize large input ===
-def summarize_text_if_needed(text, filename, summarized_dir, deployment_name, summarization_prompt, client):
-    max_input_tokens = 70000
+def summarize_text_if_needed(text, filename, summarized_dir, deployment_name, summarization_prompt, client,
+                             strip=True):
+    # strip=False for text that was already stripped (routed segments), so savings are recorded once per case
+    max_input_tokens = MAX_INPUT_TOKENS
+    if strip:
+        text = strip_case_boilerplate(text, filename)
     token_count = count_tokens(text)
 
     if token_count <= max_input_tokens:
         return text
 
-    print(f"🧹 Text too long ({token_count} tokens). Summarizing...")
+    # Already summarized by an earlier phase or run (same content, same prompt)
+    cached_summary = get_summary(text, summarization_prompt)
+    if cached_summary is not None:
+        print(f"♻️ Reusing cached summary for {filename}")
+        return cached_summary
 
-    summarized_chunks = []
-    for chunk in split_text_into_token_chunks(text, 90000):
-        try:
-            response = client.chat.completions.create(
-                model=deployment_name,
-                messages=[
-                    {"role": "system", "content": summarization_prompt},
-                    {"role": "user", "content": chunk}
-                ],
-                temperature=0.3,
-                max_tokens=8192
-            )
-            summarized_chunks.append(response.choices[0].message.content.strip())
-        except Exception as e:
-            print(f"❌ Chunk summarization failed: {e}")
-            return text  # fallback
+    print(f"🧹 Text too long ({token_count} tokens). Summarizing...")
 
-    summary = "\n\n".join(summarized_chunks)
-    with open(os.path.join(summarized_dir, filename), "w", encoding="utf-8") as f:
-        f.write(summary)
+    try:
+        summary, complete = map_reduce_summarize(text, deployment_name, summarization_prompt, client,
+                                                 max_input_tokens)
+    except Exception as e:
+        print(f"❌ Summarization failed: {e}")
+        # Never send the over-budget text itself
+        return truncate_to_budget(text, deployment_name, max_input_tokens)
+    if not complete:
+        # A partial summary is used for this run only; the next run tries again
+        return summary
+    put_summary(text, summarization_prompt, summary)
+    if summarized_dir:
+        write_text(summarized_dir, filename, summary)
     return summary
 
 
+# === Segment routing for sliced extraction ===
+def routed_group_texts(text, filename, schema_template, prefilled, deployment_name, summarization_prompt, client):
+    """
+    {group: text} for the field groups of sliced extraction, each holding only
+    the judgment segments its fields need. Every group whose routed text is
+    over the input budget (including a fallback to the whole text) gets the
+    same summary of the whole case, so a long case is summarized once.
+    """
+    text = strip_case_boilerplate(text, filename)
+    segments = segment_judgment(text)
+    print(f"🧭 Segments of {filename}: {segment_summary(segments)}")
+    _, slices = schema_slices(schema_template, prefilled)
+    group_texts, case_summary = {}, None
+    for group, part in slices:
+        routed = route_text(segments, segments_for_fields(part))
+        if count_tokens(routed) <= MAX_INPUT_TOKENS:
+            group_texts[group] = routed
+            continue
+        if case_summary is None:
+            case_summary = summarize_text_if_needed(text, filename, None, deployment_name, summarization_prompt,
+                                                    client, strip=False)
+        group_texts[group] = case_summary
+    return group_texts
+
+
 # === GPT call ===
-def call_gpt_with_schema(schema, text, system_prompt, deployment_name, client, token):
+def call_gpt_with_schema(schema, text, system_prompt, deployment_name, client, token, bypass_cache=False):
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": f"Base Schema:\n{schema}\n\nCase Text:\n{text}"}
     ]
-    response = client.chat.completions.create(
+    return chat_completion(
+        client,
         model=deployment_name,
         messages=messages,
         temperature=0.2,
-        max_tokens=token
+        max_tokens=token,
+        validate=parses_as_json,
+        bypass_cache=bypass_cache
     )
-    return response.choices[0].message.content.strip()
 
 
-def call_gpt_for_file(case_text, client, system_prompt, token):
-    response = client.chat.completions.create(
+def call_gpt_for_file(case_text, client, system_prompt, token, bypass_cache=False):
+    return chat_completion(
+        client,
         model="model name",
         messages=[
             {"role": "system", "content": system_prompt},
@@ -81,8 +128,9 @@ def call_gpt_for_file(case_text, client, system_prompt, token):
         ],
         temperature=0.2,
         max_tokens=token,
+        validate=parses_as_json,
+        bypass_cache=bypass_cache,
     )
-    return response.choices[0].message.content.strip()
 
 
 # === JSON parse helper ===
@@ -96,7 +144,7 @@ def try_parse_json(text, filename):
         return None
 
 
-def extract_and_fix_json(raw_text, file_name, output_path=None):
+def extract_and_fix_json(raw_text, file_name, output_path=None, case_id=None):
     clean_text = raw_text.strip()
     clean_text = re.sub(r"^```json\s*|\s*```$", "", clean_text, flags=re.DOTALL).strip()
 
@@ -115,125 +163,149 @@ def extract_and_fix_json(raw_text, file_name, output_path=None):
             print(raw_text)
             return None
 
+    if case_id:
+        parsed_json = with_case_id(parsed_json, case_id)
+
     if output_path:
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(parsed_json, f, indent=2, ensure_ascii=False)
+        write_json(os.path.dirname(output_path), os.path.basename(output_path), parsed_json)
         print(f"💾 Saved to: {output_path}")
 
     return parsed_json
 
 
+def extract_base_json(case_schema, schema_template, case_text, system_prompt, deployment_name, client, token,
+                      filename, prefilled, sliced=False, group_texts=None):
+    """
+    Base JSON for one case, or None. Sliced extraction is called once: every
+    field group already retries inside extract_slice with its own budgets, so
+    `token` only applies to the single-request mode.
+    """
+    if sliced:
+        try:
+            return extract_sliced(schema_template, case_text, system_prompt, deployment_name, client, filename,
+                                  prefilled, group_texts)
+        except Exception as e:
+            print(f"❌ Sliced extraction failed: {e}")
+            return None
+    for attempt in range(3):
+        try:
+            raw_response = call_gpt_with_schema(case_schema, case_text, system_prompt, deployment_name, client,
+                                                token, attempt > 0)
+            parsed_json = apply_prefill(try_parse_json(raw_response, filename), prefilled, schema_template)
+            if parsed_json:
+                return parsed_json
+            print(f"🔁 Retry {attempt + 1}")
+        except Exception as e:
+            print(f"❌ GPT call failed: {e}")
+    return None
+
+
 # === Main Loop ===
 def base_json_gpt(input_dir, output_dir, summarise_dir, issue_dir, deployment_name, client, system_prompt,
-                  summarization_prompt, token):
+                  summarization_prompt, token, lineage=None, sliced=False, prefill=False, segmented=False):
     issue_count = 0
     # === Load single base schema ===
     base_schema_path = "D:\\LegalMorph\\transformer\\base_schema_template.json"
     with open(base_schema_path, "r", encoding="utf-8") as f:
         schema_template = f.read()
-    for filename in os.listdir(input_dir):
-        if not filename.lower().endswith(".txt"):
-            continue
+    for filename in list_entries(input_dir, ".txt"):
 
         print(f"\n📄 Processing {filename}")
-        file_path = os.path.join(input_dir, filename)
 
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                case_text = f.read()
-
-            case_text = summarize_text_if_needed(case_text, filename, summarise_dir, deployment_name,
+            case_text = read_text(input_dir, filename)
+            if is_current(lineage, filename, case_text, output_dir):
+                print(f"⏭️ Unchanged since last run, skipping {filename}")
+                continue
+            raw_text = case_text
+
+            # Dates, numbers, court, citations, statutes and sections found by rules are not generated again
+            prefilled = pre_extract(raw_text) if prefill else {}
+            case_schema = prefill_schema(schema_template, prefilled)
+            group_texts = None
+            if sliced and segmented:
+                # Each field group sees only its judgment segments, summarized on their own if still too long
+                group_texts = routed_group_texts(raw_text, filename, schema_template, prefilled, deployment_name,
                                                  summarization_prompt, client)
-            success = False
-            for attempt in range(3):
-                try:
-                    raw_response = call_gpt_with_schema(schema_template, case_text, system_prompt, deployment_name,
-                                                        client, token)
-                    parsed_json = try_parse_json(raw_response, filename)
-                    if parsed_json:
-                        out_path = os.path.join(output_dir, filename.replace(".txt", "_base.json"))
-                        with open(out_path, "w", encoding="utf-8") as f:
-                            json.dump(parsed_json, f, indent=2, ensure_ascii=False)
-                        print(f"✅ Saved to {out_path}")
-                        success = True
-                        break
-                    else:
-                        print(f"🔁 Retry {attempt + 1}")
-                        time.sleep(2)
-                except Exception as e:
-                    print(f"❌ GPT call failed: {e}")
-                    time.sleep(2)
-
-            if not success:
+            else:
+                case_text = summarize_text_if_needed(case_text, filename, summarise_dir, deployment_name,
+                                                     summarization_prompt, client)
+            parsed_json = extract_base_json(case_schema, schema_template, case_text, system_prompt, deployment_name,
+                                            client, token, filename, prefilled, sliced, group_texts)
+            if parsed_json:
+                out_path = os.path.join(output_dir, filename.replace(".txt", "_base.json"))
+                parsed_json = with_case_id(parsed_json, text_case_id(raw_text))
+                write_json(output_dir, os.path.basename(out_path), parsed_json)
+                record_lineage(lineage, filename, raw_text, os.path.basename(out_path))
+                print(f"✅ Saved to {out_path}")
+            else:
                 issue_count += 1
                 dest_path = os.path.join(issue_dir, filename)
-                shutil.copy(file_path, dest_path)
+                copy_entry(input_dir, issue_dir, filename)
                 print(f"⚠️ Moved problematic file to issue dir: {dest_path}")
 
         except Exception as e:
             print(f"❌ Error processing {filename}: {e}")
             issue_count += 1
-            dest_path = os.path.join(issue_dir, filename)
-            shutil.copy(file_path, dest_path)
+            copy_entry(input_dir, issue_dir, filename)
     print(f"\n🚨 Total files with issues: {issue_count}")
     return issue_count
 
 
 def base_issue_resolver(input_dir, output_dir, summarise_dir, deployment_name, client, system_prompt,
-                        summarization_prompt, token):
+                        summarization_prompt, token, lineage=None, sliced=False, prefill=False, segmented=False):
     # === Load single base schema ===
     base_schema_path = "D:\\LegalMorph\\transformer\\base_schema_template.json"
     with open(base_schema_path, "r", encoding="utf-8") as f:
         schema_template = f.read()
-    for filename in os.listdir(input_dir):
-        if not filename.lower().endswith(".txt"):
-            continue
+    for filename in list_entries(input_dir, ".txt"):
 
         print(f"\n📄 Processing {filename}")
-        file_path = os.path.join(input_dir, filename)
 
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                case_text = f.read()
-
-            case_text = summarize_text_if_needed(case_text, filename, summarise_dir, deployment_name,
+            case_text = read_text(input_dir, filename)
+            if is_current(lineage, filename, case_text, output_dir):
+                print(f"⏭️ Unchanged since last run, skipping {filename}")
+                continue
+            raw_text = case_text
+
+            # Dates, numbers, court, citations, statutes and sections found by rules are not generated again
+            prefilled = pre_extract(raw_text) if prefill else {}
+            case_schema = prefill_schema(schema_template, prefilled)
+            group_texts = None
+            if sliced and segmented:
+                # Each field group sees only its judgment segments, summarized on their own if still too long
+                group_texts = routed_group_texts(raw_text, filename, schema_template, prefilled, deployment_name,
                                                  summarization_prompt, client)
-            for attempt in range(3):
-                try:
-                    raw_response = call_gpt_with_schema(schema_template, case_text, system_prompt, deployment_name,
-                                                        client, token)
-                    parsed_json = try_parse_json(raw_response, filename)
-                    if parsed_json:
-                        out_path = os.path.join(output_dir, filename.replace(".txt", "_base.json"))
-                        with open(out_path, "w", encoding="utf-8") as f:
-                            json.dump(parsed_json, f, indent=2, ensure_ascii=False)
-                        print(f"✅ Saved to {out_path}")
-                        break
-                    else:
-                        print(f"🔁 Retry {attempt + 1}")
-                        time.sleep(2)
-                except Exception as e:
-                    print(f"❌ GPT call failed: {e}")
-                    time.sleep(2)
+            else:
+                case_text = summarize_text_if_needed(case_text, filename, summarise_dir, deployment_name,
+                                                     summarization_prompt, client)
+            parsed_json = extract_base_json(case_schema, schema_template, case_text, system_prompt, deployment_name,
+                                            client, token, filename, prefilled, sliced, group_texts)
+            if parsed_json:
+                out_path = os.path.join(output_dir, filename.replace(".txt", "_base.json"))
+                parsed_json = with_case_id(parsed_json, text_case_id(raw_text))
+                write_json(output_dir, os.path.basename(out_path), parsed_json)
+                record_lineage(lineage, filename, raw_text, os.path.basename(out_path))
+                print(f"✅ Saved to {out_path}")
 
         except Exception as e:
             print(f"❌ Error processing {filename}: {e}")
 
 
 def custom_json_gpt(input_dir, output_dir, summarise_dir, issue_dir, deployment_name, client, system_prompt,
-                    summarization_prompt, token):
+                    summarization_prompt, token, lineage=None):
     issue_count = 0
-    for filename in os.listdir(input_dir):
-        if not filename.lower().endswith(".txt"):
-            continue
+    for filename in list_entries(input_dir, ".txt"):
 
-        file_path = os.path.join(input_dir, filename)
         print(f"\n📄 Processing {filename}")
 
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                case_text = f.read()
+            case_text = read_text(input_dir, filename)
+            if is_current(lineage, filename, case_text, output_dir):
+                print(f"⏭️ Unchanged since last run, skipping {filename}")
+                continue
+            raw_text = case_text
 
             case_text = summarize_text_if_needed(
                 case_text,
@@ -248,12 +320,13 @@ def custom_json_gpt(input_dir, output_dir, summarise_dir, issue_dir, deployment_
             success = False
             for attempt in range(3):
                 try:
-                    raw_response = call_gpt_for_file(case_text, client, system_prompt, token)
+                    raw_response = call_gpt_for_file(case_text, client, system_prompt, token, attempt > 0)
                     output_filename = f"_{re.sub(r'[^a-zA-Z0-9]+', '_', filename[:-4].lower())}.json"
                     output_path = os.path.join(output_dir, output_filename)
 
-                    fixed_json = extract_and_fix_json(raw_response, filename, output_path)
+                    fixed_json = extract_and_fix_json(raw_response, filename, output_path, text_case_id(raw_text))
                     if fixed_json:
+                        record_lineage(lineage, filename, raw_text, output_filename)
                         success = True
                         break
                     else:
@@ -261,57 +334,54 @@ def custom_json_gpt(input_dir, output_dir, summarise_dir, issue_dir, deployment_
                             f"🔁 Retry attempt {attempt + 1} failed. Retrying..." if attempt < 2 else "❌ Final "
                                                                                                      "attempt failed."
                         )
-                        time.sleep(2)
                 except Exception as e:
                     print(f"❌ GPT call failed: {e}")
-                    time.sleep(2)
 
             if not success:
                 issue_count += 1
                 issue_dest = os.path.join(issue_dir, filename)
-                shutil.copy(file_path, issue_dest)
+                copy_entry(input_dir, issue_dir, filename)
                 print(f"⚠️ Moved problematic file to issue dir: {issue_dest}")
 
         except Exception as e:
             print(f"❌ Error processing {filename}: {e}")
             issue_count += 1
-            issue_dest = os.path.join(issue_dir, filename)
-            shutil.copy(file_path, issue_dest)
+            copy_entry(input_dir, issue_dir, filename)
 
     print(f"\n🚨 Total files with issues: {issue_count}")
     return issue_count
 
 
 def custom_issue_resolver(input_dir, output_dir, summarise_dir, deployment_name, client, system_prompt,
-                          summarization_prompt, token):
-    for filename in os.listdir(input_dir):
-        if not filename.lower().endswith(".txt"):
-            continue
+                          summarization_prompt, token, lineage=None):
+    for filename in list_entries(input_dir, ".txt"):
 
-        file_path = os.path.join(input_dir, filename)
         print(f"\n📄 Processing {filename}")
 
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                case_text = f.read()
+            case_text = read_text(input_dir, filename)
+            if is_current(lineage, filename, case_text, output_dir):
+                print(f"⏭️ Unchanged since last run, skipping {filename}")
+                continue
+            raw_text = case_text
 
             case_text = summarize_text_if_needed(case_text, filename, summarise_dir, deployment_name,
                                                  summarization_prompt, client)
 
             raw_response = None
             for attempt in range(3):
-                raw_response = call_gpt_for_file(case_text, client, system_prompt, token)
+                raw_response = call_gpt_for_file(case_text, client, system_prompt, token, attempt > 0)
                 output_filename = f"_{re.sub(r'[^a-zA-Z0-9]+', '_', filename[:-4].lower())}.json"
                 output_path = os.path.join(output_dir, output_filename)
 
-                fixed_json = extract_and_fix_json(raw_response, filename, output_path)
+                fixed_json = extract_and_fix_json(raw_response, filename, output_path, text_case_id(raw_text))
                 if fixed_json:
+                    record_lineage(lineage, filename, raw_text, output_filename)
                     break
                 else:
                     print(
                         f"🔁 Retry attempt {attempt + 1} failed. Retrying..." if attempt == 0 or attempt == 1 else "❌"
                                                                                                                   "Final attempt failed.")
-                    time.sleep(2)
 
         except Exception as e:
             print(f"❌ Error processing {filename}: {e}")
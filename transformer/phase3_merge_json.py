@@ -2,8 +2,12 @@ import os
 import json
 import re
 import difflib
-import time
-import shutil
+from transformer.request_scheduler import chat_completion
+from transformer.response_cache import parses_as_json
+from transformer.local_merge import merge_case_json
+from transformer.lineage import is_current, record_lineage
+from extractor.raw_store import CASE_ID_KEY, with_case_id
+from loader.corpus_shards import list_entries, read_json, write_json, copy_entry
 
 def slugify_filename(name):
     name = os.path.splitext(name)[0]
@@ -15,6 +19,33 @@ def find_best_match(slug_base, slug_custom_files, match_threshold):
     matches = difflib.get_close_matches(slug_base, slug_custom_files, n=1, cutoff=match_threshold)
     return matches[0] if matches else None
 
+def case_id_index(json_dir):
+    """
+    Maps case_id -> filename for every JSON in json_dir, plus a slug map for
+    older outputs written before case ids were stamped.
+    """
+    by_case_id, by_slug = {}, {}
+    for filename in list_entries(json_dir, ".json"):
+        data = read_json(json_dir, filename)
+        case_id = data.get(CASE_ID_KEY) if isinstance(data, dict) else None
+        if case_id:
+            by_case_id[case_id] = filename
+        else:
+            by_slug[slugify_filename(filename)] = filename
+    return by_case_id, by_slug
+
+
+def find_custom_file(base_file, base_json, custom_index, match_threshold):
+    # O(1) join on case_id. The fuzzy filename match pairs custom outputs that predate case ids,
+    # including with a re-extracted base that already has one (rolling re-runs)
+    by_case_id, by_slug = custom_index
+    case_id = base_json.get(CASE_ID_KEY) if isinstance(base_json, dict) else None
+    if case_id and case_id in by_case_id:
+        return by_case_id[case_id]
+    best_slug_match = find_best_match(slugify_filename(base_file.replace("base", "")), list(by_slug), match_threshold)
+    return by_slug[best_slug_match] if best_slug_match else None
+
+
 def extract_json_and_name(gpt_output):
     # Remove wrapping triple backticks if any
     clean_output = re.sub(r"^```json\s*|\s*```$", "", gpt_output.strip(), flags=re.IGNORECASE | re.MULTILINE)
@@ -28,42 +59,24 @@ def extract_json_and_name(gpt_output):
     return clean_output
 
 
-def merge_json_gpt(base_dir, custom_dir, output_dir, issues_dir_base, issues_dir_custom, system_prompt, client, match_threshold):
-    issue_count = 0
-
-    custom_files_map = {
-        slugify_filename(f): f for f in os.listdir(custom_dir) if f.lower().endswith(".json")
-    }
-
-    for base_file in os.listdir(base_dir):
-        if not base_file.lower().endswith(".json"):
-            continue
-
-        slug_base = slugify_filename(base_file.replace("base", ""))
-        best_slug_match = find_best_match(slug_base, list(custom_files_map.keys()), match_threshold)
-
-        if best_slug_match:
-            custom_file = custom_files_map[best_slug_match]
-            base_path = os.path.join(base_dir, base_file)
-            custom_path = os.path.join(custom_dir, custom_file)
-
-            with open(base_path, 'r', encoding='utf-8') as bf, open(custom_path, 'r', encoding='utf-8') as cf:
-                base_json = json.load(bf)
-                custom_json = json.load(cf)
-
-            print("\n📦 === GPT Input Preview ===")
-            print("📄 BASE JSON:", json.dumps(base_json, indent=2, ensure_ascii=False)[:1500], "...\n")
-            print("📄 CUSTOM JSON:", json.dumps(custom_json, indent=2, ensure_ascii=False)[:1500], "...\n")
-
-            success = False
-            for attempt in range(3):
-                try:
-                    print(f"🧠 Attempt {attempt + 1}: Merging {base_file} + {custom_file}")
-                    response = client.chat.completions.create(
-                        model="model name",
-                        messages=[
-                            {"role": "system", "content": system_prompt.strip()},
-                            {"role": "user", "content": f"""
+def merge_pair_gpt(base_json, custom_json, label, system_prompt, client, max_tokens=8192):
+    """
+    Asks GPT to merge one base/custom pair, with up to 3 attempts. Returns the
+    merged dict, or None if every attempt failed.
+    """
+    print("\n📦 === GPT Input Preview ===")
+    print("📄 BASE JSON:", json.dumps(base_json, indent=2, ensure_ascii=False)[:1500], "...\n")
+    print("📄 CUSTOM JSON:", json.dumps(custom_json, indent=2, ensure_ascii=False)[:1500], "...\n")
+
+    for attempt in range(3):
+        try:
+            print(f"🧠 Attempt {attempt + 1}: Merging {label}")
+            merged_output = chat_completion(
+                client,
+                model="model name",
+                messages=[
+                    {"role": "system", "content": system_prompt.strip()},
+                    {"role": "user", "content": f"""
 You will be provided two JSON objects.
 
 BASE JSON:
@@ -72,51 +85,82 @@ BASE JSON:
 CUSTOM JSON:
 {json.dumps(custom_json, separators=(",", ":"), ensure_ascii=False)}
 """}
-                        ],
-                        temperature=0.3,
-                        max_tokens=8192
-                    )
-
-                    merged_output = response.choices[0].message.content.strip()
-
-                    if not merged_output:
-                        print(f"⚠️ GPT returned empty response. Attempt {attempt + 1}")
-                        time.sleep(1)
-                        continue
-
-                    final_json_text = re.sub(r"^```json\s*|\s*```$", "", merged_output.strip(), flags=re.IGNORECASE)
-
-                    if not final_json_text.strip():
-                        print(f"⚠️ GPT response was blank on attempt {attempt + 1}")
-                        time.sleep(1)
-                        continue
-
-                    try:
-                        parsed = json.loads(final_json_text)
-                        output_filename = os.path.splitext(custom_file)[0] + ".json"
-                        output_path = os.path.join(output_dir, output_filename)
-                        with open(output_path, "w", encoding="utf-8") as f:
-                            json.dump(parsed, f, indent=2, ensure_ascii=False)
-                        print(f"✅ Merged and saved: {output_filename}")
-                        success = True
-                        break
-
-                    except json.JSONDecodeError as e:
-                        print(f"❌ JSON Parse Error (attempt {attempt + 1}): {e}")
-                        print("📥 GPT Raw Response:\n", merged_output[:1000], "...\n")
-                        time.sleep(1)
-
-                except Exception as e:
-                    print(f"❌ GPT/API Error (attempt {attempt + 1}): {e}")
-                    time.sleep(1)
+                ],
+                temperature=0.3,
+                max_tokens=max_tokens,
+                validate=parses_as_json,
+                bypass_cache=attempt > 0
+            )
+
+            if not merged_output:
+                print(f"⚠️ GPT returned empty response. Attempt {attempt + 1}")
+                continue
+
+            final_json_text = re.sub(r"^```json\s*|\s*```$", "", merged_output.strip(), flags=re.IGNORECASE)
+
+            if not final_json_text.strip():
+                print(f"⚠️ GPT response was blank on attempt {attempt + 1}")
+                continue
+
+            try:
+                return json.loads(final_json_text)
+            except json.JSONDecodeError as e:
+                print(f"❌ JSON Parse Error (attempt {attempt + 1}): {e}")
+                print("📥 GPT Raw Response:\n", merged_output[:1000], "...\n")
+
+        except Exception as e:
+            print(f"❌ GPT/API Error (attempt {attempt + 1}): {e}")
+    return None
+
+
+def merge_pair(base_json, custom_json, label, system_prompt, client, max_tokens=8192, engine="local"):
+    """
+    engine="local" merges on the base schema and only asks GPT about
+    conflicting free-text fields; engine="gpt" sends both JSONs to GPT.
+    """
+    if engine == "gpt":
+        return merge_pair_gpt(base_json, custom_json, label, system_prompt, client, max_tokens)
+    try:
+        return merge_case_json(base_json, custom_json, label, client)
+    except Exception as e:
+        print(f"❌ Local merge failed for {label}: {e}")
+        return None
+
+
+def merge_json_gpt(base_dir, custom_dir, output_dir, issues_dir_base, issues_dir_custom, system_prompt, client, match_threshold,
+                   engine="local", lineage=None):
+    issue_count = 0
+
+    custom_index = case_id_index(custom_dir)
+
+    for base_file in list_entries(base_dir, ".json"):
+
+        base_json = read_json(base_dir, base_file)
+        custom_file = find_custom_file(base_file, base_json, custom_index, match_threshold)
+
+        if custom_file:
+            custom_json = read_json(custom_dir, custom_file)
+            merge_input = {"base": base_json, "custom": custom_json}
+            if is_current(lineage, base_file, merge_input, output_dir):
+                print(f"⏭️ Unchanged since last run, skipping {base_file} + {custom_file}")
+                continue
+
+            parsed = merge_pair(base_json, custom_json, f"{base_file} + {custom_file}", system_prompt, client, 8192, engine)
+            if parsed:
+                if CASE_ID_KEY in base_json:
+                    parsed = with_case_id(parsed, base_json[CASE_ID_KEY])
+                output_filename = os.path.splitext(custom_file)[0] + ".json"
+                write_json(output_dir, output_filename, parsed)
+                record_lineage(lineage, base_file, merge_input, output_filename)
+                print(f"✅ Merged and saved: {output_filename}")
 
             # 🛑 Handle persistent failure
-            if not success:
+            else:
                 issue_count += 1
                 print(f"⚠️ Final failure after 3 attempts: {base_file} + {custom_file}")
                 try:
-                    shutil.copy(base_path, os.path.join(issues_dir_base, base_file))
-                    shutil.copy(custom_path, os.path.join(issues_dir_custom, custom_file))
+                    copy_entry(base_dir, issues_dir_base, base_file)
+                    copy_entry(custom_dir, issues_dir_custom, custom_file)
                     print(f"📁 Copied {base_file} to issues_dir_base and {custom_file} to issues_dir_custom.")
                 except Exception as copy_err:
                     print(f"❌ Failed to copy failed files: {copy_err}")
@@ -126,88 +170,32 @@ CUSTOM JSON:
     print(f"\n🔢 Total problematic files: {issue_count}")
     return issue_count
 
-def merge_issue_resolver(base_dir, custom_dir, output_dir, system_prompt, client, match_threshold):
-    custom_files_map = {
-        slugify_filename(f): f for f in os.listdir(custom_dir) if f.lower().endswith(".json")
-    }
+def merge_issue_resolver(base_dir, custom_dir, output_dir, system_prompt, client, match_threshold, lineage=None):
+    custom_index = case_id_index(custom_dir)
 
-    for base_file in os.listdir(base_dir):
-        if not base_file.lower().endswith(".json"):
-            continue
+    for base_file in list_entries(base_dir, ".json"):
 
-        slug_base = slugify_filename(base_file.replace("base", ""))
-        best_slug_match = find_best_match(slug_base, list(custom_files_map.keys()), match_threshold)
+        base_json = read_json(base_dir, base_file)
+        custom_file = find_custom_file(base_file, base_json, custom_index, match_threshold)
 
-        if best_slug_match:
-            custom_file = custom_files_map[best_slug_match]
-            base_path = os.path.join(base_dir, base_file)
-            custom_path = os.path.join(custom_dir, custom_file)
+        if custom_file:
+            custom_json = read_json(custom_dir, custom_file)
+            merge_input = {"base": base_json, "custom": custom_json}
+            if is_current(lineage, base_file, merge_input, output_dir):
+                print(f"⏭️ Unchanged since last run, skipping {base_file} + {custom_file}")
+                continue
 
-            with open(base_path, 'r', encoding='utf-8') as bf, open(custom_path, 'r', encoding='utf-8') as cf:
-                base_json = json.load(bf)
-                custom_json = json.load(cf)
-
-            print("\n📦 === GPT Input Preview ===")
-            print("📄 BASE JSON:", json.dumps(base_json, indent=2, ensure_ascii=False)[:1500], "...\n")
-            print("📄 CUSTOM JSON:", json.dumps(custom_json, indent=2, ensure_ascii=False)[:1500], "...\n")
-
-            success = False
-            for attempt in range(3):
-                try:
-                    print(f"🧠 Attempt {attempt + 1}: Merging {base_file} + {custom_file}")
-                    response = client.chat.completions.create(
-                        model="model name",
-                        messages=[
-                            {"role": "system", "content": system_prompt.strip()},
-                            {"role": "user", "content": f"""
-You will be provided two JSON objects.
-
-BASE JSON:
-{json.dumps(base_json, separators=(",", ":"), ensure_ascii=False)}
-
-CUSTOM JSON:
-{json.dumps(custom_json, separators=(",", ":"), ensure_ascii=False)}
-"""}
-                        ],
-                        temperature=0.3,
-                        max_tokens=16000
-                    )
-
-                    merged_output = response.choices[0].message.content.strip()
-
-                    if not merged_output:
-                        print(f"⚠️ GPT returned empty response. Attempt {attempt + 1}")
-                        time.sleep(1)
-                        continue
-
-                    final_json_text = re.sub(r"^```json\s*|\s*```$", "", merged_output.strip(), flags=re.IGNORECASE)
-
-                    if not final_json_text.strip():
-                        print(f"⚠️ GPT response was blank on attempt {attempt + 1}")
-                        time.sleep(1)
-                        continue
-
-                    try:
-                        parsed = json.loads(final_json_text)
-                        output_filename = os.path.splitext(custom_file)[0] + ".json"
-                        output_path = os.path.join(output_dir, output_filename)
-                        with open(output_path, "w", encoding="utf-8") as f:
-                            json.dump(parsed, f, indent=2, ensure_ascii=False)
-                        print(f"✅ Merged and saved: {output_filename}")
-                        success = True
-                        break
-
-                    except json.JSONDecodeError as e:
-                        print(f"❌ JSON Parse Error (attempt {attempt + 1}): {e}")
-                        print("📥 GPT Raw Response:\n", merged_output[:1000], "...\n")
-                        time.sleep(1)
-
-                except Exception as e:
-                    print(f"❌ GPT/API Error (attempt {attempt + 1}): {e}")
-                    time.sleep(1)
+            parsed = merge_pair_gpt(base_json, custom_json, f"{base_file} + {custom_file}", system_prompt, client, 16000)
+            if parsed:
+                if CASE_ID_KEY in base_json:
+                    parsed = with_case_id(parsed, base_json[CASE_ID_KEY])
+                output_filename = os.path.splitext(custom_file)[0] + ".json"
+                write_json(output_dir, output_filename, parsed)
+                record_lineage(lineage, base_file, merge_input, output_filename)
+                print(f"✅ Merged and saved: {output_filename}")
 
             # 🛑 Handle persistent failure
-            if not success:
+            else:
                 print(f"⚠️ Final failure after 3 attempts: {base_file} + {custom_file}")
         else:
             print(f"❌ No match found for {base_file}")
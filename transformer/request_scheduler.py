@@ -0,0 +1,246 @@
+import time
+import random
+import asyncio
+import threading
+import tiktoken
+from openai import RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
+from transformer.response_cache import cache_key, get_cached, put_cached, cache_stats, parses_as_json
+
+# === Shared LLM request scheduler ===
+# Every chat completion in the transformer goes through chat_completion() (or
+# chat_completion_async()). Requests are gated by two token buckets matching the
+# Azure deployment quota: requests per minute and tokens per minute, where a
+# request's cost is its estimated prompt tokens plus its max_tokens. 429s honour
+# Retry-After and pause every caller, other transient errors back off
+# exponentially with jitter. Override the limits with configure_scheduler().
+# Responses already in the persistent cache (response_cache) skip the gate
+# entirely. A response is only cached once validate(content) accepts it (JSON
+# callers pass parses_as_json), and retries pass bypass_cache=True so they get
+# a fresh answer instead of the one that just failed. On the async client at most
+# "max_in_flight" requests run at once, whichever case or field group sent them.
+SCHEDULER_CONFIG = {
+    "requests_per_minute": 60,
+    "tokens_per_minute": 150000,
+    "max_retries": 6,
+    "backoff_base": 2.0,
+    "backoff_cap": 60.0,
+    "max_in_flight": 8,
+}
+ENCODING_FALLBACK = "o200k_base"
+
+_lock = threading.Lock()
+_buckets = {}
+_state = {"paused_until": 0.0, "semaphore": None}
+_stats = {
+    "requests": 0, "waiting": 0, "in_flight": 0, "throttled_429": 0, "retries": 0, "failures": 0,
+    "gate_wait_s": 0.0, "tokens_estimated": 0, "tokens_used": 0,
+}
+_encodings = {}
+
+
+def configure_scheduler(**settings):
+    with _lock:
+        SCHEDULER_CONFIG.update(settings)
+        _buckets.clear()
+        _state["semaphore"] = None
+
+
+def _in_flight_semaphore():
+    # asyncio semaphores belong to one event loop, and every asyncio.run() starts a new one
+    loop = asyncio.get_running_loop()
+    with _lock:
+        if _state["semaphore"] is None or _state["semaphore"][0] is not loop:
+            _state["semaphore"] = (loop, asyncio.Semaphore(SCHEDULER_CONFIG["max_in_flight"]))
+        return _state["semaphore"][1]
+
+
+def get_encoding(model):
+    # Deployment names are not tiktoken model names; fall back to the GPT-4o encoding
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding(ENCODING_FALLBACK)
+    return _encodings[model]
+
+
+def estimate_tokens(messages, max_tokens, model):
+    encoding = get_encoding(model)
+    prompt_tokens = sum(len(encoding.encode(message["content"])) + 4 for message in messages) + 2
+    return prompt_tokens + (max_tokens or 0)
+
+
+def _bucket(name, per_minute):
+    if name not in _buckets:
+        _buckets[name] = {"capacity": per_minute, "level": float(per_minute), "rate": per_minute / 60.0,
+                          "updated": time.monotonic()}
+    bucket = _buckets[name]
+    now = time.monotonic()
+    bucket["level"] = min(bucket["capacity"], bucket["level"] + (now - bucket["updated"]) * bucket["rate"])
+    bucket["updated"] = now
+    return bucket
+
+
+def _try_reserve(tokens):
+    """
+    Takes one request and `tokens` tokens from the buckets if both are
+    available and returns 0, otherwise returns how long to wait before trying
+    again.
+    """
+    with _lock:
+        now = time.monotonic()
+        if now < _state["paused_until"]:
+            return _state["paused_until"] - now
+        requests = _bucket("requests", SCHEDULER_CONFIG["requests_per_minute"])
+        token_bucket = _bucket("tokens", SCHEDULER_CONFIG["tokens_per_minute"])
+        # A single request larger than the whole budget must still be able to go through
+        tokens = min(tokens, token_bucket["capacity"])
+        if requests["level"] >= 1 and token_bucket["level"] >= tokens:
+            requests["level"] -= 1
+            token_bucket["level"] -= tokens
+            return 0
+        return max((1 - requests["level"]) / requests["rate"],
+                   (tokens - token_bucket["level"]) / token_bucket["rate"], 0.05)
+
+
+def _settle(estimated, used):
+    # Give back the part of the reservation the response did not use
+    with _lock:
+        _stats["tokens_used"] += used
+        token_bucket = _bucket("tokens", SCHEDULER_CONFIG["tokens_per_minute"])
+        token_bucket["level"] = min(token_bucket["capacity"], token_bucket["level"] + max(estimated - used, 0))
+
+
+def _count(**increments):
+    with _lock:
+        for key, value in increments.items():
+            _stats[key] += value
+
+
+def retry_delay(error, attempt):
+    """
+    Seconds to wait before retrying, or None if the error is not transient.
+    429s use Retry-After (and pause all callers); other transient errors use
+    exponential backoff with full jitter.
+    """
+    if isinstance(error, RateLimitError):
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        delay = None
+        if headers.get("retry-after-ms"):
+            delay = float(headers["retry-after-ms"]) / 1000
+        elif headers.get("retry-after"):
+            try:
+                delay = float(headers["retry-after"])
+            except ValueError:
+                delay = None
+        if delay is None:
+            delay = random.uniform(0, min(SCHEDULER_CONFIG["backoff_cap"], SCHEDULER_CONFIG["backoff_base"] * 2 ** attempt))
+        with _lock:
+            _stats["throttled_429"] += 1
+            _state["paused_until"] = max(_state["paused_until"], time.monotonic() + delay)
+        return delay
+    if isinstance(error, (APIConnectionError, APITimeoutError, InternalServerError)):
+        return random.uniform(0, min(SCHEDULER_CONFIG["backoff_cap"], SCHEDULER_CONFIG["backoff_base"] * 2 ** attempt))
+    return None
+
+
+def response_content(response, estimated):
+    usage = getattr(response, "usage", None)
+    _settle(estimated, usage.total_tokens if usage else estimated)
+    return (response.choices[0].message.content or "").strip()
+
+
+def chat_completion(client, **kwargs):
+    """
+    Scheduled replacement for client.chat.completions.create(**kwargs) that
+    returns the stripped message content.
+    """
+    bypass_cache = kwargs.pop("bypass_cache", False)
+    validate = kwargs.pop("validate", None)
+    key = cache_key(kwargs)
+    cached = None if bypass_cache else get_cached(key)
+    if cached is not None:
+        return cached
+    estimated = estimate_tokens(kwargs["messages"], kwargs.get("max_tokens"), kwargs["model"])
+    _count(requests=1, tokens_estimated=estimated, waiting=1)
+    try:
+        for attempt in range(SCHEDULER_CONFIG["max_retries"] + 1):
+            start = time.monotonic()
+            wait = _try_reserve(estimated)
+            while wait:
+                time.sleep(wait)
+                wait = _try_reserve(estimated)
+            _count(gate_wait_s=time.monotonic() - start, waiting=-1, in_flight=1)
+            try:
+                content = response_content(client.chat.completions.create(**kwargs), estimated)
+                if validate is None or validate(content):
+                    put_cached(key, kwargs["model"], content)
+                return content
+            except Exception as e:
+                _settle(estimated, 0)
+                delay = retry_delay(e, attempt)
+                if delay is None or attempt == SCHEDULER_CONFIG["max_retries"]:
+                    _count(failures=1)
+                    raise
+                print(f"⏳ {type(e).__name__}, retrying in {delay:.1f}s (attempt {attempt + 1})")
+                _count(retries=1)
+                time.sleep(delay)
+            finally:
+                _count(in_flight=-1, waiting=1)
+    finally:
+        _count(waiting=-1)
+
+
+async def chat_completion_async(async_client, **kwargs):
+    bypass_cache = kwargs.pop("bypass_cache", False)
+    validate = kwargs.pop("validate", None)
+    key = cache_key(kwargs)
+    cached = None if bypass_cache else await asyncio.to_thread(get_cached, key)
+    if cached is not None:
+        return cached
+    estimated = estimate_tokens(kwargs["messages"], kwargs.get("max_tokens"), kwargs["model"])
+    _count(requests=1, tokens_estimated=estimated, waiting=1)
+    semaphore = _in_flight_semaphore()
+    try:
+        for attempt in range(SCHEDULER_CONFIG["max_retries"] + 1):
+            start = time.monotonic()
+            async with semaphore:
+                wait = _try_reserve(estimated)
+                while wait:
+                    await asyncio.sleep(wait)
+                    wait = _try_reserve(estimated)
+                _count(gate_wait_s=time.monotonic() - start, waiting=-1, in_flight=1)
+                try:
+                    content = response_content(await async_client.chat.completions.create(**kwargs), estimated)
+                    if validate is None or validate(content):
+                        await asyncio.to_thread(put_cached, key, kwargs["model"], content)
+                    return content
+                except Exception as e:
+                    _settle(estimated, 0)
+                    delay = retry_delay(e, attempt)
+                    if delay is None or attempt == SCHEDULER_CONFIG["max_retries"]:
+                        _count(failures=1)
+                        raise
+                    print(f"⏳ {type(e).__name__}, retrying in {delay:.1f}s (attempt {attempt + 1})")
+                    _count(retries=1)
+                finally:
+                    _count(in_flight=-1, waiting=1)
+            # Back off outside the semaphore so the slot goes to another request
+            await asyncio.sleep(delay)
+    finally:
+        _count(waiting=-1)
+
+
+def scheduler_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["queue_depth"] = stats.pop("waiting")
+        return stats
+
+
+def print_scheduler_stats():
+    stats = scheduler_stats()
+    stats.update({f"cache_{key}": value for key, value in cache_stats().items()})
+    print("\n🚦 LLM scheduler stats:")
+    for key, value in stats.items():
+        print(f"   {key:<18}{value:.1f}" if isinstance(value, float) else f"   {key:<18}{value}")
@@ -0,0 +1,134 @@
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+# === Persistent LLM response cache ===
+# Responses are keyed by a hash of everything that determines them: model /
+# deployment, the full message list (system prompt, schema and case text) and
+# the sampling parameters. Re-running the transform over unchanged inputs is
+# then served from disk. Evicts by age and total size (least recently used first).
+CACHE_CONFIG = {
+    "enabled": True,
+    "path": "D:/LegalMorph/llm_cache.db",
+    "max_age_days": 90,
+    "max_bytes": 2 * 1024 ** 3,
+    "evict_every": 200,
+}
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0}
+
+
+def configure_cache(**settings):
+    CACHE_CONFIG.update(settings)
+
+
+def cache_key(kwargs):
+    payload = {
+        "model": kwargs.get("model"),
+        "messages": kwargs.get("messages"),
+        "temperature": kwargs.get("temperature"),
+        "max_tokens": kwargs.get("max_tokens"),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def open_cache(path=None):
+    conn = sqlite3.connect(path or CACHE_CONFIG["path"])
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            content TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+    return conn
+
+
+def get_cached(key):
+    if not CACHE_CONFIG["enabled"]:
+        return None
+    with _lock:
+        conn = open_cache()
+        try:
+            row = conn.execute("SELECT content, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and time.time() - row[1] <= CACHE_CONFIG["max_age_days"] * 86400:
+                conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                conn.commit()
+                _stats["hits"] += 1
+                return row[0]
+            _stats["misses"] += 1
+            return None
+        finally:
+            conn.close()
+
+
+def put_cached(key, model, content):
+    # Empty responses are retried by the callers, so they are never worth caching
+    if not CACHE_CONFIG["enabled"] or not content:
+        return
+    with _lock:
+        conn = open_cache()
+        try:
+            now = time.time()
+            size = len(content.encode("utf-8"))
+            conn.execute("INSERT OR REPLACE INTO responses (key, model, content, size, created_at, last_used) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", (key, model, content, size, now, now))
+            conn.commit()
+            _stats["writes"] += 1
+            if _stats["writes"] % CACHE_CONFIG["evict_every"] == 0:
+                _evict(conn)
+        finally:
+            conn.close()
+
+
+def parses_as_json(content):
+    # validate= check for JSON callers: a truncated or malformed answer must not be replayed from the cache
+    try:
+        json.loads(re.sub(r"^```json\s*|\s*```$", "", content.strip(), flags=re.IGNORECASE))
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
+def _evict(conn):
+    cutoff = time.time() - CACHE_CONFIG["max_age_days"] * 86400
+    removed = conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,)).rowcount
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    if total > CACHE_CONFIG["max_bytes"]:
+        excess = total - CACHE_CONFIG["max_bytes"]
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if freed >= excess:
+                break
+            victims.append((key,))
+            freed += size
+        conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        removed += len(victims)
+    conn.commit()
+    _stats["evicted"] += removed
+
+
+def evict_cache():
+    with _lock:
+        conn = open_cache()
+        try:
+            _evict(conn)
+        finally:
+            conn.close()
+
+
+def cache_stats():
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    return stats
@@ -0,0 +1,204 @@
+import re
+import json
+
+# === Rule-based pre-extraction of structured base fields ===
+# Dates, case numbers, the court, reported citations, statutes and sections
+# follow fixed conventions in Pakistani judgments, so they are found here by
+# regex and gazetteer matching instead of being re-typed by GPT for every case.
+# Fields found in the text are removed from the schema sent to the model and
+# passed to it as pre-filled context; the model only generates the rest, and
+# the found values are put back into the object locally.
+HEADER_CHARS = 2000
+CITATION_HEADER_CHARS = 400
+
+MONTHS = r"(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|June?|July?|Aug(?:ust)?|Sep(?:t(?:ember)?)?|" \
+         r"Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\.?"
+DATE = rf"(?:\d{{1,2}}(?:st|nd|rd|th)?\s+{MONTHS},?\s+\d{{4}}|{MONTHS}\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{4}}|" \
+       r"\d{1,2}[./-]\d{1,2}[./-]\d{2,4})"
+JUDGMENT_DATE = re.compile(
+    rf"Date\s+of\s+(?:decision|judgment|judgement|order|announcement)\s*[:.\-]?\s*({DATE})", re.IGNORECASE)
+
+APPEAL_NUMBER = re.compile(
+    r"\b((?:Criminal|Civil|Crl\.?|Cr\.|Jail|Constitutional|Writ|Tax|Review|Regular\s+(?:First|Second)|Intra\s+Court|"
+    r"Murder|Capital\s+Sentence|Service|Family)\s+(?:Appeal|Petition|Revision|Reference|Misc\.?(?:\s+Application)?|"
+    r"Original|Suit)s?|C\.?P\.?L\.?A\.?|C\.?P\.?|W\.?P\.?|Cr\.?A\.?|Crl\.?A\.?|Cr\.?R\.?|R\.?F\.?A\.?|I\.?C\.?A\.?)"
+    r"\s*Nos?\.?\s*(\d+[\w\-/]*(?:\s*(?:,|and|&)\s*\d+[\w\-/]*)*(?:\s+of\s+\d{4})?)",
+    re.IGNORECASE)
+
+COURTS = {
+    "Supreme Court of Pakistan": [r"supreme\s+court\s+of\s+pakistan", r"\bsupreme\s+court\b"],
+    "Federal Shariat Court": [r"federal\s+shariat\s+court"],
+    "Lahore High Court": [r"lahore\s+high\s+court", r"high\s+court\s+of\s+lahore"],
+    "High Court of Sindh": [r"sindh\s+high\s+court", r"high\s+court\s+of\s+sindh"],
+    "Peshawar High Court": [r"peshawar\s+high\s+court"],
+    "High Court of Balochistan": [r"balochistan\s+high\s+court", r"high\s+court\s+of\s+balochistan"],
+    "Islamabad High Court": [r"islamabad\s+high\s+court"],
+    "Supreme Appellate Court Gilgit-Baltistan": [r"supreme\s+appellate\s+court"],
+    "High Court of Azad Jammu and Kashmir": [r"high\s+court\s+of\s+azad\s+jammu"],
+}
+
+REPORTERS = r"SCMR|YLR|MLD|CLC|CLD|PLC(?:\s*\(C\.?S\.?\))?|PTD|P\s*Cr\.?\s*L\.?\s*J|NLR|KLR|PLJ|SCJ|GBLR|CLR"
+PLD_COURTS = r"SC|Supreme\s+Court|FSC|Federal\s+Shariat\s+Court|Lahore|Karachi|Sindh|Peshawar|Quetta|Balochistan|" \
+             r"Islamabad|AJ\s*&\s*K|Azad\s+J\s*&\s*K|GB|Journal"
+CITATION = re.compile(rf"\b(?:PLD\s+\d{{4}}\s+(?:{PLD_COURTS})\s+\d{{1,5}}|\d{{4}}\s+(?:{REPORTERS})\s+\d{{1,5}})\b")
+
+STATUTES = {
+    "Pakistan Penal Code, 1860": [r"pakistan\s+penal\s+code", r"\bP\.?\s?P\.?\s?C\b"],
+    "Code of Criminal Procedure, 1898": [r"code\s+of\s+criminal\s+procedure", r"criminal\s+procedure\s+code",
+                                         r"\bCr\.?\s?P\.?\s?C\b"],
+    "Code of Civil Procedure, 1908": [r"code\s+of\s+civil\s+procedure", r"civil\s+procedure\s+code",
+                                      r"\bC\.\s?P\.\s?C\b", r"\bCPC\b"],
+    "Qanun-e-Shahadat Order, 1984": [r"qanun[\s-]+e[\s-]+shahadat"],
+    "Constitution of the Islamic Republic of Pakistan, 1973": [r"constitution\s+of\s+(?:the\s+)?islamic\s+republic",
+                                                               r"article\s+\d+[A-Z]?(?:\(\d+\))*\s+of\s+the\s+constitution"],
+    "Control of Narcotic Substances Act, 1997": [r"control\s+of\s+narcotic\s+substances\s+act", r"\bCNSA\b"],
+    "Anti-Terrorism Act, 1997": [r"anti[\s-]+terrorism\s+act", r"\bATA\b"],
+    "National Accountability Ordinance, 1999": [r"national\s+accountability\s+ordinance", r"\bNAO\b"],
+}
+# Any other titled enactment: "Specific Relief Act, 1877", "Sales Tax Act 1990", ...
+# The title is at most GENERIC_TITLE_WORDS words long, so a long run of capitalised words (a repeated
+# header line) costs linear time, and no capitalised word of it may be a function word, so
+# "Held In Order 2019" is not an enactment.
+GENERIC_TITLE_WORDS = 8
+TITLE_STOPWORDS = r"In|The|By|Under|And|Of|On|For|At|To|As|A|An|This|That|These|Said|Such|Vide|From|With|Per|" \
+                  r"Whereas|If|When|Where|It|He|She|They|We|His|Her|Their|Since|After|Before|Being|Having|Its"
+GENERIC_STATUTE = re.compile(
+    rf"\b((?!(?:{TITLE_STOPWORDS})\b)[A-Z][A-Za-z'\-]*\s+"
+    rf"(?:(?:of|and|the|for|on|(?!(?:{TITLE_STOPWORDS})\b)[A-Z][A-Za-z'\-]*|\([A-Za-z ]{{1,40}}\))\s+)"
+    rf"{{0,{GENERIC_TITLE_WORDS - 1}}}?"
+    r"(?:Act|Ordinance|Order|Code|Rules|Regulations)),?\s+(\d{4})\b")
+
+SECTION_ACTS = {
+    "PPC": r"P\.?\s?P\.?\s?C\.?|Pakistan\s+Penal\s+Code",
+    "Cr.P.C.": r"Cr\.?\s?P\.?\s?C\.?|Code\s+of\s+Criminal\s+Procedure|Criminal\s+Procedure\s+Code",
+    "C.P.C.": r"C\.\s?P\.\s?C\.?|CPC|Code\s+of\s+Civil\s+Procedure|Civil\s+Procedure\s+Code",
+    "CNSA": r"CNSA|Control\s+of\s+Narcotic\s+Substances\s+Act",
+    "ATA": r"ATA|Anti[\s-]+Terrorism\s+Act",
+    "NAO": r"NAO|National\s+Accountability\s+Ordinance",
+}
+SECTION_NUMBER = r"\d+[A-Z]?(?:\s*\([0-9a-zA-Z]+\))*"
+SECTION = re.compile(
+    rf"\b(?:sections?|ss?\.|u/ss?)\s*({SECTION_NUMBER}(?:\s*(?:,|/|and|&)\s*{SECTION_NUMBER})*)"
+    rf"(?:\s*(?:of\s+)?(?:the\s+)?({'|'.join(SECTION_ACTS.values())}))?",
+    re.IGNORECASE)
+ARTICLE = re.compile(rf"\bArticles?\s+({SECTION_NUMBER})\s+of\s+the\s+(Constitution|Qanun[\s-]+e[\s-]+Shahadat)",
+                     re.IGNORECASE)
+
+
+def clean(value):
+    return re.sub(r"\s+", " ", value).strip(" ,.;:")
+
+
+def unique(values):
+    seen, ordered = set(), []
+    for value in values:
+        key = value.casefold()
+        if value and key not in seen:
+            seen.add(key)
+            ordered.append(value)
+    return ordered
+
+
+def find_judgment_date(text):
+    match = JUDGMENT_DATE.search(text)
+    return clean(match.group(1)) if match else None
+
+
+def find_appeal_number(header):
+    match = APPEAL_NUMBER.search(header)
+    return clean(f"{match.group(1)} No. {match.group(2)}") if match else None
+
+
+def find_court(header):
+    # The earliest court named in the header; the body cites other courts' judgments
+    best = None
+    for court, patterns in COURTS.items():
+        for pattern in patterns:
+            match = re.search(pattern, header, re.IGNORECASE)
+            if match and (best is None or match.start() < best[0]):
+                best = (match.start(), court)
+    return best[1] if best else None
+
+
+def find_citations(text):
+    return unique(clean(match.group(0)) for match in CITATION.finditer(text))
+
+
+def find_statutes(text):
+    found = [(match.start(), statute) for statute, patterns in STATUTES.items() for pattern in patterns
+             for match in [re.search(pattern, text, re.IGNORECASE)] if match]
+    known = {re.sub(r",?\s+\d{4}$", "", statute).casefold() for _, statute in found}
+    for match in GENERIC_STATUTE.finditer(text):
+        name = re.sub(r"^(?:The|Under|And|Of)\s+", "", clean(match.group(1)))
+        if name.casefold() not in known:
+            found.append((match.start(), f"{name}, {match.group(2)}"))
+    return unique(statute for _, statute in sorted(found))
+
+
+def section_act(act_text):
+    for act, pattern in SECTION_ACTS.items():
+        if re.fullmatch(pattern, act_text.strip(), re.IGNORECASE):
+            return act
+    return None
+
+
+def find_sections(text):
+    sections = []
+    for match in SECTION.finditer(text):
+        act = section_act(match.group(2)) if match.group(2) else None
+        for number in re.split(r"\s*(?:,|/|and|&)\s*", match.group(1)):
+            number = re.sub(r"\s+", "", number)
+            if number:
+                sections.append(f"Section {number} {act}" if act else f"Section {number}")
+    for match in ARTICLE.finditer(text):
+        source = "Constitution" if match.group(2).lower().startswith("constitution") else "Qanun-e-Shahadat"
+        number = re.sub(r"\s+", "", match.group(1))
+        sections.append(f"Article {number} {source}")
+    return unique(sections)
+
+
+def pre_extract(text):
+    """
+    Returns the base-schema fields that could be found deterministically in the
+    case text. Fields that were not found are left out, so GPT still fills them.
+    """
+    header = text[:HEADER_CHARS]
+    own_citations = find_citations(text[:CITATION_HEADER_CHARS])
+    fields = {
+        "judgment_date": find_judgment_date(text),
+        "reference_no_or_id": own_citations[0] if own_citations else None,
+        "appeal_number": find_appeal_number(header),
+        "court": find_court(header),
+        "citations": find_citations(text),
+        "statutes": find_statutes(text),
+        "sections": find_sections(text),
+    }
+    return {key: value for key, value in fields.items() if value}
+
+
+def prefill_schema(schema_template, prefilled):
+    """
+    Schema text for the prompt: the schema without the pre-filled fields,
+    followed by the pre-filled values as context the model must not repeat.
+    """
+    if not prefilled:
+        return schema_template
+    schema = json.loads(schema_template) if isinstance(schema_template, str) else schema_template
+    remaining = {key: value for key, value in schema.items() if key not in prefilled}
+    return f"{json.dumps(remaining, indent=4, ensure_ascii=False)}\n\n{prefill_note(prefilled)}"
+
+
+def prefill_note(prefilled):
+    return ("Pre-filled fields (already extracted from the case text; use them as context and do not include them "
+            f"in your output):\n{json.dumps(prefilled, indent=2, ensure_ascii=False)}")
+
+
+def apply_prefill(parsed, prefilled, schema_template):
+    # Pre-filled values go back in their schema position; keys the model added stay at the end
+    if not isinstance(parsed, dict) or not prefilled:
+        return parsed
+    schema = json.loads(schema_template) if isinstance(schema_template, str) else schema_template
+    merged = {key: prefilled[key] if key in prefilled else parsed[key] for key in schema
+              if key in prefilled or key in parsed}
+    merged.update({key: value for key, value in parsed.items() if key not in merged})
+    return merged
@@ -0,0 +1,156 @@
+import re
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from transformer.request_scheduler import chat_completion, chat_completion_async
+from transformer.response_cache import parses_as_json
+from transformer.rule_extractor import prefill_note
+
+# === Schema-sliced base extraction ===
+# Instead of one completion for the whole base schema (which truncates mid-JSON
+# on long judgments at 8192 tokens), the schema is split into field groups and
+# every group is extracted by its own, much smaller request. The groups of one
+# case run concurrently and are assembled locally in schema order; a group that
+# fails is retried on its own with a larger budget, and fields of a group that
+# still fails are the only ones missing. Fields pre-filled by rule_extractor are
+# dropped from the slices (a group left empty is not requested at all). With
+# group_texts, each group gets only its own judgment segments instead of the
+# whole case (see judgment_segmenter).
+FIELD_GROUPS = {
+    "parties_and_lawyers": ["case_title", "judges", "appellant", "respondant", "accussed_details", "lawyers"],
+    "dates_and_court": ["reference_no_or_id", "judgment_date", "first_hearing_date", "court", "bench_type",
+                        "appeal_number", "source", "metadata"],
+    "summaries": ["complaint_summary", "investigation_summary", "judgment_summary", "punishment",
+                  "Decision_or_verdict", "arguments", "summary_vector_notes"],
+    "statutes": ["statutes", "sections", "legal_categories", "key_issues", "maxims", "legal_terms",
+                 "words_and_phrases"],
+    "citations": ["citations"],
+    "witnesses": ["witnesses", "witness_statement", "assets"],
+}
+SLICE_CONFIG = {
+    "max_tokens": 3000,
+    "retry_max_tokens": 6000,
+    "retries": 2,
+    "workers": 6,
+    "temperature": 0.2,
+}
+SLICE_INSTRUCTION = """
+The base schema below is one part of a larger schema. Fill only the fields it contains and
+return a JSON object with exactly these keys; other parts of the case are extracted separately.
+"""
+
+
+def schema_slices(schema_template, prefilled=None):
+    """
+    Splits the schema (JSON text or dict) into [(group, partial schema)].
+    Schema keys that are in no group are collected in a final "other" group.
+    """
+    schema = json.loads(schema_template) if isinstance(schema_template, str) else schema_template
+    grouped = set(prefilled or {})
+    slices = []
+    for group, keys in FIELD_GROUPS.items():
+        part = {key: schema[key] for key in keys if key in schema and key not in grouped}
+        grouped.update(part)
+        if part:
+            slices.append((group, part))
+    other = {key: value for key, value in schema.items() if key not in grouped}
+    if other:
+        slices.append(("other", other))
+    return schema, slices
+
+
+def slice_messages(part, case_text, system_prompt, prefilled=None):
+    schema_text = json.dumps(part, indent=2, ensure_ascii=False)
+    if prefilled:
+        schema_text = f"{schema_text}\n\n{prefill_note(prefilled)}"
+    return [
+        {"role": "system", "content": f"{system_prompt.strip()}\n{SLICE_INSTRUCTION.strip()}"},
+        {"role": "user", "content": f"Base Schema:\n{schema_text}\n\nCase Text:\n{case_text}"}
+    ]
+
+
+def parse_slice(response, part):
+    try:
+        parsed = json.loads(re.sub(r"^```json\s*|\s*```$", "", response.strip(), flags=re.IGNORECASE))
+    except json.JSONDecodeError as e:
+        print(f"❌ Slice JSON Parse Error: {e}")
+        return None
+    if not isinstance(parsed, dict):
+        return None
+    # Keys outside the slice belong to other groups and are ignored
+    return {key: parsed[key] for key in part if key in parsed}
+
+
+def slice_budgets():
+    return [SLICE_CONFIG["max_tokens"]] * SLICE_CONFIG["retries"] + [SLICE_CONFIG["retry_max_tokens"]]
+
+
+def extract_slice(group, part, case_text, system_prompt, deployment_name, client, label, prefilled=None):
+    for attempt, max_tokens in enumerate(slice_budgets()):
+        try:
+            response = chat_completion(client, model=deployment_name,
+                                       messages=slice_messages(part, case_text, system_prompt, prefilled),
+                                       temperature=SLICE_CONFIG["temperature"], max_tokens=max_tokens,
+                                       validate=parses_as_json, bypass_cache=attempt > 0)
+            parsed = parse_slice(response, part)
+            if parsed:
+                return parsed
+        except Exception as e:
+            print(f"❌ GPT call failed for {group} of {label}: {e}")
+        print(f"🔁 Retry {attempt + 1} for {group} of {label}")
+    return None
+
+
+def assemble(schema, results, label, prefilled=None):
+    # Schema order; a failed group keeps the "N/A" placeholder so the object stays schema-complete
+    failed = [group for group, parsed in results if parsed is None]
+    if results and len(failed) == len(results):
+        return None
+    extracted = dict(prefilled or {})
+    for _, parsed in results:
+        extracted.update(parsed or {})
+    if failed:
+        print(f"⚠️ {label}: groups {failed} could not be extracted, filled with N/A")
+    return {key: extracted.get(key, "N/A") for key in schema}
+
+
+def extract_sliced(schema_template, case_text, system_prompt, deployment_name, client, label="", prefilled=None,
+                   group_texts=None):
+    """
+    Sliced equivalent of call_gpt_with_schema + try_parse_json. Returns the
+    assembled dict, or None if no group could be extracted.
+    """
+    schema, slices = schema_slices(schema_template, prefilled)
+    with ThreadPoolExecutor(max_workers=max(min(SLICE_CONFIG["workers"], len(slices)), 1)) as pool:
+        parsed = list(pool.map(
+            lambda item: extract_slice(item[0], item[1], (group_texts or {}).get(item[0], case_text), system_prompt,
+                                       deployment_name, client, label, prefilled),
+            slices))
+    return assemble(schema, list(zip([group for group, _ in slices], parsed)), label, prefilled)
+
+
+async def extract_slice_async(group, part, case_text, system_prompt, deployment_name, async_client, label,
+                              prefilled=None):
+    for attempt, max_tokens in enumerate(slice_budgets()):
+        try:
+            response = await chat_completion_async(async_client, model=deployment_name,
+                                                   messages=slice_messages(part, case_text, system_prompt, prefilled),
+                                                   temperature=SLICE_CONFIG["temperature"], max_tokens=max_tokens,
+                                                   validate=parses_as_json, bypass_cache=attempt > 0)
+            parsed = parse_slice(response, part)
+            if parsed:
+                return parsed
+        except Exception as e:
+            print(f"❌ GPT call failed for {group} of {label}: {e}")
+        print(f"🔁 Retry {attempt + 1} for {group} of {label}")
+    return None
+
+
+async def extract_sliced_async(schema_template, case_text, system_prompt, deployment_name, async_client, label="",
+                               prefilled=None, group_texts=None):
+    schema, slices = schema_slices(schema_template, prefilled)
+    parsed = await asyncio.gather(*(
+        extract_slice_async(group, part, (group_texts or {}).get(group, case_text), system_prompt, deployment_name,
+                            async_client, label, prefilled)
+        for group, part in slices))
+    return assemble(schema, list(zip([group for group, _ in slices], parsed)), label, prefilled)
@@ -1,11 +1,14 @@
 import json
-import time
 import tiktoken
 from dotenv import load_dotenv
 import re
 import json5
 from pymongo import MongoClient
 from difflib import get_close_matches
+from transformer.request_scheduler import chat_completion
+from transformer.response_cache import parses_as_json
+from transformer.summary_cache import summary_key
+from transformer.map_reduce_summary import map_reduce_summarize, truncate_to_budget
 
 load_dotenv()
 
@@ -14,16 +17,9 @@ def count_tokens(text, model="model version"):
     return len(enc.encode(text))
 
 
-# === Chunking for summarization ===
-def split_text_into_token_chunks(text, max_tokens_per_chunk=120000):
-    enc = tiktoken.encoding_for_model("deployment name")
-    tokens = enc.encode(text)
-    for i in range(0, len(tokens), max_tokens_per_chunk):
-        yield enc.decode(tokens[i:i + max_tokens_per_chunk])
-
-def insert_text_to_mongodb(text, title, mongo_uri, db_name, collection_name):
+def insert_text_to_mongodb(text, title, mongo_uri, db_name, collection_name, extra_fields=None):
     """
-    Inserts a document with 'title' and 'content' into the specified MongoDB collection.
+    Inserts a document with 'title' and 'content' (plus any extra_fields) into the specified MongoDB collection.
     """
     try:
         client = MongoClient(mongo_uri)
@@ -34,6 +30,7 @@ def insert_text_to_mongodb(text, title, mongo_uri, db_name, collection_name):
             "title": title,
             "content": text
         }
+        document.update(extra_fields or {})
 
         result = collection.insert_one(document)
         print(f"✅ Document inserted with _id: {result.inserted_id}")
@@ -94,6 +91,21 @@ def store_json_to_mongodb(parsed_json, mongo_uri, db_name, collection_name):
         return None
 
 
+def find_statute_summary(digest, p_hash, mongo_uri="mongodb://localhost:27017/"):
+    """
+    Looks up a summary of the same statute text made with the same prompt in the
+    Summarized_statutes collection. Returns the summary text or None.
+    """
+    try:
+        client = MongoClient(mongo_uri)
+        doc = client["Summarized_statutes"]["SummaryStatute"].find_one(
+            {"content_hash": digest, "prompt_hash": p_hash}, {"content": 1})
+        return doc["content"] if doc else None
+    except Exception as e:
+        print(f"⚠️ Summary lookup failed: {e}")
+        return None
+
+
 def summarize_long_statute_text(text, statute_name, deployment_name, summarization_prompt, client):
     max_input_tokens = 70000
     token_count = count_tokens(text)
@@ -101,44 +113,45 @@ def summarize_long_statute_text(text, statute_name, deployment_name, summarizati
     if token_count <= max_input_tokens:
         return text
 
-    print(f"🧹 Text too long ({token_count} tokens). Summarizing...")
+    # Base, custom and both issue resolvers summarize the same statute; only the first one pays for it
+    digest, p_hash = summary_key(text, summarization_prompt)
+    cached_summary = find_statute_summary(digest, p_hash)
+    if cached_summary is not None:
+        print(f"♻️ Reusing stored summary for {statute_name}")
+        return cached_summary
 
-    summarized_chunks = []
-    for chunk in split_text_into_token_chunks(text, 90000):
-        try:
-            response = client.chat.completions.create(
-                model=deployment_name,
-                messages=[
-                    {"role": "system", "content": summarization_prompt},
-                    {"role": "user", "content": chunk}
-                ],
-                temperature=0.3,
-                max_tokens=8192
-            )
-            summarized_chunks.append(response.choices[0].message.content.strip())
-        except Exception as e:
-            print(f"❌ Chunk summarization failed: {e}")
-            return text  # fallback
+    print(f"🧹 Text too long ({token_count} tokens). Summarizing...")
 
-    summary = "\n\n".join(summarized_chunks)
-    insert_text_to_mongodb(summary,statute_name, mongo_uri = "mongodb://localhost:27017/", db_name = "Summarized_statutes", collection_name = "SummaryStatute")
+    try:
+        summary, complete = map_reduce_summarize(text, deployment_name, summarization_prompt, client,
+                                                 max_input_tokens)
+    except Exception as e:
+        print(f"❌ Summarization failed: {e}")
+        return truncate_to_budget(text, deployment_name, max_input_tokens)
+    if not complete:
+        return summary
+    insert_text_to_mongodb(summary,statute_name, mongo_uri = "mongodb://localhost:27017/", db_name = "Summarized_statutes", collection_name = "SummaryStatute",
+                           extra_fields={"content_hash": digest, "prompt_hash": p_hash})
     return summary
 
-def call_gpt_for_base(schema, text, system_prompt, deployment_name, client, token):
+def call_gpt_for_base(schema, text, system_prompt, deployment_name, client, token, bypass_cache=False):
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": f"Base Schema:\n{schema}\n\nStatute Text:\n{text}"}
     ]
-    response = client.chat.completions.create(
+    return chat_completion(
+        client,
         model=deployment_name,
         messages=messages,
         temperature=0.2,
-        max_tokens=token
+        max_tokens=token,
+        validate=parses_as_json,
+        bypass_cache=bypass_cache
     )
-    return response.choices[0].message.content.strip()
 
-def call_gpt_for_custom(statute_text, client, system_prompt, token):
-    response = client.chat.completions.create(
+def call_gpt_for_custom(statute_text, client, system_prompt, token, bypass_cache=False):
+    return chat_completion(
+        client,
         model="gpt-4o",
         messages=[
             {"role": "system", "content": system_prompt},
@@ -146,8 +159,9 @@ def call_gpt_for_custom(statute_text, client, system_prompt, token):
         ],
         temperature=0.2,
         max_tokens=token,
+        validate=parses_as_json,
+        bypass_cache=bypass_cache,
     )
-    return response.choices[0].message.content.strip()
 
 def try_parse_json(text, Statutename):
     try:
@@ -206,7 +220,7 @@ def base_statute_json_gpt(deployment_name, client, system_prompt, summarization_
             for attempt in range(3):
                 try:
                     raw_response = call_gpt_for_base(schema_template, text, system_prompt, deployment_name,
-                                                        client, token)
+                                                        client, token, attempt > 0)
                     parsed_json = try_parse_json(raw_response, statute_name)
                     if parsed_json:
                         store_json_to_mongodb(parsed_json,mongo_uri="mongodb://localhost:27017/", db_name="Base_statutes",collection_name="statutes_base_json")
@@ -214,10 +228,8 @@ def base_statute_json_gpt(deployment_name, client, system_prompt, summarization_
                         break
                     else:
                         print(f"🔁 Retry {attempt + 1}")
-                        time.sleep(2)
                 except Exception as e:
                     print(f"❌ GPT call failed: {e}")
-                    time.sleep(2)
 
             if not success:
                 issue_count += 1
@@ -262,17 +274,15 @@ def base_statute_issue_resolver(deployment_name, client, system_prompt, summariz
             for attempt in range(3):
                 try:
                     raw_response = call_gpt_for_base(schema_template, text, system_prompt, deployment_name,
-                                                        client, token)
+                                                        client, token, attempt > 0)
                     parsed_json = try_parse_json(raw_response, statute_name)
                     if parsed_json:
                         store_json_to_mongodb(parsed_json,mongo_uri="mongodb://localhost:27017/", db_name="Base_statutes",collection_name="statutes_base_json")
                         break
                     else:
                         print(f"🔁 Retry {attempt + 1}")
-                        time.sleep(2)
                 except Exception as e:
                     print(f"❌ GPT call failed: {e}")
-                    time.sleep(2)
 
         except Exception as e:
             print(f"❌ Error processing {statute_name}: {e}")
@@ -293,7 +303,7 @@ def custom_statutes_json_gpt(deployment_name, client, system_prompt, summarizati
             success = False
             for attempt in range(3):
                 try:
-                    raw_response = call_gpt_for_custom(text, client, system_prompt, token)
+                    raw_response = call_gpt_for_custom(text, client, system_prompt, token, attempt > 0)
                     fixed_json = extract_and_fix_json(raw_response, statute_name)
                     if fixed_json:
                         success = True
@@ -303,10 +313,8 @@ def custom_statutes_json_gpt(deployment_name, client, system_prompt, summarizati
                             f"🔁 Retry attempt {attempt + 1} failed. Retrying..." if attempt < 2 else "❌ Final "
                                                                                                      "attempt failed."
                         )
-                        time.sleep(2)
                 except Exception as e:
                     print(f"❌ GPT call failed: {e}")
-                    time.sleep(2)
 
             if not success:
                 issue_count += 1
@@ -346,7 +354,7 @@ def custom_statute_issue_resolver(deployment_name, client, system_prompt, summar
 
             raw_response = None
             for attempt in range(3):
-                raw_response = call_gpt_for_custom(text, client, system_prompt, token)
+                raw_response = call_gpt_for_custom(text, client, system_prompt, token, attempt > 0)
 
                 fixed_json = extract_and_fix_json(raw_response, statute_name)
                 if fixed_json:
@@ -355,7 +363,6 @@ def custom_statute_issue_resolver(deployment_name, client, system_prompt, summar
                     print(
                         f"🔁 Retry attempt {attempt + 1} failed. Retrying..." if attempt == 0 or attempt == 1 else "❌"
                                                                                                                   "Final attempt failed.")
-                    time.sleep(2)
 
         except Exception as e:
             print(f"❌ Error processing {statute_name}: {e}")
@@ -416,7 +423,8 @@ def merge_statutes_from_db(system_prompt, openai_client, threshold=0.85):
 
         for attempt in range(3):
             try:
-                response = openai_client.chat.completions.create(
+                merged_output = chat_completion(
+                    openai_client,
                     model="gpt-4o",
                     messages=[
                         {"role": "system", "content": system_prompt.strip()},
@@ -431,13 +439,12 @@ CUSTOM JSON:
 """}
                     ],
                     temperature=0.3,
-                    max_tokens=8192
+                    max_tokens=8192,
+                    validate=parses_as_json,
+                    bypass_cache=attempt > 0
                 )
-
-                merged_output = response.choices[0].message.content.strip()
                 if not merged_output:
                     print(f"⚠️ Empty GPT response on attempt {attempt+1}")
-                    time.sleep(1)
                     continue
 
                 final_json_text = extract_json_and_name(merged_output)
@@ -452,11 +459,9 @@ CUSTOM JSON:
                 except json.JSONDecodeError as e:
                     print(f"❌ JSON decode error: {e}")
                     print(merged_output[:500])
-                    time.sleep(1)
 
             except Exception as e:
                 print(f"❌ GPT/API Error: {e}")
-                time.sleep(1)
 
         if not success:
             issue_count += 1
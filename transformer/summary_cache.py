@@ -0,0 +1,60 @@
+import time
+import hashlib
+import sqlite3
+import threading
+from extractor.raw_store import content_hash
+
+# === Summary cache for long cases ===
+# The custom phase, the base phase and both issue resolvers all summarize the
+# same long case text. The first summary is stored here keyed by the case's
+# normalized content hash and the summarization prompt, and every later call
+# reuses it instead of chunk-summarizing the case again.
+SUMMARY_CACHE_PATH = "D:/LegalMorph/summary_cache.db"
+
+_lock = threading.Lock()
+
+
+def prompt_hash(prompt):
+    return hashlib.sha256(prompt.strip().encode("utf-8")).hexdigest()
+
+
+def summary_key(text, summarization_prompt):
+    return content_hash(text), prompt_hash(summarization_prompt)
+
+
+def open_summary_cache(path=SUMMARY_CACHE_PATH):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS summaries (
+            content_hash TEXT NOT NULL,
+            prompt_hash TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (content_hash, prompt_hash)
+        )
+    """)
+    return conn
+
+
+def get_summary(text, summarization_prompt, path=SUMMARY_CACHE_PATH):
+    digest, p_hash = summary_key(text, summarization_prompt)
+    with _lock:
+        conn = open_summary_cache(path)
+        try:
+            row = conn.execute("SELECT summary FROM summaries WHERE content_hash = ? AND prompt_hash = ?",
+                               (digest, p_hash)).fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+
+def put_summary(text, summarization_prompt, summary, path=SUMMARY_CACHE_PATH):
+    digest, p_hash = summary_key(text, summarization_prompt)
+    with _lock:
+        conn = open_summary_cache(path)
+        try:
+            conn.execute("INSERT OR REPLACE INTO summaries (content_hash, prompt_hash, summary, created_at) "
+                         "VALUES (?, ?, ?, ?)", (digest, p_hash, summary, time.strftime('%Y-%m-%d %H:%M:%S')))
+            conn.commit()
+        finally:
+            conn.close()